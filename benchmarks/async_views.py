@@ -0,0 +1,150 @@
+"""
+Sync (WSGI) vs async (ASGI) read views under a slow database.
+
+Every SQL query is delayed by --delay milliseconds, as if the database were
+far away or busy. The same requests then go to the WSGI handler from a pool
+of --threads threads (like gunicorn's gthread worker), and to the ASGI
+application (social_hub.asgi, i.e. the async views) with up to
+--concurrency requests in flight on one event loop:
+
+    python -m benchmarks.async_views [--requests 200] [--delay 20] [--path /api/posts/]
+
+Runs against a throwaway test database created from DATABASE_URL.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from wsgiref.util import setup_testing_defaults
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "social_hub.settings.base")
+# as under the ASGI entry point; the WSGI run closes its connections too
+os.environ.setdefault("DB_CONN_MAX_AGE", "0")
+django.setup()
+
+from asgiref.testing import ApplicationCommunicator  # noqa: E402
+from django.core.handlers.wsgi import WSGIHandler  # noqa: E402
+from django.db import connections  # noqa: E402
+from django.db.backends.signals import connection_created  # noqa: E402
+from django.test.utils import setup_databases, teardown_databases  # noqa: E402
+from rest_framework_simplejwt.tokens import AccessToken  # noqa: E402
+
+from posts.models import Post  # noqa: E402
+from users.models import CustomUser  # noqa: E402
+
+
+def slow_database(delay):
+    def wrapper(execute, sql, params, many, context):
+        time.sleep(delay)
+        return execute(sql, params, many, context)
+
+    def install(sender, connection, **kwargs):
+        # fires on every reconnect of the thread's connection object
+        if wrapper not in connection.execute_wrappers:
+            connection.execute_wrappers.append(wrapper)
+
+    connection_created.connect(install, weak=False)
+
+
+def seed(posts):
+    author = CustomUser.objects.create_user(username="author", email="author@example.com", password="benchmark")
+    Post.objects.bulk_create(Post(author=author, content=f"post {i}") for i in range(posts))
+    return str(AccessToken.for_user(author))
+
+
+def run_wsgi(path, token, requests, threads):
+    handler = WSGIHandler()
+    path, _, query = path.partition("?")
+
+    def one(_):
+        environ = {
+            "REQUEST_METHOD": "GET", "PATH_INFO": path, "QUERY_STRING": query,
+            "HTTP_HOST": "localhost", "HTTP_AUTHORIZATION": f"Bearer {token}",
+        }
+        setup_testing_defaults(environ)
+        statuses = []
+        started = time.perf_counter()
+        response = handler(environ, lambda status, headers, exc_info=None: statuses.append(status))
+        try:
+            b"".join(response)
+        finally:
+            response.close()  # request_finished closes the connection
+        assert statuses[0].startswith("200"), statuses[0]
+        return time.perf_counter() - started
+
+    with ThreadPoolExecutor(threads) as pool:
+        return list(pool.map(one, range(requests)))
+
+
+async def run_asgi(path, token, requests, concurrency):
+    from social_hub.asgi import application
+
+    path, _, query = path.partition("?")
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": path, "raw_path": path.encode(),
+        "query_string": query.encode(), "root_path": "",
+        "headers": [(b"host", b"localhost"), (b"authorization", f"Bearer {token}".encode())],
+        "client": ("127.0.0.1", 0), "server": ("localhost", 80),
+    }
+    slots = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with slots:
+            started = time.perf_counter()
+            communicator = ApplicationCommunicator(application, dict(scope))
+            await communicator.send_input({"type": "http.request", "body": b""})
+            start = await communicator.receive_output(60)
+            await communicator.receive_output(60)
+            await communicator.wait(60)  # request_finished closes the connection
+            assert start["status"] == 200, start["status"]
+            return time.perf_counter() - started
+
+    return await asyncio.gather(*(one() for _ in range(requests)))
+
+
+def report(label, latencies, elapsed):
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(
+        f"{label:<28} {len(latencies) / elapsed:8.1f} req/s   "
+        f"p50 {statistics.median(latencies) * 1000:7.1f} ms   p95 {p95 * 1000:7.1f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--path", default="/api/posts/")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--delay", type=float, default=20, help="milliseconds added to every query")
+    parser.add_argument("--threads", type=int, default=4, help="WSGI worker threads")
+    parser.add_argument("--concurrency", type=int, default=20, help="ASGI requests in flight")
+    parser.add_argument("--posts", type=int, default=100)
+    args = parser.parse_args()
+
+    old_config = setup_databases(verbosity=0, interactive=False)
+    try:
+        token = seed(args.posts)
+        slow_database(args.delay / 1000)
+        print(f"GET {args.path}, {args.requests} requests, +{args.delay:g} ms per query")
+
+        started = time.perf_counter()
+        latencies = run_wsgi(args.path, token, args.requests, args.threads)
+        report(f"WSGI, {args.threads} threads", latencies, time.perf_counter() - started)
+
+        started = time.perf_counter()
+        latencies = asyncio.run(run_asgi(args.path, token, args.requests, args.concurrency))
+        report(f"ASGI, {args.concurrency} in flight", latencies, time.perf_counter() - started)
+    finally:
+        for connection in connections.all():
+            if getattr(connection, "pool", None) is not None:  # DB_POOL=1
+                connection.close_pool()
+        teardown_databases(old_config, verbosity=0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,407 @@
+"""
+Load test: scripted user sessions at a set concurrency, reporting throughput
+and p50/p95/p99 latency per endpoint (method + URL name).
+
+    python -m benchmarks.load [--users 1000] [--concurrency 16] [--duration 30] [--json after.json]
+    python -m benchmarks.load --compare before.json --gate post-list-create,chat-list
+
+By default it creates a throwaway test database from DATABASE_URL, seeds it
+with ``manage.py generate_dataset`` (scaled by --users, reproducible by
+--seed) and drives the app in-process through its WSGI handler, one thread
+per virtual user. --existing uses the database as it is, seeded beforehand
+with generate_dataset. --url sends real HTTP requests to a running server
+(gunicorn, uvicorn) instead of the in-process handler. It implies
+--existing: the users and targets are picked from DATABASE_URL, which must
+be the server's database (and SECRET_KEY its key, for the JWTs).
+
+Every virtual user is a generated user with a JWT. It loops over scenarios
+picked by the --mix weights until --duration runs out:
+
+    scroll_feed   home feed, 3 pages, then the first 2 pages of all posts
+    open_post     a post, its comments and its likers
+    like          like a post, and unlike it half of the time
+    comment       comment on a post
+    chat_burst    5 messages to one user, then the thread and the inbox
+    search        job search and event search for a word
+
+Requests in the first --warmup seconds are not counted.
+
+--json writes the report with the git commit, so two commits' reports can be
+diffed. With --compare, the run exits with status 1 when an endpoint's p95
+is more than --max-regression slower than in the given report. --gate
+limits that check to the listed URL names.
+"""
+import argparse
+import io
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+from wsgiref.util import setup_testing_defaults
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "social_hub.settings.base")
+django.setup()
+
+from django.core.handlers.wsgi import WSGIHandler  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.db import connections  # noqa: E402
+from django.test.utils import setup_databases, teardown_databases  # noqa: E402
+from django.urls import Resolver404, resolve  # noqa: E402
+from rest_framework_simplejwt.tokens import AccessToken  # noqa: E402
+
+from posts.management.commands.generate_dataset import WORDS  # noqa: E402
+from posts.models import Post  # noqa: E402
+from users.models import CustomUser  # noqa: E402
+
+
+DEFAULT_MIX = "scroll_feed=5,open_post=4,like=3,comment=1,chat_burst=2,search=1"
+
+
+# ---------- Transports ----------
+
+class WSGITransport:
+    """Requests straight into the app's WSGI handler, in this process."""
+
+    def __init__(self):
+        self.handler = WSGIHandler()
+
+    def __call__(self, method, path, token, payload):
+        path, _, query = path.partition("?")
+        environ = {
+            "REQUEST_METHOD": method, "PATH_INFO": path, "QUERY_STRING": query,
+            "HTTP_HOST": "localhost", "HTTP_AUTHORIZATION": f"Bearer {token}",
+            "CONTENT_TYPE": "application/json", "CONTENT_LENGTH": str(len(payload)),
+            "wsgi.input": io.BytesIO(payload),
+        }
+        setup_testing_defaults(environ)
+        statuses = []
+        response = self.handler(environ, lambda status, headers, exc_info=None: statuses.append(status))
+        try:
+            body = b"".join(response)
+        finally:
+            response.close()
+        return int(statuses[0].split()[0]), body
+
+
+class HTTPTransport:
+    """Real HTTP requests to a running server."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip("/")
+
+    def __call__(self, method, path, token, payload):
+        request = urllib.request.Request(
+            self.base_url + path, data=payload or None, method=method,
+            headers={"Authorization": f"Bearer {token}", "Content-Type": "application/json"},
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=60) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as exc:
+            return exc.code, exc.read()
+        except OSError:
+            return 0, b""
+
+
+# ---------- Sessions and scenarios ----------
+
+def endpoint_name(method, path):
+    try:
+        return f"{method} {resolve(urlsplit(path).path).url_name}"
+    except Resolver404:
+        return f"{method} unresolved"
+
+
+class Session:
+    """One virtual user: its token, its own random generator, and what it measured."""
+
+    def __init__(self, transport, user_id, seed, targets, warmup_until):
+        self.transport = transport
+        self.user_id = user_id
+        self.token = str(AccessToken.for_user(CustomUser(id=user_id)))
+        self.rng = random.Random(seed)
+        self.targets = targets
+        self.warmup_until = warmup_until
+        self.samples = []  # (endpoint, seconds, ok)
+
+    def request(self, method, path, body=None):
+        payload = json.dumps(body).encode() if body is not None else b""
+        started = time.perf_counter()
+        status, content = self.transport(method, path, self.token, payload)
+        elapsed = time.perf_counter() - started
+        if time.monotonic() >= self.warmup_until:
+            self.samples.append((endpoint_name(method, path), elapsed, 0 < status < 400))
+        return status, content
+
+    def get(self, path):
+        return self.request("GET", path)
+
+    def post_id(self):
+        return self.rng.choice(self.targets["posts"])
+
+    def other_user(self):
+        while True:
+            user_id = self.rng.choice(self.targets["users"])
+            if user_id != self.user_id:
+                return user_id
+
+    def words(self, count):
+        return " ".join(self.rng.choices(WORDS, k=count))
+
+
+def next_path(url):
+    parts = urlsplit(url)
+    return f"{parts.path}?{parts.query}"
+
+
+def scroll_feed(session):
+    path = "/api/posts/feed/"
+    for _ in range(3):
+        status, content = session.get(path)
+        next_max_id = json.loads(content).get("next_max_id") if status == 200 else None
+        if next_max_id is None:
+            break
+        path = f"/api/posts/feed/?max_id={next_max_id}"
+    path = "/api/posts/"
+    for _ in range(2):
+        status, content = session.get(path)
+        next_url = json.loads(content).get("next") if status == 200 else None
+        if not next_url:
+            break
+        path = next_path(next_url)
+
+
+def open_post(session):
+    post_id = session.post_id()
+    session.get(f"/api/posts/{post_id}/")
+    session.get(f"/api/posts/{post_id}/comments/")
+    session.get(f"/api/posts/{post_id}/likes/")
+
+
+def like(session):
+    post_id = session.post_id()
+    session.request("PUT", f"/api/posts/{post_id}/like/")
+    if session.rng.random() < 0.5:
+        session.request("DELETE", f"/api/posts/{post_id}/like/")
+
+
+def comment(session):
+    session.request("POST", f"/api/posts/{session.post_id()}/comments/", {"content": session.words(12)})
+
+
+def chat_burst(session):
+    other = session.other_user()
+    for _ in range(5):
+        session.request("POST", f"/api/chat/{other}/send/", {"message": session.words(8)})
+    session.get(f"/api/chat/{other}/")
+    session.get("/api/chat/inbox/")
+
+
+def search(session):
+    session.get(f"/api/jobs/search/?q={session.rng.choice(WORDS)}")
+    session.get(f"/api/events/search/?q={session.rng.choice(WORDS)}")
+
+
+SCENARIOS = {
+    "scroll_feed": scroll_feed,
+    "open_post": open_post,
+    "like": like,
+    "comment": comment,
+    "chat_burst": chat_burst,
+    "search": search,
+}
+
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f"unknown scenario {name!r}; choose from {', '.join(SCENARIOS)}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def run_session(session, mix, deadline):
+    names, weights = list(mix), list(mix.values())
+    try:
+        while time.monotonic() < deadline:
+            SCENARIOS[session.rng.choices(names, weights)[0]](session)
+    finally:
+        connections.close_all()
+
+
+# ---------- Setup ----------
+
+def pick_targets(concurrency, seed):
+    """Virtual users, chat partners and posts to open, like and comment on."""
+    rng = random.Random(seed)
+    user_ids = list(CustomUser.objects.filter(is_active=True).values_list("id", flat=True).order_by("?")[:2000])
+    post_ids = list(Post.objects.order_by("-id").values_list("id", flat=True)[:5000])
+    if len(user_ids) < 2 or not post_ids:
+        raise SystemExit("The database needs users and posts; seed it with `manage.py generate_dataset`.")
+    return rng.sample(user_ids, min(concurrency, len(user_ids))), {"users": user_ids, "posts": post_ids}
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# ---------- Reporting ----------
+
+def percentile(ordered, q):
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+
+def summarize(samples, seconds):
+    by_endpoint = defaultdict(list)
+    errors = defaultdict(int)
+    for name, elapsed, ok in samples:
+        by_endpoint[name].append(elapsed)
+        errors[name] += not ok
+
+    endpoints = {}
+    for name in sorted(by_endpoint):
+        latencies = sorted(by_endpoint[name])
+        endpoints[name] = {
+            "requests": len(latencies),
+            "errors": errors[name],
+            "throughput": round(len(latencies) / seconds, 2),
+            "mean_ms": round(sum(latencies) / len(latencies) * 1000, 2),
+            "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+            "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+            "max_ms": round(latencies[-1] * 1000, 2),
+        }
+    total = {
+        "requests": len(samples),
+        "errors": sum(errors.values()),
+        "throughput": round(len(samples) / seconds, 2),
+    }
+    return total, endpoints
+
+
+def print_report(total, endpoints):
+    print(f"{'endpoint':<38} {'reqs':>7} {'err':>5} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for name, stats in endpoints.items():
+        print(
+            f"{name:<38} {stats['requests']:>7} {stats['errors']:>5} {stats['throughput']:>8.1f} "
+            f"{stats['p50_ms']:>8.1f} {stats['p95_ms']:>8.1f} {stats['p99_ms']:>8.1f}"
+        )
+    print(f"{'total':<38} {total['requests']:>7} {total['errors']:>5} {total['throughput']:>8.1f}")
+
+
+def compare(endpoints, baseline, max_regression, gate):
+    """Print p95 changes against `baseline`; return the endpoints that regressed."""
+    regressed = []
+    print(f"\np95 against {baseline.get('commit') or 'baseline'}:")
+    for name, stats in endpoints.items():
+        before = baseline["endpoints"].get(name)
+        if before is None or (gate and name.split(" ", 1)[1] not in gate):
+            continue
+        change = stats["p95_ms"] / before["p95_ms"] - 1 if before["p95_ms"] else 0
+        failed = change > max_regression
+        if failed:
+            regressed.append(name)
+        print(f"  {name:<38} {before['p95_ms']:>8.1f} -> {stats['p95_ms']:>8.1f} ms  {change:+7.1%}{'  REGRESSED' if failed else ''}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=1000, help="generated users when seeding")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--existing", action="store_true", help="use DATABASE_URL's database as it is")
+    parser.add_argument(
+        "--url", help="base URL of a running server, instead of the in-process WSGI app (implies --existing)"
+    )
+    parser.add_argument("--concurrency", type=int, default=16, help="virtual users, one thread each")
+    parser.add_argument("--duration", type=float, default=30, help="seconds")
+    parser.add_argument("--warmup", type=float, default=3, help="seconds not counted")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX), help=f"default: {DEFAULT_MIX}")
+    parser.add_argument("--json", help="write the report to this file")
+    parser.add_argument("--compare", help="a previous --json report")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="allowed p95 slowdown (0.2 = 20%%)")
+    parser.add_argument("--gate", help="comma-separated URL names to check against --compare (default: all)")
+    args = parser.parse_args()
+    if args.url:
+        # a throwaway database would hand the server ids it has never seen
+        args.existing = True
+
+    old_config = None
+    if not args.existing:
+        old_config = setup_databases(verbosity=0, interactive=False)
+    try:
+        if not args.existing:
+            print(f"Seeding {args.users} users (seed {args.seed})...", file=sys.stderr)
+            call_command("generate_dataset", users=args.users, seed=args.seed, stdout=io.StringIO())
+        user_ids, targets = pick_targets(args.concurrency, args.seed)
+        transport = HTTPTransport(args.url) if args.url else WSGITransport()
+
+        started = time.monotonic()
+        warmup_until = started + args.warmup
+        deadline = warmup_until + args.duration
+        sessions = [
+            Session(transport, user_id, args.seed + index, targets, warmup_until)
+            for index, user_id in enumerate(user_ids)
+        ]
+        threads = [threading.Thread(target=run_session, args=(session, args.mix, deadline)) for session in sessions]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        seconds = time.monotonic() - warmup_until
+    finally:
+        if old_config is not None:
+            for connection in connections.all():
+                if getattr(connection, "pool", None) is not None:  # DB_POOL=1
+                    connection.close_pool()
+            teardown_databases(old_config, verbosity=0)
+
+    total, endpoints = summarize([sample for session in sessions for sample in session.samples], seconds)
+    print_report(total, endpoints)
+
+    report = {
+        "commit": git_commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "config": {
+            "target": args.url or "wsgi", "settings": os.environ["DJANGO_SETTINGS_MODULE"],
+            "users": None if args.existing else args.users, "seed": args.seed,
+            "concurrency": len(sessions), "duration": args.duration, "mix": args.mix,
+        },
+        "total": total,
+        "endpoints": endpoints,
+    }
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        gate = {name.strip() for name in args.gate.split(",")} if args.gate else None
+        regressed = compare(endpoints, baseline, args.max_regression, gate)
+        if regressed:
+            print(f"p95 regressed by more than {args.max_regression:.0%}: {', '.join(regressed)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Serializer microbenchmark: nested UserSerializer vs UserSummaryField.
+
+Runs on unsaved in-memory objects, so no database is needed:
+
+    python -m benchmarks.serializers [--objects 500] [--rounds 20]
+"""
+import argparse
+import os
+import time
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "social_hub.settings.base")
+django.setup()
+
+from django.test import RequestFactory  # noqa: E402
+from django.utils import timezone  # noqa: E402
+
+from posts.models import Post  # noqa: E402
+from posts.serializers import PostSerializer  # noqa: E402
+from users.models import CustomUser  # noqa: E402
+from users.serializers import UserSerializer  # noqa: E402
+
+
+class NestedUserPostSerializer(PostSerializer):
+    """The previous shape: full UserSerializer for author and likers."""
+    author = UserSerializer(read_only=True)
+
+    def get_liked_by_users(self, obj):
+        previews = self.context["liked_by_previews"]
+        return UserSerializer(previews[obj.pk], many=True, context=self.context).data
+
+
+def make_posts(count, likers):
+    users = [
+        CustomUser(
+            id=i, username=f"user{i}", email=f"user{i}@example.com",
+            bio="bio " * 10, profile_pic=f"profile_pics/user{i}.jpg",
+        )
+        for i in range(1, likers + 2)
+    ]
+    now = timezone.now()
+    posts = [
+        Post(id=i, author=users[0], content="post content " * 8, created_at=now)
+        for i in range(1, count + 1)
+    ]
+    return posts, {post.pk: users[1:] for post in posts}
+
+
+def bench(serializer_class, posts, previews, rounds):
+    request = RequestFactory().get("/api/posts/", HTTP_HOST="localhost")
+    best = float("inf")
+    for _ in range(rounds):
+        context = {"request": request, "liked_by_previews": previews}
+        started = time.perf_counter()
+        serializer_class(posts, many=True, context=context).data
+        best = min(best, time.perf_counter() - started)
+    return len(posts) / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--objects", type=int, default=500)
+    parser.add_argument("--likers", type=int, default=3, help="liked_by preview size per post")
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    posts, previews = make_posts(args.objects, args.likers)
+    before = bench(NestedUserPostSerializer, posts, previews, args.rounds)
+    after = bench(PostSerializer, posts, previews, args.rounds)
+    print(f"nested UserSerializer: {before:10,.0f} posts/s")
+    print(f"UserSummaryField:      {after:10,.0f} posts/s  ({after / before:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+# chat/async_views.py
+"""Async read paths for the ASGI deployment; see social_hub.async_views."""
+import asyncio
+
+from django.http import Http404
+
+from social_hub.async_views import AsyncListMixin, parallel_query
+from users.models import CustomUser
+from .views import ChatListView
+
+
+class AsyncChatListView(AsyncListMixin, ChatListView):
+
+    async def aget_queryset(self):
+        return self.get_messages()
+
+    async def abuild_response(self, request, *args, **kwargs):
+        # the page doesn't need the other user's row, so check it exists alongside
+        exists, response = await asyncio.gather(
+            parallel_query(CustomUser.objects.filter(id=self.kwargs['user_id']).exists),
+            super().abuild_response(request, *args, **kwargs),
+        )
+        if not exists:
+            raise Http404
+        return response
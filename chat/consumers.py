@@ -0,0 +1,56 @@
+# chat/consumers.py
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from rest_framework.exceptions import ValidationError
+
+from .delivery import save_message, user_group_name
+from .serializers import ChatMessageSerializer
+
+
+class ChatConsumer(AsyncJsonWebsocketConsumer):
+    """
+    Realtime chat for the authenticated user. Connect to ws/chat/?token=<access>.
+
+    Client -> server:
+        {"type": "message.send", "receiver_id": <id>, "message": "..."}
+    Server -> client:
+        {"type": "message.new", "message": {...ChatMessageSerializer...}}
+        {"type": "error", "errors": {...}}
+
+    Messages created with POST /api/chat/<user_id>/send/ are pushed the same way.
+    """
+
+    async def connect(self):
+        user = self.scope.get("user")
+        if user is None or not user.is_authenticated:
+            await self.close(code=4401)
+            return
+        self.group_name = user_group_name(user.id)
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+
+    async def disconnect(self, code):
+        if hasattr(self, "group_name"):
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    async def receive_json(self, content, **kwargs):
+        if content.get("type") != "message.send":
+            await self.send_json({"type": "error", "errors": {"type": ["Unsupported message type."]}})
+            return
+        try:
+            await self.create_message(content)
+        except ValidationError as exc:
+            await self.send_json({"type": "error", "errors": exc.detail})
+
+    @database_sync_to_async
+    def create_message(self, content):
+        serializer = ChatMessageSerializer(
+            data={"receiver_id": content.get("receiver_id"), "message": content.get("message")}
+        )
+        serializer.is_valid(raise_exception=True)
+        if not serializer.validated_data.get("receiver"):
+            raise ValidationError({"receiver_id": ["This field is required."]})
+        return save_message(serializer, self.scope["user"], serializer.validated_data["receiver"])
+
+    async def chat_message(self, event):
+        await self.send_json({"type": "message.new", "message": event["message"]})
@@ -0,0 +1,46 @@
+# chat/delivery.py
+"""
+Push delivery of chat messages over the channel layer.
+
+Every connected socket joins its user's group (see ``chat.consumers``), so a
+new message is sent to both participants, including the sender's other
+devices.
+"""
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+
+from .models import Conversation
+from .serializers import ChatMessageSerializer
+
+
+def user_group_name(user_id):
+    return f"chat.user.{user_id}"
+
+
+def save_message(serializer, sender, receiver):
+    """
+    Save a validated ChatMessageSerializer into the pair's conversation,
+    update the conversation's pointers and counters, and push the message
+    to both participants once the transaction commits. The message is saved
+    either way: a failed push (channel layer down) is logged, not raised.
+    """
+    with transaction.atomic():
+        conversation = Conversation.between(sender, receiver)
+        message = serializer.save(sender=sender, receiver=receiver, conversation=conversation)
+        conversation.record_message(message)
+        transaction.on_commit(lambda: push_message(message), robust=True)
+    return message
+
+
+def push_message(message):
+    """Send a saved ChatMessage to the sockets of both participants."""
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    payload = ChatMessageSerializer(message).data
+    for user_id in {message.sender_id, message.receiver_id}:
+        async_to_sync(channel_layer.group_send)(
+            user_group_name(user_id),
+            {"type": "chat.message", "message": payload},
+        )
@@ -0,0 +1,43 @@
+# chat/middleware.py
+from urllib.parse import parse_qs
+
+from channels.db import database_sync_to_async
+from channels.middleware import BaseMiddleware
+from django.contrib.auth.models import AnonymousUser
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+
+
+@database_sync_to_async
+def _user_for_token(raw_token):
+    auth = JWTAuthentication()
+    try:
+        return auth.get_user(auth.get_validated_token(raw_token))
+    except (InvalidToken, TokenError, AuthenticationFailed):
+        return AnonymousUser()
+
+
+class JWTAuthMiddleware(BaseMiddleware):
+    """
+    Authenticate WebSocket connections with a SimpleJWT access token, taken
+    from the `token` query parameter (browsers can't set headers on sockets)
+    or from an `Authorization: Bearer <token>` header.
+    Sets scope["user"]; unauthenticated sockets get AnonymousUser.
+    """
+
+    def _raw_token(self, scope):
+        query = parse_qs(scope.get("query_string", b"").decode())
+        if query.get("token"):
+            return query["token"][0]
+        for name, value in scope.get("headers", []):
+            if name == b"authorization":
+                parts = value.decode().split()
+                if len(parts) == 2 and parts[0].lower() == "bearer":
+                    return parts[1]
+        return None
+
+    async def __call__(self, scope, receive, send):
+        raw_token = self._raw_token(scope)
+        scope["user"] = await _user_for_token(raw_token) if raw_token else AnonymousUser()
+        return await super().__call__(scope, receive, send)
@@ -0,0 +1,137 @@
+# Generated by Django 5.1.7 on 2026-10-18 13:49
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Max, Q
+from django.db.models.functions import Greatest, Least
+
+
+def backfill_conversations(apps, schema_editor):
+    """One conversation per existing pair; history is treated as read."""
+    ChatMessage = apps.get_model("chat", "ChatMessage")
+    Conversation = apps.get_model("chat", "Conversation")
+    pairs = (
+        ChatMessage.objects.annotate(a=Least("sender", "receiver"), b=Greatest("sender", "receiver"))
+        .order_by()
+        .values("a", "b")
+        .annotate(last_id=Max("id"), last_at=Max("timestamp"))
+    )
+    for pair in pairs.iterator():
+        conversation = Conversation.objects.create(
+            user_a_id=pair["a"],
+            user_b_id=pair["b"],
+            last_message_id=pair["last_id"],
+            last_message_at=pair["last_at"],
+            user_a_last_read_id=pair["last_id"],
+            user_b_last_read_id=pair["last_id"],
+        )
+        ChatMessage.objects.filter(
+            Q(sender_id=pair["a"], receiver_id=pair["b"]) | Q(sender_id=pair["b"], receiver_id=pair["a"])
+        ).update(conversation=conversation)
+
+
+def backfill_members(apps, schema_editor):
+    """A member row for each side of every conversation, in one statement."""
+    quote = schema_editor.quote_name
+    conversations = quote(apps.get_model("chat", "Conversation")._meta.db_table)
+    members = quote(apps.get_model("chat", "ConversationMember")._meta.db_table)
+    schema_editor.execute(
+        f"INSERT INTO {members} (conversation_id, user_id, last_message_at) "
+        f"SELECT id, user_a_id, last_message_at FROM {conversations} "
+        f"UNION ALL SELECT id, user_b_id, last_message_at FROM {conversations} WHERE user_b_id <> user_a_id"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0002_chatmessage_chat_pair_timestamp_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Conversation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_message_at', models.DateTimeField(blank=True, null=True)),
+                ('user_a_unread', models.PositiveIntegerField(default=0)),
+                ('user_b_unread', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ConversationMember',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_message_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.RemoveIndex(
+            model_name='chatmessage',
+            name='chat_pair_timestamp_idx',
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='last_message',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='chat.chatmessage'),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='user_a',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='user_a_last_read',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='chat.chatmessage'),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='user_b',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='user_b_last_read',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='chat.chatmessage'),
+        ),
+        migrations.AddField(
+            model_name='chatmessage',
+            name='conversation',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='messages', to='chat.conversation'),
+        ),
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(fields=['conversation', 'timestamp', 'id'], name='chat_conversation_ts_idx'),
+        ),
+        migrations.AddField(
+            model_name='conversationmember',
+            name='conversation',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='members', to='chat.conversation'),
+        ),
+        migrations.AddField(
+            model_name='conversationmember',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddConstraint(
+            model_name='conversation',
+            constraint=models.UniqueConstraint(fields=('user_a', 'user_b'), name='unique_conversation_pair'),
+        ),
+        migrations.AddConstraint(
+            model_name='conversation',
+            constraint=models.CheckConstraint(condition=models.Q(('user_a__lte', models.F('user_b'))), name='conversation_pair_ordered'),
+        ),
+        migrations.RunPython(backfill_conversations, migrations.RunPython.noop),
+        migrations.RunPython(backfill_members, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='conversationmember',
+            index=models.Index(fields=['user', '-last_message_at', '-id'], name='conversation_member_inbox_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='conversationmember',
+            constraint=models.UniqueConstraint(fields=('conversation', 'user'), name='unique_conversation_member'),
+        ),
+    ]
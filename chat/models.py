@@ -1,11 +1,136 @@
 from django.db import models
 from django.conf import settings
+from django.db.models import F, Q
+
+
+class Conversation(models.Model):
+    """
+    A one-to-one conversation. The pair is stored ordered (user_a.id <= user_b.id)
+    so each pair of users has exactly one row. The row keeps a pointer to the
+    last message and, for each participant, an unread counter and a read cursor.
+    Each participant also has a ConversationMember row, which the inbox reads.
+    """
+    user_a = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='+', on_delete=models.CASCADE)
+    user_b = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='+', on_delete=models.CASCADE)
+    last_message = models.ForeignKey(
+        'ChatMessage', null=True, blank=True, related_name='+', on_delete=models.SET_NULL
+    )
+    last_message_at = models.DateTimeField(null=True, blank=True)
+    user_a_unread = models.PositiveIntegerField(default=0)
+    user_b_unread = models.PositiveIntegerField(default=0)
+    user_a_last_read = models.ForeignKey(
+        'ChatMessage', null=True, blank=True, related_name='+', on_delete=models.SET_NULL
+    )
+    user_b_last_read = models.ForeignKey(
+        'ChatMessage', null=True, blank=True, related_name='+', on_delete=models.SET_NULL
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user_a', 'user_b'], name='unique_conversation_pair'),
+            models.CheckConstraint(condition=Q(user_a__lte=F('user_b')), name='conversation_pair_ordered'),
+        ]
+
+    def __str__(self):
+        return f"Conversation {self.user_a_id} <-> {self.user_b_id}"
+
+    @classmethod
+    def between(cls, user, other):
+        """Get or create the conversation between two users, with its member rows."""
+        user_a_id, user_b_id = sorted((user.pk, other.pk))
+        conversation, created = cls.objects.get_or_create(user_a_id=user_a_id, user_b_id=user_b_id)
+        if created:
+            ConversationMember.objects.bulk_create([
+                ConversationMember(conversation=conversation, user_id=user_id)
+                for user_id in {user_a_id, user_b_id}
+            ])
+        return conversation
+
+    @classmethod
+    def for_user(cls, user):
+        return cls.objects.filter(members__user=user)
+
+    def side(self, user):
+        """'a' or 'b': which participant columns belong to `user`."""
+        if user.pk == self.user_a_id:
+            return 'a'
+        if user.pk == self.user_b_id:
+            return 'b'
+        raise ValueError(f"User {user.pk} is not part of {self}")
+
+    def other_user(self, user):
+        return self.user_b if self.side(user) == 'a' else self.user_a
+
+    def unread_for(self, user):
+        return getattr(self, f'user_{self.side(user)}_unread')
+
+    def last_read_id_for(self, user):
+        return getattr(self, f'user_{self.side(user)}_last_read_id')
+
+    def record_message(self, message):
+        """Move the last-message pointer and bump the receiver's unread counter."""
+        updates = {'last_message': message, 'last_message_at': message.timestamp}
+        if message.sender_id != message.receiver_id:
+            side = 'a' if message.receiver_id == self.user_a_id else 'b'
+            updates[f'user_{side}_unread'] = F(f'user_{side}_unread') + 1
+            # replying means the sender has read everything up to here
+            sender_side = 'b' if side == 'a' else 'a'
+            updates[f'user_{sender_side}_unread'] = 0
+            updates[f'user_{sender_side}_last_read'] = message
+        Conversation.objects.filter(pk=self.pk).update(**updates)
+        ConversationMember.objects.filter(conversation_id=self.pk).update(last_message_at=message.timestamp)
+
+    def mark_read(self, user, message=None):
+        """
+        Move `user`'s read cursor to `message` (default: the last message) and
+        recount what is still unread after it.
+        """
+        side = self.side(user)
+        message = message or self.last_message
+        unread = 0
+        if message is not None and message.pk != self.last_message_id:
+            unread = self.messages.filter(id__gt=message.pk).exclude(sender=user).count()
+        Conversation.objects.filter(pk=self.pk).update(
+            **{f'user_{side}_last_read': message, f'user_{side}_unread': unread}
+        )
+        setattr(self, f'user_{side}_last_read', message)
+        setattr(self, f'user_{side}_unread', unread)
+
+
+class ConversationMember(models.Model):
+    """
+    One row per participant of a conversation, carrying a copy of its
+    last_message_at. A user's inbox is then one index range scan on
+    (user, last_message_at), whichever side of the pair they are on.
+    """
+    conversation = models.ForeignKey(Conversation, related_name='members', on_delete=models.CASCADE)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='+', on_delete=models.CASCADE)
+    last_message_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['conversation', 'user'], name='unique_conversation_member'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-last_message_at', '-id'], name='conversation_member_inbox_idx'),
+        ]
+
+    def __str__(self):
+        return f"User {self.user_id} in conversation {self.conversation_id}"
+
 
 class ChatMessage(models.Model):
     sender = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='sent_messages', on_delete=models.CASCADE)
     receiver = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='received_messages', on_delete=models.CASCADE)
+    conversation = models.ForeignKey(
+        Conversation, null=True, blank=True, related_name='messages', on_delete=models.CASCADE
+    )
     message = models.TextField()
     timestamp = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         ordering = ['timestamp']
+        indexes = [
+            models.Index(fields=['conversation', 'timestamp', 'id'], name='chat_conversation_ts_idx'),
+        ]
@@ -1,20 +1,22 @@
 # chat/serializers.py
 from django.contrib.auth import get_user_model
 from rest_framework import serializers
-from .models import ChatMessage
-from users.serializers import UserSerializer
+from .models import ChatMessage, Conversation
+from users.serializers import UserSerializer, UserSummaryField, absolute_url_prefix, user_summary
+from social_hub.fields import viewer_links
+from social_hub.serializers import SparseFieldsMixin, expanded_fields
 
 User = get_user_model()
 
-class ChatMessageSerializer(serializers.ModelSerializer):
+class ChatMessageSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """
     Serializer for ChatMessage model.
-    - `sender` and `receiver` are nested read-only representations (UserSerializer).
+    - `sender` and `receiver` are compact read-only user summaries.
     - `receiver_id` is a write-only PK field clients can send when creating a message.
     - `timestamp` is read-only (your model uses `timestamp`).
     """
-    sender = UserSerializer(read_only=True)
-    receiver = UserSerializer(read_only=True)
+    sender = UserSummaryField()
+    receiver = UserSummaryField()
 
     # Write-only field to accept a receiver primary key on create
     receiver_id = serializers.PrimaryKeyRelatedField(
@@ -32,6 +34,67 @@ class ChatMessageSerializer(serializers.ModelSerializer):
             'sender',
             'receiver',
             'receiver_id',  # allowed on write, not returned in nested form
+            'conversation',
             'timestamp',
         ]
-        read_only_fields = ['id', 'sender', 'receiver', 'timestamp']
+        read_only_fields = ['id', 'sender', 'receiver', 'conversation', 'timestamp']
+        expandable_fields = {
+            'sender': lambda: UserSerializer(read_only=True),
+            'receiver': lambda: UserSerializer(read_only=True),
+        }
+
+    @classmethod
+    def prefetch_page(cls, messages, context):
+        users = {}
+        for name in expanded_fields(cls, context):
+            users.update((user.pk, user) for user in (getattr(message, name) for message in messages))
+        if not users:
+            return {}
+        return viewer_links(UserSerializer, list(users.values()), context, fields=UserSerializer.Meta.fields)
+
+
+class ConversationSerializer(serializers.ModelSerializer):
+    """
+    One inbox row, from the point of view of the requesting user
+    (context["request"].user): the other participant, the last message,
+    and the requester's unread count and read cursor.
+    """
+    other_user = serializers.SerializerMethodField()
+    last_message = serializers.SerializerMethodField()
+    unread_count = serializers.SerializerMethodField()
+    last_read_message_id = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Conversation
+        fields = [
+            'id',
+            'other_user',
+            'last_message',
+            'last_message_at',
+            'unread_count',
+            'last_read_message_id',
+        ]
+        read_only_fields = fields
+
+    def _viewer(self):
+        return self.context['request'].user
+
+    def get_other_user(self, obj):
+        return user_summary(obj.other_user(self._viewer()), absolute_url_prefix(self.context))
+
+    def get_last_message(self, obj):
+        message = obj.last_message
+        if message is None:
+            return None
+        return {
+            'id': message.id,
+            'sender_id': message.sender_id,
+            'message': message.message,
+            'timestamp': serializers.DateTimeField().to_representation(message.timestamp),
+        }
+
+    def get_unread_count(self, obj):
+        return obj.unread_for(self._viewer())
+
+    def get_last_read_message_id(self, obj):
+        return obj.last_read_id_for(self._viewer())
@@ -0,0 +1,53 @@
+from unittest import mock
+
+from django.urls import reverse
+
+from social_hub.testing import APITestCase, make_user
+from .models import ChatMessage, Conversation
+
+
+class ChatTestCase(APITestCase):
+    def setUp(self):
+        self.alice = make_user("alice")
+        self.bob = make_user("bob")
+        self.client.force_authenticate(self.alice)
+
+    def send(self, receiver, text="hi"):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(reverse("chat-send", args=[receiver.id]), {"message": text})
+
+
+class SendMessageTests(ChatTestCase):
+    def test_message_is_saved_when_the_push_fails(self):
+        with mock.patch("chat.delivery.get_channel_layer", side_effect=ConnectionError("redis is down")), \
+                self.assertLogs("django", "ERROR"):
+            response = self.send(self.bob)
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(ChatMessage.objects.filter(sender=self.alice, receiver=self.bob).exists())
+
+
+class InboxTests(ChatTestCase):
+    def test_conversations_by_last_activity_on_either_side(self):
+        carol = make_user("carol")
+        self.send(self.bob, "to bob")
+        self.send(carol, "to carol")
+        self.client.force_authenticate(self.bob)
+        self.send(self.alice, "back to alice")
+
+        self.client.force_authenticate(self.alice)
+        response = self.client.get(reverse("chat-inbox"), {"page_size": 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row["other_user"]["username"] for row in response.data["results"]], ["bob"])
+        self.assertEqual(response.data["results"][0]["unread_count"], 1)
+
+        response = self.client.get(response.data["next"])
+        self.assertEqual([row["other_user"]["username"] for row in response.data["results"]], ["carol"])
+        self.assertIsNone(response.data["next"])
+
+    def test_read_rejects_a_non_numeric_message_id(self):
+        self.send(self.bob)
+        conversation = Conversation.for_user(self.alice).get()
+        response = self.client.post(
+            reverse("chat-conversation-read", args=[conversation.id]), {"message_id": "abc"}
+        )
+        self.assertEqual(response.status_code, 400)
@@ -1,7 +1,9 @@
 from django.urls import path
-from .views import ChatListView, ChatCreateView
+from .views import ChatListView, ChatCreateView, InboxView, ConversationReadView
 
 urlpatterns = [
+    path('inbox/', InboxView.as_view(), name='chat-inbox'),
+    path('conversations/<int:pk>/read/', ConversationReadView.as_view(), name='chat-conversation-read'),
     path('<int:user_id>/', ChatListView.as_view(), name='chat-list'),
     path('<int:user_id>/send/', ChatCreateView.as_view(), name='chat-send'),
 ]
@@ -1,28 +1,37 @@
 # chat/views.py
-from django.db.models import Q
 from django.shortcuts import get_object_or_404
 from rest_framework import generics, permissions, status
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
+from rest_framework.views import APIView
 
-from .models import ChatMessage
-from .serializers import ChatMessageSerializer
+from .delivery import save_message
+from .models import ChatMessage, Conversation, ConversationMember
+from .serializers import ChatMessageSerializer, ConversationSerializer
 from users.models import CustomUser
+from social_hub.mixins import PagePrefetchMixin
+from social_hub.query_budget import query_budget
 
-class ChatListView(generics.ListAPIView):
+@query_budget(max_queries=6)
+class ChatListView(PagePrefetchMixin, generics.ListAPIView):
     """
     List messages between the authenticated user and another user (user_id in URL).
     Example: GET /api/chat/<user_id>/
     """
     serializer_class = ChatMessageSerializer
     permission_classes = [permissions.IsAuthenticated]
+    cursor_ordering = ('timestamp', 'id')
 
-    def get_queryset(self):
-        other_id = self.kwargs.get('user_id')
-        user = self.request.user
-        other_user = get_object_or_404(CustomUser, id=other_id)
+    def get_messages(self):
+        user_a_id, user_b_id = sorted((self.request.user.id, self.kwargs['user_id']))
+        # one index range on (conversation, timestamp, id) instead of an OR over sender/receiver
         return ChatMessage.objects.filter(
-            Q(sender=user, receiver=other_user) | Q(sender=other_user, receiver=user)
-        ).order_by('timestamp')
+            conversation__user_a_id=user_a_id, conversation__user_b_id=user_b_id
+        ).select_related('sender', 'receiver').order_by('timestamp')
+
+    def get_queryset(self):
+        get_object_or_404(CustomUser, id=self.kwargs['user_id'])
+        return self.get_messages()
 
     def get_serializer_context(self):
         ctx = super().get_serializer_context()
@@ -54,11 +63,9 @@ class ChatCreateView(generics.CreateAPIView):
         if not receiver and validated_receiver:
             receiver = validated_receiver
 
-        if receiver:
-            serializer.save(sender=request.user, receiver=receiver)
-        else:
-            # Let serializer raise validation error (e.g. receiver_id missing)
-            serializer.save(sender=request.user)
+        if not receiver:
+            raise ValidationError({'receiver_id': ['This field is required.']})
+        save_message(serializer, request.user, receiver)
 
     def create(self, request, *args, **kwargs):
         """
@@ -71,3 +78,57 @@ class ChatCreateView(generics.CreateAPIView):
         # use the same header behavior as CreateAPIView
         headers = self.get_success_headers(serializer.data)
         return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
+
+
+@query_budget(max_queries=5)
+class InboxView(generics.ListAPIView):
+    """
+    The authenticated user's conversations, most recent activity first,
+    with unread counts.
+    Example: GET /api/chat/inbox/
+    """
+    serializer_class = ConversationSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    cursor_ordering = ('-last_message_at', '-id')
+
+    def get_queryset(self):
+        # pages of the user's member rows: one range on (user, last_message_at, id)
+        return (
+            ConversationMember.objects
+            .filter(user=self.request.user, last_message_at__isnull=False)
+            .select_related(
+                'conversation__user_a', 'conversation__user_b', 'conversation__last_message'
+            )
+        )
+
+    def list(self, request, *args, **kwargs):
+        members = self.paginate_queryset(self.get_queryset())
+        serializer = self.get_serializer([member.conversation for member in members], many=True)
+        return self.get_paginated_response(serializer.data)
+
+
+class ConversationReadView(APIView):
+    """
+    Mark a conversation as read up to `message_id` (default: the last message).
+    Example: POST /api/chat/conversations/<pk>/read/
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, pk):
+        conversation = get_object_or_404(
+            Conversation.for_user(request.user).select_related('last_message'), pk=pk
+        )
+        message = None
+        message_id = request.data.get('message_id')
+        if message_id is not None:
+            try:
+                message_id = int(message_id)
+            except (TypeError, ValueError):
+                raise ValidationError({'message_id': ['A valid integer is required.']})
+            message = get_object_or_404(conversation.messages, pk=message_id)
+        conversation.mark_read(request.user, message)
+        return Response({
+            'conversation': conversation.id,
+            'unread_count': conversation.unread_for(request.user),
+            'last_read_message_id': conversation.last_read_id_for(request.user),
+        }, status=status.HTTP_200_OK)
@@ -0,0 +1,20 @@
+# events/async_views.py
+"""Async read paths for the ASGI deployment; see social_hub.async_views."""
+import asyncio
+
+from social_hub.async_views import AsyncListMixin, parallel_query
+from .views import EventSearchView
+
+
+class AsyncEventSearchView(AsyncListMixin, EventSearchView):
+
+    async def abuild_response(self, request, *args, **kwargs):
+        if not self._search_text():
+            return await super().abuild_response(request, *args, **kwargs)
+        # facets count every match for q, independently of the page
+        response, facets = await asyncio.gather(
+            super().abuild_response(request, *args, **kwargs),
+            parallel_query(self.get_facets),
+        )
+        response.data['facets'] = facets
+        return response
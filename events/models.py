@@ -2,6 +2,7 @@ from django.db import models
 
 # Create your models here.
 from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
 
 class Event(models.Model):
     title = models.CharField(max_length=255)
@@ -11,7 +12,20 @@ class Event(models.Model):
     end_time = models.DateTimeField()
     created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)  # also moved by interested_count
     interested_users = models.ManyToManyField(settings.AUTH_USER_MODEL, related_name='interested_events', blank=True)
+    interested_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-start_time', '-id'], name='event_start_idx'),
+            models.Index(fields=['-created_at', '-id'], name='event_created_idx'),
+            models.Index(fields=['created_by', '-created_at', '-id'], name='event_creator_created_idx'),
+            # pg_trgm indexes for fuzzy search (events/search.py)
+            GinIndex(fields=['title'], name='event_title_trgm_idx', opclasses=['gin_trgm_ops']),
+            GinIndex(fields=['location'], name='event_location_trgm_idx', opclasses=['gin_trgm_ops']),
+            GinIndex(fields=['description'], name='event_description_trgm_idx', opclasses=['gin_trgm_ops']),
+        ]
 
     def __str__(self):
         return self.title
@@ -0,0 +1,21 @@
+from django.db.models import Q
+from django.utils import timezone
+
+from social_hub.search import search_facets, trigram_search
+from .models import Event
+
+
+def search_events(text, queryset=None):
+    if queryset is None:
+        queryset = Event.objects.all()
+    return trigram_search(
+        queryset,
+        text,
+        fields=["title", "location"],
+        word_fields=["description"],
+    )
+
+
+def event_facets(queryset):
+    """Location and upcoming/past counts."""
+    return search_facets(queryset, {"location": "location"}, Q(start_time__gte=timezone.now()))
@@ -0,0 +1,45 @@
+# events/signals.py
+"""Invalidate cached responses (social_hub.cache) when events or their interested users change."""
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from social_hub.cache import invalidate
+from social_hub.relations import links_changed
+from .models import Event
+
+
+def invalidate_event(event_id, creator_id=None):
+    if creator_id is None:
+        creator_id = Event.objects.filter(pk=event_id).values_list("created_by_id", flat=True).first()
+    tags = [f"event:{event_id}"]
+    if creator_id is not None:
+        tags.append(f"user_events:{creator_id}")
+    transaction.on_commit(partial(invalidate, *tags))
+
+
+@receiver([post_save, post_delete], sender=Event)
+def event_changed(sender, instance, **kwargs):
+    invalidate_event(instance.pk, instance.created_by_id)
+    transaction.on_commit(partial(invalidate, "events"))  # search facets
+
+
+@receiver(links_changed, sender=Event)
+def event_interest_changed(sender, pk, **kwargs):
+    invalidate_event(pk)
+
+
+@receiver(m2m_changed, sender=Event.interested_users.through)
+def event_interested_users_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            invalidate_event(instance.pk)
+    elif action in ("post_add", "post_remove"):
+        for event_id in pk_set:
+            invalidate_event(event_id)
+    elif action == "pre_clear":
+        # user.interested_events.clear(): the ids are gone once it has run
+        for event_id in instance.interested_events.values_list("pk", flat=True):
+            invalidate_event(event_id)
@@ -1,3 +1,29 @@
-from django.test import TestCase
+import datetime
 
-# Create your tests here.
+from django.urls import reverse
+from django.utils import timezone
+
+from social_hub.testing import APITestCase, make_user
+from .models import Event
+
+
+class EventSearchTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = make_user("host")
+        now = timezone.now()
+        for location, days in [("Lagos", 3), ("Lagos", -3), ("Accra", 3)]:
+            start = now + datetime.timedelta(days=days)
+            Event.objects.create(
+                title="Jazz festival", description="Live music", location=location,
+                start_time=start, end_time=start + datetime.timedelta(hours=3), created_by=user,
+            )
+
+    def test_search_returns_facets(self):
+        response = self.client.get(reverse("event-search"), {"q": "jaz festval"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["results"]), 3)
+        self.assertEqual(response.data["facets"], {
+            "location": [{"value": "Lagos", "count": 2}, {"value": "Accra", "count": 1}],
+            "when": {"upcoming": 2, "past": 1},
+        })
@@ -1,29 +1,52 @@
 from django.shortcuts import get_object_or_404
-from rest_framework import generics, permissions, status
+from django.utils import timezone
+from rest_framework import generics, permissions
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.exceptions import PermissionDenied
 from rest_framework.permissions import IsAuthenticated
 
 from .models import Event
+from .search import event_facets, search_events
 from .serializers import EventSerializer
 from users.models import CustomUser
+from social_hub.cache import CacheResponseMixin, cached_fragment
+from social_hub.conditional import ConditionalGetMixin
+from social_hub.mixins import LinkToggleMixin, PagePrefetchMixin
+from social_hub.query_budget import query_budget
+from social_hub.serializers import expanded_fields
 from users.serializers import UserSerializer
 
 # Create & list events
-class EventListCreateView(generics.ListCreateAPIView):
+@query_budget(max_queries=6)
+class EventListCreateView(PagePrefetchMixin, generics.ListCreateAPIView):
     queryset = Event.objects.all().order_by('-start_time')
     serializer_class = EventSerializer
     permission_classes = [permissions.IsAuthenticated]
+    cursor_ordering = ('-start_time', '-id')
 
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
 
 # Retrieve, update (edit), delete event
-class EventRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
+class EventRetrieveUpdateDestroyView(ConditionalGetMixin, CacheResponseMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Event.objects.all()
     serializer_class = EventSerializer
     permission_classes = [permissions.IsAuthenticated]
+    version_fields = ('updated_at', 'interested_count', 'created_by__updated_at', 'created_by_id')
+
+    def get_cache_tags(self):
+        tags = [f"event:{self.kwargs['pk']}"]
+        if self.version_row is not None:
+            # and its creator's, for the creator shown in it
+            tags.append(f"user:{self.version_row['created_by_id']}")
+        return tags
+
+    def get_extra_version_parts(self):
+        if self.version_row is None or 'created_by' not in expanded_fields(EventSerializer, {'request': self.request}):
+            return ()
+        # the creator's `following` flag changes without touching either row
+        return (self.viewer_follows(self.version_row['created_by_id']),)
 
     def perform_update(self, serializer):
         event = self.get_object()
@@ -37,27 +60,30 @@ class EventRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
         instance.delete()
 
 # Get events by user
-class EventsByUserView(generics.ListAPIView):
+@query_budget(max_queries=8)
+class EventsByUserView(ConditionalGetMixin, CacheResponseMixin, PagePrefetchMixin, generics.ListAPIView):
     serializer_class = EventSerializer
     permission_classes = [permissions.AllowAny]
+    version_user_kwarg = 'user_id'
 
     def get_queryset(self):
         user_id = self.kwargs['user_id']
         user = get_object_or_404(CustomUser, id=user_id)
         return Event.objects.filter(created_by=user).order_by('-created_at')
 
+    def get_cache_tags(self):
+        user_id = self.kwargs['user_id']
+        return [f'user_events:{user_id}', f'user:{user_id}']
+
 # Toggle interest in event
-class EventInterestView(APIView):
+class EventInterestView(LinkToggleMixin, APIView):
     permission_classes = [permissions.IsAuthenticated]
-
-    def post(self, request, event_id):
-        event = get_object_or_404(Event, id=event_id)
-        if request.user in event.interested_users.all():
-            event.interested_users.remove(request.user)
-            return Response({"message": "Interest removed"}, status=status.HTTP_200_OK)
-        else:
-            event.interested_users.add(request.user)
-            return Response({"message": "Interest shown"}, status=status.HTTP_201_CREATED)
+    model = Event
+    relation = "interested_users"
+    counter_field = "interested_count"
+    lookup_url_kwarg = "event_id"
+    added_message = "Interest shown"
+    removed_message = "Interest removed"
 
 # Attendee stats
 class EventAttendeeStatsView(APIView):
@@ -65,24 +91,66 @@ class EventAttendeeStatsView(APIView):
 
     def get(self, request, event_id):
         event = get_object_or_404(Event, id=event_id)
-        total_attendees = event.interested_users.count()
+        total_attendees = event.interested_count
         return Response({"event_id": event_id, "attendees_count": total_attendees})
 
 # Attendees list
-class EventAttendeesListView(generics.ListAPIView):
+@query_budget(max_queries=6)
+class EventAttendeesListView(PagePrefetchMixin, generics.ListAPIView):
     serializer_class = UserSerializer
     permission_classes = [permissions.IsAuthenticated]
+    cursor_ordering = ('id',)
 
     def get_queryset(self):
         event_id = self.kwargs['event_id']
         event = get_object_or_404(Event, id=event_id)
         return event.interested_users.all()
 
-# Search events
-class EventSearchView(generics.ListAPIView):
+# Search events (typo-tolerant, with facets)
+@query_budget(max_queries=6)
+class EventSearchView(PagePrefetchMixin, generics.ListAPIView):
+    """
+    Fuzzy search over title, location and description, best match first.
+    Example: GET /api/events/search/?q=jaz festval&when=upcoming
+    `location` and `when` (upcoming|past) narrow the results;
+    `facets` are counted over every match for `q`.
+    """
     serializer_class = EventSerializer
     permission_classes = [permissions.AllowAny]
 
+    def _search_text(self):
+        return self.request.query_params.get('q', '').strip()
+
+    def get_cursor_ordering(self):
+        return ('-similarity', '-id') if self._search_text() else ('-created_at', '-id')
+
+    def get_search_queryset(self):
+        query = self._search_text()
+        if not query:
+            return Event.objects.all()
+        return search_events(query)
+
     def get_queryset(self):
-        query = self.request.query_params.get('q', '')
-        return Event.objects.filter(title__icontains=query).order_by('-created_at')
+        queryset = self.get_search_queryset()
+        params = self.request.query_params
+        if params.get('location'):
+            queryset = queryset.filter(location=params['location'])
+        if params.get('when') == 'upcoming':
+            queryset = queryset.filter(start_time__gte=timezone.now())
+        elif params.get('when') == 'past':
+            queryset = queryset.filter(start_time__lt=timezone.now())
+        return queryset.select_related('created_by')
+
+    def get_facets(self):
+        return cached_fragment(
+            'event_facets',
+            [self._search_text()],
+            ['events'],
+            lambda: event_facets(self.get_search_queryset()),
+        )
+
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        if self._search_text():
+            response.data['facets'] = self.get_facets()
+        return response
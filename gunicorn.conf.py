@@ -0,0 +1,27 @@
+# gunicorn.conf.py
+"""
+Gunicorn settings, read from the working directory by both the WSGI and
+the ASGI (start_asgi.sh) deployments.
+
+Prometheus metrics (social_hub/metrics.py) are kept per worker process in
+files under PROMETHEUS_MULTIPROC_DIR, which a scrape adds up. The directory
+has to be set before the workers import prometheus_client, and emptied on
+every start so the samples of a previous run aren't counted again.
+"""
+import os
+import shutil
+import tempfile
+
+metrics_dir = os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "social_hub_metrics")
+)
+shutil.rmtree(metrics_dir, ignore_errors=True)
+os.makedirs(metrics_dir)
+
+
+def child_exit(server, worker):
+    # not at the top: forked workers would inherit a prometheus_client
+    # imported before PROMETHEUS_MULTIPROC_DIR was set
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
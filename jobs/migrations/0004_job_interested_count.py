@@ -0,0 +1,37 @@
+# Generated by Django 5.1.7 on 2026-10-18 13:43
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def _count(model, link):
+    counts = (
+        model.objects.filter(**{link: OuterRef("pk")})
+        .order_by()
+        .values(link)
+        .annotate(total=Count("*"))
+        .values("total")
+    )
+    return Coalesce(Subquery(counts), 0)
+
+
+def backfill_counters(apps, schema_editor):
+    Job = apps.get_model("jobs", "Job")
+    Job.objects.update(interested_count=_count(Job.interested_users.through, "job"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0003_job_job_created_idx_job_job_creator_created_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='interested_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
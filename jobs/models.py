@@ -3,6 +3,7 @@ from django.db import models
 # Create your models here.
 from django.db import models
 from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
 
 class Job(models.Model):
     title = models.CharField(max_length=255)
@@ -13,7 +14,20 @@ class Job(models.Model):
     deadline = models.DateField()
     created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)  # also moved by interested_count
     interested_users = models.ManyToManyField(settings.AUTH_USER_MODEL, related_name='interested_jobs', blank=True)
+    interested_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='job_created_idx'),
+            models.Index(fields=['created_by', '-created_at', '-id'], name='job_creator_created_idx'),
+            # pg_trgm indexes for fuzzy search (jobs/search.py)
+            GinIndex(fields=['title'], name='job_title_trgm_idx', opclasses=['gin_trgm_ops']),
+            GinIndex(fields=['company_name'], name='job_company_trgm_idx', opclasses=['gin_trgm_ops']),
+            GinIndex(fields=['location'], name='job_location_trgm_idx', opclasses=['gin_trgm_ops']),
+            GinIndex(fields=['description'], name='job_description_trgm_idx', opclasses=['gin_trgm_ops']),
+        ]
 
     def __str__(self):
         return f"{self.title} at {self.company_name}"
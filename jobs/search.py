@@ -0,0 +1,21 @@
+from django.db.models import Q
+from django.utils import timezone
+
+from social_hub.search import search_facets, trigram_search
+from .models import Job
+
+
+def search_jobs(text, queryset=None):
+    if queryset is None:
+        queryset = Job.objects.all()
+    return trigram_search(
+        queryset,
+        text,
+        fields=["title", "company_name", "location"],
+        word_fields=["description"],
+    )
+
+
+def job_facets(queryset):
+    """Location, company and upcoming/past deadline counts."""
+    return search_facets(queryset, {"location": "location", "company": "company_name"}, Q(deadline__gte=timezone.localdate()))
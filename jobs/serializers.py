@@ -1,10 +1,13 @@
 from rest_framework import serializers
 from .models import Job
-from users.serializers import UserSerializer
+from users.serializers import UserSerializer, UserSummaryField
+from social_hub.fields import ViewerLinkField, viewer_links
+from social_hub.serializers import SparseFieldsMixin, expanded_fields
 
 
-class JobSerializer(serializers.ModelSerializer):
-    created_by = UserSerializer(read_only=True)  # full user with avatar
+class JobSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    created_by = UserSummaryField()  # id, username, avatar
+    interested = ViewerLinkField('interested_users')  # requesting user is interested
 
     class Meta:
         model = Job
@@ -17,6 +20,18 @@ class JobSerializer(serializers.ModelSerializer):
             'salary_range',
             'deadline',
             'created_by',
-            'created_at'
+            'created_at',
+            'interested_count',
+            'interested',
         ]
-        read_only_fields = ['id', 'created_by', 'created_at']
+        read_only_fields = ['id', 'created_by', 'created_at', 'interested_count']
+        expandable_fields = {'created_by': lambda: UserSerializer(read_only=True)}
+
+    @classmethod
+    def prefetch_page(cls, instances, context):
+        data = viewer_links(cls, instances, context)
+        if 'created_by' in expanded_fields(cls, context):
+            data.update(viewer_links(
+                UserSerializer, [obj.created_by for obj in instances], context, fields=UserSerializer.Meta.fields
+            ))
+        return data
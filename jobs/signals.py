@@ -0,0 +1,45 @@
+# jobs/signals.py
+"""Invalidate cached responses (social_hub.cache) when jobs or their interested users change."""
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from social_hub.cache import invalidate
+from social_hub.relations import links_changed
+from .models import Job
+
+
+def invalidate_job(job_id, creator_id=None):
+    if creator_id is None:
+        creator_id = Job.objects.filter(pk=job_id).values_list("created_by_id", flat=True).first()
+    tags = [f"job:{job_id}"]
+    if creator_id is not None:
+        tags.append(f"user_jobs:{creator_id}")
+    transaction.on_commit(partial(invalidate, *tags))
+
+
+@receiver([post_save, post_delete], sender=Job)
+def job_changed(sender, instance, **kwargs):
+    invalidate_job(instance.pk, instance.created_by_id)
+    transaction.on_commit(partial(invalidate, "jobs"))  # search facets
+
+
+@receiver(links_changed, sender=Job)
+def job_interest_changed(sender, pk, **kwargs):
+    invalidate_job(pk)
+
+
+@receiver(m2m_changed, sender=Job.interested_users.through)
+def job_interested_users_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            invalidate_job(instance.pk)
+    elif action in ("post_add", "post_remove"):
+        for job_id in pk_set:
+            invalidate_job(job_id)
+    elif action == "pre_clear":
+        # user.interested_jobs.clear(): the ids are gone once it has run
+        for job_id in instance.interested_jobs.values_list("pk", flat=True):
+            invalidate_job(job_id)
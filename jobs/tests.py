@@ -1,3 +1,42 @@
+import datetime
+
 from django.test import TestCase
+from django.utils import timezone
+
+from social_hub.testing import make_user
+from .models import Job
+from .search import job_facets, search_jobs
+
+
+class JobFacetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = make_user("recruiter")
+        today = timezone.localdate()
+        for location, company, days in [
+            ("Lagos", "Acme", 5), ("Lagos", "Acme", -5), ("Lagos", "Globex", 5),
+            ("Abuja", "Acme", 5), ("Nairobi", "Initech", -1),
+        ]:
+            Job.objects.create(
+                title="Python developer", company_name=company, location=location, description="Backend work",
+                deadline=today + datetime.timedelta(days=days), created_by=user,
+            )
+
+    def test_each_facet_is_counted_on_its_own(self):
+        facets = job_facets(Job.objects.all())
+        self.assertEqual(facets["location"], [
+            {"value": "Lagos", "count": 3}, {"value": "Abuja", "count": 1}, {"value": "Nairobi", "count": 1},
+        ])
+        self.assertEqual(facets["company"], [
+            {"value": "Acme", "count": 3}, {"value": "Globex", "count": 1}, {"value": "Initech", "count": 1},
+        ])
+        self.assertEqual(facets["when"], {"upcoming": 3, "past": 2})
+
+    def test_facets_of_a_search(self):
+        facets = job_facets(search_jobs("pyhton develper").filter(location="Lagos"))
+        self.assertEqual(facets["location"], [{"value": "Lagos", "count": 3}])
+        self.assertEqual(facets["when"], {"upcoming": 2, "past": 1})
 
-# Create your tests here.
+    def test_no_matches(self):
+        facets = job_facets(Job.objects.none())
+        self.assertEqual(facets, {"location": [], "company": [], "when": {"upcoming": 0, "past": 0}})
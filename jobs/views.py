@@ -1,14 +1,22 @@
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
 from rest_framework import generics, permissions, status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 
 from .models import Job
+from .search import job_facets, search_jobs
 from .serializers import JobSerializer
 from users.models import CustomUser
+from social_hub.cache import CacheResponseMixin, cached_fragment
+from social_hub.conditional import ConditionalGetMixin
+from social_hub.mixins import LinkToggleMixin, PagePrefetchMixin
+from social_hub.query_budget import query_budget
+from social_hub.serializers import expanded_fields
 
 # ✅ List & Create Jobs
-class JobListCreateView(generics.ListCreateAPIView):
+@query_budget(max_queries=6)
+class JobListCreateView(PagePrefetchMixin, generics.ListCreateAPIView):
     queryset = Job.objects.all().order_by('-created_at')
     serializer_class = JobSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -17,10 +25,24 @@ class JobListCreateView(generics.ListCreateAPIView):
         serializer.save(created_by=self.request.user)
 
 # ✅ Retrieve, Update (Edit) & Delete Job
-class JobRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
+class JobRetrieveUpdateDestroyView(ConditionalGetMixin, CacheResponseMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Job.objects.all()
     serializer_class = JobSerializer
     permission_classes = [permissions.IsAuthenticated]
+    version_fields = ('updated_at', 'interested_count', 'created_by__updated_at', 'created_by_id')
+
+    def get_cache_tags(self):
+        tags = [f"job:{self.kwargs['pk']}"]
+        if self.version_row is not None:
+            # and its creator's, for the creator shown in it
+            tags.append(f"user:{self.version_row['created_by_id']}")
+        return tags
+
+    def get_extra_version_parts(self):
+        if self.version_row is None or 'created_by' not in expanded_fields(JobSerializer, {'request': self.request}):
+            return ()
+        # the creator's `following` flag changes without touching either row
+        return (self.viewer_follows(self.version_row['created_by_id']),)
 
     def perform_update(self, serializer):
         job = self.get_object()
@@ -34,27 +56,30 @@ class JobRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
         instance.delete()
 
 # ✅ Get Jobs by User ID
-class JobsByUserView(generics.ListAPIView):
+@query_budget(max_queries=8)
+class JobsByUserView(ConditionalGetMixin, CacheResponseMixin, PagePrefetchMixin, generics.ListAPIView):
     serializer_class = JobSerializer
     permission_classes = [permissions.AllowAny]  # Change to IsAuthenticated if needed
+    version_user_kwarg = 'user_id'
 
     def get_queryset(self):
         user_id = self.kwargs['user_id']
         user = get_object_or_404(CustomUser, id=user_id)
         return Job.objects.filter(created_by=user).order_by('-created_at')
 
+    def get_cache_tags(self):
+        user_id = self.kwargs['user_id']
+        return [f'user_jobs:{user_id}', f'user:{user_id}']
+
 # ✅ Show/Remove Interest in Job
-class JobInterestView(APIView):
+class JobInterestView(LinkToggleMixin, APIView):
     permission_classes = [permissions.IsAuthenticated]
-
-    def post(self, request, job_id):
-        job = get_object_or_404(Job, id=job_id)
-        if request.user in job.interested_users.all():
-            job.interested_users.remove(request.user)
-            return Response({"message": "Interest removed"}, status=status.HTTP_200_OK)
-        else:
-            job.interested_users.add(request.user)
-            return Response({"message": "Interest shown"}, status=status.HTTP_201_CREATED)
+    model = Job
+    relation = "interested_users"
+    counter_field = "interested_count"
+    lookup_url_kwarg = "job_id"
+    added_message = "Interest shown"
+    removed_message = "Interest removed"
 
 # ✅ Get Job Applicant Count
 class JobApplicantStatsView(APIView):
@@ -62,14 +87,56 @@ class JobApplicantStatsView(APIView):
 
     def get(self, request, job_id):
         job = get_object_or_404(Job, id=job_id)
-        total_applicants = job.interested_users.count()
+        total_applicants = job.interested_count
         return Response({"job_id": job_id, "applicants_count": total_applicants})
 
-# ✅ Search Jobs
-class JobSearchView(generics.ListAPIView):
+# ✅ Search Jobs (typo-tolerant, with facets)
+@query_budget(max_queries=6)
+class JobSearchView(PagePrefetchMixin, generics.ListAPIView):
+    """
+    Fuzzy search over title, company, location and description, best match first.
+    Example: GET /api/jobs/search/?q=pyhton devloper&location=Lagos&when=upcoming
+    `location`, `company` and `when` (upcoming|past) narrow the results;
+    `facets` are counted over every match for `q`.
+    """
     serializer_class = JobSerializer
     permission_classes = [permissions.AllowAny]
 
+    def _search_text(self):
+        return self.request.query_params.get('q', '').strip()
+
+    def get_cursor_ordering(self):
+        return ('-similarity', '-id') if self._search_text() else ('-created_at', '-id')
+
+    def get_search_queryset(self):
+        query = self._search_text()
+        if not query:
+            return Job.objects.all()
+        return search_jobs(query)
+
     def get_queryset(self):
-        query = self.request.query_params.get('q', '')
-        return Job.objects.filter(title__icontains=query).order_by('-created_at')
+        queryset = self.get_search_queryset()
+        params = self.request.query_params
+        if params.get('location'):
+            queryset = queryset.filter(location=params['location'])
+        if params.get('company'):
+            queryset = queryset.filter(company_name=params['company'])
+        if params.get('when') == 'upcoming':
+            queryset = queryset.filter(deadline__gte=timezone.localdate())
+        elif params.get('when') == 'past':
+            queryset = queryset.filter(deadline__lt=timezone.localdate())
+        return queryset.select_related('created_by')
+
+    def get_facets(self):
+        return cached_fragment(
+            'job_facets',
+            [self._search_text()],
+            ['jobs'],
+            lambda: job_facets(self.get_search_queryset()),
+        )
+
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        if self._search_text():
+            response.data['facets'] = self.get_facets()
+        return response
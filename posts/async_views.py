@@ -0,0 +1,21 @@
+# posts/async_views.py
+"""Async read paths for the ASGI deployment; see social_hub.async_views."""
+from social_hub.async_views import AsyncListMixin, AsyncRetrieveMixin
+
+from .views import CommentListCreateView, PostListCreateView, PostRetrieveUpdateDestroyView, PostSearchView
+
+
+class AsyncPostListCreateView(AsyncListMixin, PostListCreateView):
+    pass
+
+
+class AsyncPostRetrieveUpdateDestroyView(AsyncRetrieveMixin, PostRetrieveUpdateDestroyView):
+    pass
+
+
+class AsyncCommentListCreateView(AsyncListMixin, CommentListCreateView):
+    pass
+
+
+class AsyncPostSearchView(AsyncListMixin, PostSearchView):
+    pass
@@ -0,0 +1,424 @@
+# posts/like_buffer.py
+"""
+Write-behind buffer for post likes, for posts that get liked faster than
+``posts_like`` and ``Post.likes_count`` can absorb (one viral post means one
+hot row).
+
+With ``settings.LIKE_BUFFER["ENABLED"]`` set, a like or unlike only records
+the user's latest intent in the buffer and moves a per-post pending delta.
+Both are atomic, so a double-tap still counts once. Serialized posts (list
+pages, and single posts as pages of one) and the like endpoint add the
+pending delta to ``likes_count`` and overlay the viewer's pending intent on
+``liked_by_me``. Neither moves the post row, so the post's ETag includes
+``pending_version()``.
+
+``flush()`` (run by ``manage.py flush_like_buffer``) writes the intents to
+``Like`` with batched ``add_links``/``remove_links`` and moves
+``likes_count`` by the number of rows they changed; exact recounts are left
+to ``manage.py recount_counters``. A post's intents are renamed to a "flushing"
+snapshot before they are written and are only dropped once the database
+transaction has committed. Snapshots left behind by a crashed flusher are
+replayed on the next run, and every step is safe to repeat.
+
+``RedisLikeBuffer`` is used in production and ``InMemoryLikeBuffer`` in tests.
+"""
+import threading
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from social_hub.counters import adjust_counter
+from social_hub.relations import add_links, links_changed, remove_links
+from .models import Post, Like
+
+
+DEFAULTS = {
+    "ENABLED": False,
+    "BACKEND": "posts.like_buffer.RedisLikeBuffer",
+    "REDIS_URL": None,
+    "FLUSH_INTERVAL": 5,
+    "BATCH_SIZE": 1000,
+}
+
+# BaseLikeBuffer.claim() results
+NOTHING, CLAIMED, LEFTOVER = 0, 1, 2
+
+
+def like_buffer_settings():
+    return {**DEFAULTS, **getattr(settings, "LIKE_BUFFER", {})}
+
+
+def is_enabled():
+    return like_buffer_settings()["ENABLED"]
+
+
+# ---------- Buffers ----------
+
+class BaseLikeBuffer:
+    """
+    Interface for like buffers.
+
+    Each post has live intents ({user_id: liked}), at most one flushing
+    snapshot of earlier intents, and a pending delta: how far the served
+    like count is ahead of ``Post.likes_count``.
+    """
+
+    def __init__(self, **options):
+        pass
+
+    def record(self, post_id, user_id, liked, db_liked=None):
+        """
+        Atomically set the user's intent. Returns True if their effective
+        state changed, False if it already matched, and None when there is
+        no buffered state and `db_liked` is needed to decide.
+        """
+        raise NotImplementedError
+
+    def pending(self, post_ids, user_id=None):
+        """
+        ``(deltas, intents)``: the pending delta per post, and the
+        buffered intent of `user_id` per post, if any.
+        """
+        raise NotImplementedError
+
+    def dirty_post_ids(self):
+        """Posts with live intents waiting to be flushed."""
+        raise NotImplementedError
+
+    def claim(self, post_id):
+        """
+        Move the post's live intents to its flushing snapshot. Returns
+        LEFTOVER if an earlier snapshot has not been flushed yet.
+        """
+        raise NotImplementedError
+
+    def flushing_post_ids(self):
+        raise NotImplementedError
+
+    def flushing(self, post_id):
+        """``(intents, delta)`` of the snapshot; delta is None until stored."""
+        raise NotImplementedError
+
+    def set_flushing_delta(self, post_id, delta):
+        raise NotImplementedError
+
+    def finish(self, post_id):
+        """Drop the snapshot and take its delta off the pending delta."""
+        raise NotImplementedError
+
+
+class InMemoryLikeBuffer(BaseLikeBuffer):
+    """Process-local buffer. Used by the test settings."""
+
+    def __init__(self, **options):
+        self._live = {}
+        self._flushing = {}
+        self._flushing_deltas = {}
+        self._deltas = {}
+        self._lock = threading.Lock()
+
+    def record(self, post_id, user_id, liked, db_liked=None):
+        with self._lock:
+            current = self._live.get(post_id, {}).get(user_id)
+            if current is None:
+                current = self._flushing.get(post_id, {}).get(user_id)
+            if current is None:
+                if db_liked is None:
+                    return None
+                current = db_liked
+            if current == liked:
+                return False
+            self._live.setdefault(post_id, {})[user_id] = liked
+            self._deltas[post_id] = self._deltas.get(post_id, 0) + (1 if liked else -1)
+            return True
+
+    def pending(self, post_ids, user_id=None):
+        with self._lock:
+            deltas = {pk: self._deltas[pk] for pk in post_ids if self._deltas.get(pk)}
+            intents = {}
+            if user_id is not None:
+                for pk in post_ids:
+                    for intents_by_user in (self._live.get(pk, {}), self._flushing.get(pk, {})):
+                        if user_id in intents_by_user:
+                            intents[pk] = intents_by_user[user_id]
+                            break
+            return deltas, intents
+
+    def dirty_post_ids(self):
+        return list(self._live)
+
+    def claim(self, post_id):
+        with self._lock:
+            if post_id in self._flushing:
+                return LEFTOVER
+            intents = self._live.pop(post_id, None)
+            if not intents:
+                return NOTHING
+            self._flushing[post_id] = intents
+            return CLAIMED
+
+    def flushing_post_ids(self):
+        return list(self._flushing)
+
+    def flushing(self, post_id):
+        return dict(self._flushing.get(post_id, {})), self._flushing_deltas.get(post_id)
+
+    def set_flushing_delta(self, post_id, delta):
+        self._flushing_deltas.setdefault(post_id, delta)
+
+    def finish(self, post_id):
+        with self._lock:
+            if self._flushing.pop(post_id, None) is None:
+                return
+            delta = self._deltas.get(post_id, 0) - self._flushing_deltas.pop(post_id, 0)
+            if delta:
+                self._deltas[post_id] = delta
+            else:
+                self._deltas.pop(post_id, None)
+
+
+class RedisLikeBuffer(BaseLikeBuffer):
+    """
+    Per post: ``likebuf:live:<id>`` and ``likebuf:flushing:<id>`` hashes of
+    user id -> "1"/"0", the snapshot's delta in ``likebuf:flushing_delta:<id>``
+    and the pending delta in ``likebuf:delta:<id>``. ``likebuf:dirty`` is
+    the set of posts with live intents. State transitions run as Lua
+    scripts, so they are atomic across web workers and the flusher.
+    """
+
+    key_prefix = "likebuf:"
+    dirty_key = "likebuf:dirty"
+    scan_count = 1000
+
+    RECORD = """
+    local current = redis.call('HGET', KEYS[1], ARGV[1]) or redis.call('HGET', KEYS[2], ARGV[1])
+    if not current then
+        if ARGV[3] == '' then return -1 end
+        current = ARGV[3]
+    end
+    if current == ARGV[2] then return 0 end
+    redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+    redis.call('INCRBY', KEYS[3], ARGV[2] == '1' and 1 or -1)
+    redis.call('SADD', KEYS[4], ARGV[4])
+    return 1
+    """
+
+    CLAIM = """
+    if redis.call('EXISTS', KEYS[2]) == 1 then return 2 end
+    redis.call('SREM', KEYS[3], ARGV[1])
+    if redis.call('EXISTS', KEYS[1]) == 0 then return 0 end
+    redis.call('RENAME', KEYS[1], KEYS[2])
+    return 1
+    """
+
+    FINISH = """
+    local delta = tonumber(redis.call('GET', KEYS[2]) or '0')
+    if redis.call('DEL', KEYS[1]) == 0 then return 0 end
+    redis.call('DEL', KEYS[2])
+    if redis.call('DECRBY', KEYS[3], delta) == 0 then redis.call('DEL', KEYS[3]) end
+    return 1
+    """
+
+    def __init__(self, redis_url=None, **options):
+        import redis
+
+        self.client = redis.Redis.from_url(redis_url or settings.REDIS_URL)
+        self._record = self.client.register_script(self.RECORD)
+        self._claim = self.client.register_script(self.CLAIM)
+        self._finish = self.client.register_script(self.FINISH)
+
+    def _keys(self, post_id):
+        return (
+            f"{self.key_prefix}live:{post_id}",
+            f"{self.key_prefix}flushing:{post_id}",
+            f"{self.key_prefix}flushing_delta:{post_id}",
+            f"{self.key_prefix}delta:{post_id}",
+        )
+
+    def record(self, post_id, user_id, liked, db_liked=None):
+        live, flushing, _, delta = self._keys(post_id)
+        known = "" if db_liked is None else str(int(db_liked))
+        result = self._record(
+            keys=[live, flushing, delta, self.dirty_key],
+            args=[user_id, str(int(liked)), known, post_id],
+        )
+        return None if result == -1 else bool(result)
+
+    def pending(self, post_ids, user_id=None):
+        post_ids = list(post_ids)
+        pipe = self.client.pipeline(transaction=False)
+        for post_id in post_ids:
+            live, flushing, _, delta = self._keys(post_id)
+            pipe.get(delta)
+            if user_id is not None:
+                pipe.hget(live, user_id)
+                pipe.hget(flushing, user_id)
+        results = iter(pipe.execute())
+
+        deltas, intents = {}, {}
+        for post_id in post_ids:
+            delta = int(next(results) or 0)
+            if delta:
+                deltas[post_id] = delta
+            if user_id is not None:
+                live, flushing = next(results), next(results)
+                current = live if live is not None else flushing
+                if current is not None:
+                    intents[post_id] = current == b"1"
+        return deltas, intents
+
+    def dirty_post_ids(self):
+        return [int(post_id) for post_id in self.client.smembers(self.dirty_key)]
+
+    def claim(self, post_id):
+        live, flushing, _, _ = self._keys(post_id)
+        return self._claim(keys=[live, flushing, self.dirty_key], args=[post_id])
+
+    def flushing_post_ids(self):
+        prefix = f"{self.key_prefix}flushing:".encode()
+        return [
+            int(key[len(prefix):])
+            for key in self.client.scan_iter(prefix + b"*", count=self.scan_count)
+        ]
+
+    def flushing(self, post_id):
+        _, flushing, flushing_delta, _ = self._keys(post_id)
+        pipe = self.client.pipeline(transaction=False)
+        pipe.hgetall(flushing)
+        pipe.get(flushing_delta)
+        intents, delta = pipe.execute()
+        intents = {int(user_id): value == b"1" for user_id, value in intents.items()}
+        return intents, None if delta is None else int(delta)
+
+    def set_flushing_delta(self, post_id, delta):
+        _, _, flushing_delta, _ = self._keys(post_id)
+        self.client.set(flushing_delta, delta, nx=True)
+
+    def finish(self, post_id):
+        _, flushing, flushing_delta, delta = self._keys(post_id)
+        self._finish(keys=[flushing, flushing_delta, delta])
+
+
+@lru_cache(maxsize=None)
+def get_like_buffer():
+    config = like_buffer_settings()
+    buffer_class = import_string(config["BACKEND"])
+    return buffer_class(redis_url=config["REDIS_URL"])
+
+
+@receiver(setting_changed)
+def _reset_like_buffer(*, setting, **kwargs):
+    if setting in ("LIKE_BUFFER", "REDIS_URL"):
+        get_like_buffer.cache_clear()
+
+
+# ---------- Write ----------
+
+def record(post_id, user_id, liked):
+    """Buffer a like or unlike. Returns True if the user's state changed."""
+    buffer = get_like_buffer()
+    changed = buffer.record(post_id, user_id, liked)
+    if changed is None:
+        db_liked = Like.objects.filter(post_id=post_id, user_id=user_id).exists()
+        changed = buffer.record(post_id, user_id, liked, db_liked=db_liked)
+    if changed:
+        links_changed.send(sender=Post, pk=post_id, user_ids=[user_id])
+    return changed
+
+
+# ---------- Read ----------
+
+def apply_pending(posts, liked_ids=None, user=None, counts=True):
+    """
+    Bring a page of posts up to date with the buffer: add the pending
+    delta to each ``likes_count`` (unless `counts` is False) and, given the
+    viewer's `liked_ids` set, overlay their buffered likes and unlikes on it.
+    """
+    user_id = user.pk if user is not None and user.is_authenticated and liked_ids is not None else None
+    deltas, intents = get_like_buffer().pending([post.pk for post in posts], user_id)
+    if counts:
+        for post in posts:
+            post.likes_count = max(post.likes_count + deltas.get(post.pk, 0), 0)
+    if liked_ids is not None:
+        for post_id, liked in intents.items():
+            if liked:
+                liked_ids.add(post_id)
+            else:
+                liked_ids.discard(post_id)
+
+
+def pending_version(post_id, user):
+    """The buffered state a post's response depends on: its pending delta and the viewer's intent."""
+    user_id = user.pk if user is not None and user.is_authenticated else None
+    deltas, intents = get_like_buffer().pending([post_id], user_id)
+    return deltas.get(post_id, 0), intents.get(post_id)
+
+
+# ---------- Flush ----------
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _flush_post(buffer, post_id, batch_size, stats):
+    intents, delta = buffer.flushing(post_id)
+    if delta is None:
+        # how far the served count was ahead of the table for this snapshot;
+        # stored first so a replay after the commit below doesn't recompute it
+        existing = set(
+            Like.objects.filter(post_id=post_id, user_id__in=list(intents))
+            .values_list("user_id", flat=True)
+        )
+        delta = sum(int(liked) - (user_id in existing) for user_id, liked in intents.items())
+        buffer.set_flushing_delta(post_id, delta)
+
+    likes = [user_id for user_id, liked in intents.items() if liked]
+    unlikes = [user_id for user_id, liked in intents.items() if not liked]
+    with transaction.atomic():
+        if Post.objects.filter(pk=post_id).exists():
+            # users deleted since they liked would violate the foreign key
+            likes = list(
+                get_user_model().objects.filter(pk__in=likes).values_list("pk", flat=True)
+            )
+            # only the rows this run actually changed move the counter, so a
+            # replay of a snapshot that was already committed adds nothing
+            changed = 0
+            for chunk in _chunks(likes, batch_size):
+                changed += add_links(Post, "likes", post_id, chunk)
+            for chunk in _chunks(unlikes, batch_size):
+                changed -= remove_links(Post, "likes", post_id, chunk)
+            if changed:
+                adjust_counter(Post, post_id, "likes_count", changed)
+    buffer.finish(post_id)
+
+    stats["posts"] += 1
+    stats["likes"] += len(likes)
+    stats["unlikes"] += len(unlikes)
+
+
+def flush(batch_size=None):
+    """
+    Write buffered likes to the database. Snapshots left by a crashed
+    flusher are replayed first. Returns counts of what was written.
+    """
+    buffer = get_like_buffer()
+    batch_size = batch_size or like_buffer_settings()["BATCH_SIZE"]
+    stats = {"posts": 0, "likes": 0, "unlikes": 0}
+
+    for post_id in buffer.flushing_post_ids():
+        _flush_post(buffer, post_id, batch_size, stats)
+
+    for post_id in buffer.dirty_post_ids():
+        claimed = buffer.claim(post_id)
+        if claimed == LEFTOVER:
+            _flush_post(buffer, post_id, batch_size, stats)
+            claimed = buffer.claim(post_id)
+        if claimed == CLAIMED:
+            _flush_post(buffer, post_id, batch_size, stats)
+    return stats
@@ -0,0 +1,36 @@
+from django.contrib.postgres.search import SearchVector
+from django.core.management.base import BaseCommand
+from django.db.models import Max, Min
+
+from posts.models import Post
+from posts.search import SEARCH_CONFIG
+
+
+class Command(BaseCommand):
+    help = "Fill Post.search_vector for existing rows, in primary-key batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Recompute every row, not only rows without a vector.",
+        )
+
+    def handle(self, *args, batch_size, all, **options):
+        queryset = Post.objects.all()
+        if not all:
+            queryset = queryset.filter(search_vector__isnull=True)
+
+        bounds = queryset.aggregate(low=Min("pk"), high=Max("pk"))
+        if bounds["low"] is None:
+            self.stdout.write("Nothing to backfill.")
+            return
+
+        updated = 0
+        for start in range(bounds["low"], bounds["high"] + 1, batch_size):
+            updated += queryset.filter(pk__gte=start, pk__lt=start + batch_size).update(
+                search_vector=SearchVector("content", config=SEARCH_CONFIG)
+            )
+            self.stdout.write(f"  up to id {start + batch_size - 1}: {updated} rows")
+        self.stdout.write(self.style.SUCCESS(f"Backfilled {updated} posts."))
@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import like_buffer
+
+
+class Command(BaseCommand):
+    help = (
+        "Write buffered likes (LIKE_BUFFER) to the database, replaying any "
+        "flush interrupted by a crash. Runs once, or forever with --loop."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--loop", action="store_true", help="Keep flushing every --interval seconds.")
+        parser.add_argument("--interval", type=float, help="Defaults to LIKE_BUFFER['FLUSH_INTERVAL'].")
+        parser.add_argument("--batch-size", type=int, help="Defaults to LIKE_BUFFER['BATCH_SIZE'].")
+
+    def handle(self, *args, loop, interval, batch_size, **options):
+        config = like_buffer.like_buffer_settings()
+        interval = interval or config["FLUSH_INTERVAL"]
+        batch_size = batch_size or config["BATCH_SIZE"]
+
+        while True:
+            stats = like_buffer.flush(batch_size=batch_size)
+            if stats["posts"] or not loop:
+                self.stdout.write(
+                    f"Flushed {stats['likes']} likes and {stats['unlikes']} unlikes "
+                    f"on {stats['posts']} posts."
+                )
+            if not loop:
+                return
+            time.sleep(interval)
@@ -0,0 +1,390 @@
+import random
+import time
+from array import array
+from bisect import bisect
+from datetime import timedelta
+from itertools import accumulate, islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from chat.models import ChatMessage, Conversation, ConversationMember
+from events.models import Event
+from jobs.models import Job
+from posts import timeline
+from posts.models import Comment, Like, Post
+from users.models import CustomUser, UserFollow
+
+
+WORDS = (
+    "remote work hiring team launch product design code python django api data cloud startup "
+    "coffee music travel lagos london weekend meetup conference talk workshop open source release "
+    "bug fix deploy review growth marketing sales founder engineer mentor career interview offer "
+    "salary community event party festival photo video art book film game football sunday morning "
+    "night city beach food recipe health running fitness family friends learning course tutorial "
+    "today tomorrow finally excited happy proud thanks great new big small fast slow love hate"
+).split()
+CITIES = ["Lagos", "Abuja", "Nairobi", "Accra", "London", "Berlin", "Remote", "New York", "Toronto", "Cape Town"]
+COMPANIES = ["Acme", "Globex", "Initech", "Umbrella", "Hooli", "Stark Industries", "Wayne Enterprises", "Pied Piper"]
+
+# Zipf exponents: how strongly attention concentrates on the top users
+POPULARITY_EXPONENT = 0.8  # who gets followed, liked and messaged
+ACTIVITY_EXPONENT = 0.6  # who posts
+
+
+def heavy_tail(rng, mean, alpha, cap):
+    """A Pareto-distributed count with about the given mean, at most `cap`."""
+    return min(cap, int(rng.paretovariate(alpha) * mean * (alpha - 1) / alpha))
+
+
+class ZipfPicker:
+    """Draws indexes in range(n) with Zipf weights, the heavy hitters shuffled over the range."""
+
+    def __init__(self, rng, n, exponent):
+        self.rng = rng
+        self.order = list(range(n))
+        rng.shuffle(self.order)
+        self.cum_weights = list(accumulate(1 / (rank + 1) ** exponent for rank in range(n)))
+        self.total = self.cum_weights[-1]
+
+    def pick(self):
+        return self.order[bisect(self.cum_weights, self.rng.random() * self.total)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a reproducible synthetic dataset (users, follows, posts, likes, comments, chats, "
+        "events, jobs) with power-law distributions, loaded with COPY in batches."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=10000)
+        parser.add_argument("--follows", type=float, default=30, help="Mean accounts followed per user.")
+        parser.add_argument("--posts", type=float, default=5, help="Mean posts per user.")
+        parser.add_argument("--likes", type=float, default=20, help="Mean likes per post (viral posts get far more).")
+        parser.add_argument("--comments", type=float, default=3, help="Mean comments per post.")
+        parser.add_argument("--comment-likes", type=float, default=0.5, help="Mean likes per comment.")
+        parser.add_argument("--conversations", type=int, default=None, help="Default: 2 per user.")
+        parser.add_argument("--messages", type=float, default=30, help="Mean messages per conversation.")
+        parser.add_argument("--max-thread", type=int, default=20000, help="Longest chat thread.")
+        parser.add_argument("--events", type=int, default=None, help="Default: 1 per 5 users.")
+        parser.add_argument("--jobs", type=int, default=None, help="Default: 1 per 5 users.")
+        parser.add_argument("--interest", type=float, default=15, help="Mean interested users per event or job.")
+        parser.add_argument("--days", type=int, default=365, help="Spread timestamps over this many past days.")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--batch-size", type=int, default=100000, help="Rows per COPY transaction.")
+        parser.add_argument("--password", default="password", help="Password of every generated user.")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("generate_dataset loads with COPY and needs PostgreSQL.")
+        if options["users"] < 2:
+            raise CommandError("--users must be at least 2.")
+
+        self.options = options
+        self.rng = random.Random(options["seed"])
+        self.batch_size = options["batch_size"]
+        self.now = timezone.now()
+        self.start = self.now - timedelta(days=options["days"])
+        self.span = (self.now - self.start).total_seconds()
+        self.rows = 0
+        began = time.monotonic()
+
+        n = options["users"]
+        self.popular = ZipfPicker(self.rng, n, POPULARITY_EXPONENT)
+        self.active = ZipfPicker(self.rng, n, ACTIVITY_EXPONENT)
+
+        self.user_id0 = self.next_id(CustomUser)
+        self.generate_users(n)
+        followers = self.generate_follows(n)
+        self.generate_posts(n)
+        self.generate_chats(n)
+        self.generate_listings(Event, options["events"] if options["events"] is not None else n // 5)
+        self.generate_listings(Job, options["jobs"] if options["jobs"] is not None else n // 5)
+        self.reset_sequences()
+        self.mark_celebrities(followers)
+
+        elapsed = time.monotonic() - began
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {self.rows} rows in {elapsed:.0f}s ({self.rows / max(elapsed, 0.001):.0f} rows/s)."
+        ))
+
+    # ---------- Loading ----------
+
+    def next_id(self, model):
+        return (model.objects.aggregate(high=Max("pk"))["high"] or 0) + 1
+
+    def copy(self, model, fields, rows):
+        """COPY `rows` (tuples in `fields` order) into `model`'s table; returns the row count."""
+        columns = ", ".join(connection.ops.quote_name(model._meta.get_field(name).column) for name in fields)
+        table = connection.ops.quote_name(model._meta.db_table)
+        count = 0
+        with connection.cursor() as cursor:
+            with cursor.copy(f"COPY {table} ({columns}) FROM STDIN") as copy:
+                for row in rows:
+                    copy.write_row(row)
+                    count += 1
+        self.rows += count
+        return count
+
+    def load(self, model, fields, rows):
+        """copy() in transactions of --batch-size rows."""
+        began = time.monotonic()
+        rows = iter(rows)
+        total = 0
+        while True:
+            with transaction.atomic():
+                count = self.copy(model, fields, islice(rows, self.batch_size))
+            total += count
+            if count < self.batch_size:
+                break
+            self.stdout.write(f"  {model._meta.label}: {total} rows")
+        self.stdout.write(f"{model._meta.label}: {total} rows in {time.monotonic() - began:.1f}s")
+        return total
+
+    def reset_sequences(self):
+        models = [CustomUser, Post, Comment, Conversation, ChatMessage, Event, Job]
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), models):
+                cursor.execute(sql)
+
+    # ---------- Content ----------
+
+    def text(self, low, high):
+        words = self.rng.choices(WORDS, k=self.rng.randint(low, high))
+        if self.rng.random() < 0.2:
+            words.append(f"#{self.rng.choice(WORDS)}")
+        return " ".join(words)
+
+    def at(self, seconds):
+        return self.start + timedelta(seconds=seconds)
+
+    def after(self, seconds, mean_delay):
+        """A moment about `mean_delay` seconds after `seconds`, never in the future."""
+        return min(seconds + self.rng.expovariate(1 / mean_delay), self.span)
+
+    def distinct_users(self, k, exclude=None):
+        """`k` distinct user indexes, most of them popular ones."""
+        n = self.options["users"]
+        k = min(k, n - (exclude is not None))
+        if k <= 0:
+            return []
+        if k > n // 4:
+            chosen = self.rng.sample(range(n), min(k + 1, n))
+        else:
+            chosen = {self.popular.pick() for _ in range(k + 1)}
+            while len(chosen) < k + 1 and len(chosen) < n:
+                chosen.add(self.rng.randrange(n))
+        chosen = [index for index in chosen if index != exclude]
+        return chosen[:k]
+
+    # ---------- Users and follows ----------
+
+    def generate_users(self, n):
+        password = make_password(self.options["password"])
+        self.joined = array("d", sorted(self.rng.uniform(0, self.span * 0.9) for _ in range(n)))
+
+        def rows():
+            for index in range(n):
+                user_id = self.user_id0 + index
+                joined = self.at(self.joined[index])
+                yield (
+                    user_id, password, False, f"synth{user_id}", "", "", f"synth{user_id}@example.com",
+                    False, True, joined, self.text(3, 15) if self.rng.random() < 0.5 else None, joined,
+                )
+
+        self.load(CustomUser, [
+            "id", "password", "is_superuser", "username", "first_name", "last_name", "email",
+            "is_staff", "is_active", "date_joined", "bio", "updated_at",
+        ], rows())
+
+    def generate_follows(self, n):
+        """Out-degrees are heavy-tailed; targets are Zipf-popular, so follower counts follow a power law."""
+        followers = array("l", bytes(8 * n))
+        mean = self.options["follows"]
+
+        def rows():
+            for index in range(n):
+                degree = heavy_tail(self.rng, mean, 2.0, n - 1)
+                for target in self.distinct_users(degree, exclude=index):
+                    followers[target] += 1
+                    since = max(self.joined[index], self.joined[target])
+                    yield (self.user_id0 + index, self.user_id0 + target, self.at(self.after(since, 86400 * 7)))
+
+        self.load(UserFollow, ["follower", "following", "followed_at"], rows())
+        return followers
+
+    def mark_celebrities(self, followers):
+        limit = timeline.timeline_settings()["FANOUT_FOLLOWER_LIMIT"]
+        celebrities = [self.user_id0 + index for index, count in enumerate(followers) if count > limit]
+        store = timeline.get_timeline_store()
+        for user_id in celebrities:
+            store.mark_celebrity(user_id)
+        if celebrities:
+            self.stdout.write(f"{len(celebrities)} authors with over {limit} followers marked as celebrities.")
+
+    # ---------- Posts, likes and comments ----------
+
+    def generate_posts(self, n):
+        options = self.options
+        count = int(n * options["posts"])
+        post_id0 = self.next_id(Post)
+        comment_id0 = self.next_id(Comment)
+        # planned up front, so the denormalized counters are written with the posts
+        authors = array("l", (self.active.pick() for _ in range(count)))
+        times = array("d", (
+            max(self.joined[author], (i + self.rng.random()) * self.span / count)
+            for i, author in enumerate(authors)
+        ))
+        likes = array("l", (heavy_tail(self.rng, options["likes"], 1.2, n) for _ in range(count)))
+        comments = array("l", (heavy_tail(self.rng, options["comments"], 1.5, 10000) for _ in range(count)))
+
+        self.load(Post, ["id", "author", "content", "created_at", "updated_at", "likes_count", "comments_count"], (
+            (post_id0 + i, self.user_id0 + authors[i], self.text(5, 40), self.at(times[i]), self.at(times[i]),
+             likes[i], comments[i])
+            for i in range(count)
+        ))
+
+        def like_rows():
+            for i in range(count):
+                for user in self.distinct_users(likes[i]):
+                    yield (self.user_id0 + user, post_id0 + i, self.at(self.after(times[i], 3600 * 6)))
+
+        self.load(Like, ["user", "post", "created_at"], like_rows())
+
+        comment_likes = array("l")
+
+        def comment_rows():
+            comment_id = comment_id0
+            for i in range(count):
+                for _ in range(comments[i]):
+                    liked = heavy_tail(self.rng, options["comment_likes"], 1.5, n) if options["comment_likes"] else 0
+                    comment_likes.append(liked)
+                    yield (
+                        comment_id, post_id0 + i, self.user_id0 + self.popular.pick(), self.text(2, 20),
+                        self.at(self.after(times[i], 3600 * 12)), liked,
+                    )
+                    comment_id += 1
+
+        total = self.load(Comment, ["id", "post", "user", "content", "created_at", "likes_count"], comment_rows())
+
+        through = Comment.liked_by.through
+        field = Comment._meta.get_field("liked_by")
+        self.load(through, [field.m2m_field_name(), field.m2m_reverse_field_name()], (
+            (comment_id0 + i, self.user_id0 + user)
+            for i in range(total)
+            for user in self.distinct_users(comment_likes[i])
+        ))
+
+    # ---------- Chat ----------
+
+    def thread(self, conversation_id, user_a, user_b, message_id):
+        """The messages of one conversation, and its row with read cursors and unread counts."""
+        rng = self.rng
+        length = max(1, heavy_tail(rng, self.options["messages"], 1.3, self.options["max_thread"]))
+        begun = rng.uniform(max(self.joined[user_a], self.joined[user_b]), self.span)
+        gap = (self.span - begun) / (length + 1)
+        sender, receiver = (user_a, user_b) if rng.random() < 0.5 else (user_b, user_a)
+        at = begun
+        messages = []
+        for _ in range(length):
+            if rng.random() < 0.6:
+                sender, receiver = receiver, sender
+            at = min(at + rng.expovariate(1 / gap), self.span)
+            messages.append((
+                message_id, self.user_id0 + sender, self.user_id0 + receiver, conversation_id,
+                self.text(1, 25), self.at(at),
+            ))
+            message_id += 1
+
+        last = messages[-1]
+        run = 0  # trailing messages from the last sender: unread by the other side
+        while run < len(messages) and messages[-1 - run][1] == last[1]:
+            run += 1
+        before_run = messages[-1 - run][0] if run < len(messages) else None
+        a_sent_last = last[1] == self.user_id0 + user_a
+        conversation = (
+            conversation_id, self.user_id0 + user_a, self.user_id0 + user_b, last[0], last[5],
+            0 if a_sent_last else run, run if a_sent_last else 0,
+            last[0] if a_sent_last else before_run, before_run if a_sent_last else last[0],
+            messages[0][5],
+        )
+        return messages, conversation
+
+    def generate_chats(self, n):
+        count = self.options["conversations"]
+        if count is None:
+            count = n * 2
+        count = min(count, n * (n - 1) // 2)
+        conversation_id = self.next_id(Conversation)
+        message_id = self.next_id(ChatMessage)
+        pairs = set()
+        began = time.monotonic()
+        messages_total = 0
+
+        while len(pairs) < count:
+            messages, conversations = [], []
+            # one transaction per group: the conversation and message rows point at each other
+            while len(pairs) < count and len(messages) < self.batch_size:
+                user_a, user_b = sorted((self.rng.randrange(n), self.popular.pick()))
+                if user_a == user_b or (user_a, user_b) in pairs:
+                    continue
+                pairs.add((user_a, user_b))
+                thread, conversation = self.thread(conversation_id, user_a, user_b, message_id)
+                messages.extend(thread)
+                conversations.append(conversation)
+                conversation_id += 1
+                message_id += len(thread)
+            with transaction.atomic():
+                messages_total += self.copy(
+                    ChatMessage, ["id", "sender", "receiver", "conversation", "message", "timestamp"], messages
+                )
+                self.copy(Conversation, [
+                    "id", "user_a", "user_b", "last_message", "last_message_at", "user_a_unread",
+                    "user_b_unread", "user_a_last_read", "user_b_last_read", "created_at",
+                ], conversations)
+                self.copy(ConversationMember, ["conversation", "user", "last_message_at"], (
+                    (conversation[0], user_id, conversation[4])
+                    for conversation in conversations for user_id in conversation[1:3]
+                ))
+            self.stdout.write(f"  chat: {len(pairs)} conversations, {messages_total} messages")
+        self.stdout.write(
+            f"chat: {len(pairs)} conversations, {messages_total} messages in {time.monotonic() - began:.1f}s"
+        )
+
+    # ---------- Events and jobs ----------
+
+    def generate_listings(self, model, count):
+        n = self.options["users"]
+        id0 = self.next_id(model)
+        interest = array("l", (heavy_tail(self.rng, self.options["interest"], 1.3, n) for _ in range(count)))
+
+        def rows():
+            for i in range(count):
+                creator = self.popular.pick()
+                created = self.after(self.joined[creator], 86400 * 30)
+                title = self.text(2, 6).title()
+                common = (id0 + i, title, self.text(20, 80), self.rng.choice(CITIES), self.user_id0 + creator)
+                stamps = (self.at(created), self.at(created), interest[i])
+                if model is Event:
+                    start = self.at(created) + timedelta(days=self.rng.uniform(1, 60))
+                    yield common + (start, start + timedelta(hours=self.rng.randint(1, 8))) + stamps
+                else:
+                    deadline = (self.at(created) + timedelta(days=self.rng.randint(7, 90))).date()
+                    salary = f"${self.rng.randint(3, 15) * 10}k - ${self.rng.randint(16, 30) * 10}k"
+                    yield common + (self.rng.choice(COMPANIES), salary, deadline) + stamps
+
+        extra = ["start_time", "end_time"] if model is Event else ["company_name", "salary_range", "deadline"]
+        self.load(model, [
+            "id", "title", "description", "location", "created_by", *extra, "created_at", "updated_at",
+            "interested_count",
+        ], rows())
+
+        field = model._meta.get_field("interested_users")
+        self.load(field.remote_field.through, [field.m2m_field_name(), field.m2m_reverse_field_name()], (
+            (id0 + i, self.user_id0 + user) for i in range(count) for user in self.distinct_users(interest[i])
+        ))
@@ -0,0 +1,55 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import F, Max, Min
+
+from social_hub.counters import COUNTERS, count_subquery
+
+
+class Command(BaseCommand):
+    help = "Recount denormalized counters (likes, comments, interest) and repair drift, in primary-key chunks."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=5000)
+        parser.add_argument(
+            "--model",
+            action="append",
+            dest="models",
+            help="Only recount this model, e.g. posts.Post (repeatable).",
+        )
+        parser.add_argument("--dry-run", action="store_true", help="Report drift without fixing it.")
+
+    def handle(self, *args, chunk_size, models, dry_run, **options):
+        labels = {label.lower() for label in models or []}
+        known = {label.lower() for label, _, _ in COUNTERS}
+        unknown = labels - known
+        if unknown:
+            raise CommandError(f"No counters for: {', '.join(sorted(unknown))}")
+
+        for label, field, relation in COUNTERS:
+            if labels and label.lower() not in labels:
+                continue
+            model = apps.get_model(label)
+            drifted = self.recount(model, field, relation, chunk_size, dry_run)
+            verb = "drifted" if dry_run else "repaired"
+            self.stdout.write(f"{label}.{field}: {drifted} rows {verb}")
+
+    def recount(self, model, field, relation, chunk_size, dry_run):
+        bounds = model.objects.aggregate(low=Min("pk"), high=Max("pk"))
+        if bounds["low"] is None:
+            return 0
+
+        drifted = 0
+        for start in range(bounds["low"], bounds["high"] + 1, chunk_size):
+            chunk = model.objects.filter(pk__gte=start, pk__lt=start + chunk_size)
+            with transaction.atomic():
+                pks = list(
+                    chunk.annotate(actual=count_subquery(model, relation))
+                    .exclude(**{field: F("actual")})
+                    .values_list("pk", flat=True)
+                )
+                if pks and not dry_run:
+                    # recompute inside the UPDATE so concurrent toggles aren't overwritten
+                    model.objects.filter(pk__in=pks).update(**{field: count_subquery(model, relation)})
+            drifted += len(pks)
+        return drifted
@@ -0,0 +1,39 @@
+# Generated by Django 5.1.7 on 2026-10-18 13:45
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations
+
+
+# Keep search_vector in step with content on every INSERT and on any UPDATE
+# that touches content. Must match SEARCH_CONFIG in posts/search.py.
+CREATE_TRIGGER = """
+CREATE TRIGGER posts_post_search_vector_update
+BEFORE INSERT OR UPDATE OF content ON posts_post
+FOR EACH ROW EXECUTE FUNCTION
+tsvector_update_trigger(search_vector, 'pg_catalog.english', content);
+"""
+
+DROP_TRIGGER = "DROP TRIGGER IF EXISTS posts_post_search_vector_update ON posts_post;"
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_like_like_post_created_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='post_search_vector_idx'),
+        ),
+        migrations.RunSQL(CREATE_TRIGGER, DROP_TRIGGER),
+    ]
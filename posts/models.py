@@ -1,6 +1,16 @@
 # posts/models.py
 from django.db import models
 from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+
+
+class PostManager(models.Manager):
+    def get_queryset(self):
+        # the tsvector is for the database to search; often bigger than the
+        # content, and nothing reads it in Python
+        return super().get_queryset().defer("search_vector")
+
 
 class Post(models.Model):
     author = models.ForeignKey(
@@ -11,6 +21,27 @@ class Post(models.Model):
     content = models.TextField()
     media = models.FileField(upload_to="post_media/", blank=True, null=True)  # supports image/video
     created_at = models.DateTimeField(auto_now_add=True)
+    # also moved by counter changes (social_hub.counters), so it versions
+    # everything the API shows for the post
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # denormalized counters, kept in step by the like/comment views
+    likes_count = models.PositiveIntegerField(default=0)
+    comments_count = models.PositiveIntegerField(default=0)
+
+    # to_tsvector('english', content), kept current by a database trigger
+    # (see migration 0014); backfill old rows with `backfill_search_vectors`
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = PostManager()
+
+    class Meta:
+        indexes = [
+            # keyset pagination: (created_at, id) globally and per author
+            models.Index(fields=["-created_at", "-id"], name="post_created_idx"),
+            models.Index(fields=["author", "-created_at", "-id"], name="post_author_created_idx"),
+            GinIndex(fields=["search_vector"], name="post_search_vector_idx"),
+        ]
 
     def __str__(self):
         return f"{self.author.username} - {self.content[:30]}"
@@ -24,6 +55,10 @@ class Like(models.Model):
     class Meta:
         unique_together = ("user", "post")  # prevent duplicate likes
         ordering = ["-created_at"]
+        indexes = [
+            # liker previews and the paginated likers list
+            models.Index(fields=["post", "-created_at", "-id"], name="like_post_created_idx"),
+        ]
 
     def __str__(self):
         return f"{self.user.username} liked Post {self.post.id}"
@@ -41,9 +76,13 @@ class Comment(models.Model):
         related_name="liked_comments",
         blank=True
     )
+    likes_count = models.PositiveIntegerField(default=0)
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["post", "-created_at", "-id"], name="comment_post_created_idx"),
+        ]
 
     def __str__(self):
         return f"{self.user.username} commented on Post {self.post.id}"
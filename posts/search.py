@@ -0,0 +1,40 @@
+# posts/search.py
+"""
+Full-text search over post content.
+
+``Post.search_vector`` holds ``to_tsvector(SEARCH_CONFIG, content)``. A
+trigger keeps it current and a GIN index covers it. Queries are parsed with
+``websearch_to_tsquery``, so clients can use quotes, ``or`` and ``-term``.
+"""
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank
+from django.db.models import F, FloatField
+from django.db.models.functions import Cast
+
+from .models import Post
+
+
+SEARCH_CONFIG = "english"
+
+
+def search_posts(text, queryset=None):
+    """
+    Posts matching `text`, annotated with `rank` (ts_rank) and `headline`
+    (a snippet with the matched terms wrapped in <mark>).
+    """
+    if queryset is None:
+        queryset = Post.objects.all()
+    query = SearchQuery(text, search_type="websearch", config=SEARCH_CONFIG)
+    return queryset.filter(search_vector=query).annotate(
+        # ts_rank returns real; casting to double precision lets the rank
+        # round-trip exactly through the pagination cursor
+        rank=Cast(SearchRank(F("search_vector"), query), FloatField()),
+        headline=SearchHeadline(
+            "content",
+            query,
+            config=SEARCH_CONFIG,
+            start_sel="<mark>",
+            stop_sel="</mark>",
+            max_words=35,
+            min_words=15,
+        ),
+    )
@@ -1,20 +1,55 @@
 # posts/serializers.py
+from django.conf import settings
+from django.db.models import F, Prefetch, Window, prefetch_related_objects
+from django.db.models.functions import RowNumber
 from rest_framework import serializers
+from . import like_buffer
 from .models import Post, Comment, Like
-from users.serializers import UserSerializer
+from users.models import CustomUser
+from users.serializers import UserSerializer, UserSummaryField, user_summaries
+from social_hub.fields import ViewerLinkField, viewer_links
+from social_hub.serializers import SparseFieldsMixin, expanded_fields, selected_fields
 
 
 class LikeSerializer(serializers.ModelSerializer):
-    user = UserSerializer(read_only=True)
+    user = UserSummaryField()
 
     class Meta:
         model = Like
         fields = ["id", "user", "created_at"]
 
 
-class PostSerializer(serializers.ModelSerializer):
-    author = UserSerializer(read_only=True)
-    likes_count = serializers.SerializerMethodField()
+def liked_by_previews(post_ids, size=None):
+    """
+    Map post id -> the `size` most recent likers, for many posts in one
+    windowed query (ROW_NUMBER() OVER (PARTITION BY post_id ...)).
+    """
+    if size is None:
+        size = settings.POSTS_LIKED_BY_PREVIEW_SIZE
+    previews = {post_id: [] for post_id in post_ids}
+    if not previews or size <= 0:
+        return previews
+    likes = (
+        Like.objects.filter(post_id__in=previews)
+        .annotate(
+            row=Window(
+                RowNumber(),
+                partition_by=F("post_id"),
+                order_by=[F("created_at").desc(), F("id").desc()],
+            )
+        )
+        .filter(row__lte=size)
+        .select_related("user")
+        .order_by("post_id", "row")
+    )
+    for like in likes:
+        previews[like.post_id].append(like.user)
+    return previews
+
+
+class PostSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    author = UserSummaryField()
+    liked_by_me = ViewerLinkField("likes")
     liked_by_users = serializers.SerializerMethodField()
 
     class Meta:
@@ -26,100 +61,98 @@ class PostSerializer(serializers.ModelSerializer):
             "media",
             "created_at",
             "likes_count",
+            "comments_count",
+            "liked_by_me",
             "liked_by_users",
         ]
-        read_only_fields = ["id", "author", "created_at"]
-
-    def _get_like_queryset(self, obj):
-        # handles reverse relation whether it's 'likes' or 'like_set'
-        if hasattr(obj, "likes"):
-            return obj.likes.all()
-        return obj.like_set.all()
-
-    def get_likes_count(self, obj):
-        return self._get_like_queryset(obj).count()
+        read_only_fields = ["id", "author", "created_at", "likes_count", "comments_count"]
+        # ?expand=liked_by_users adds the liker preview, ?expand=author the full profile
+        expandable_fields = {
+            "liked_by_users": None,
+            "author": lambda: UserSerializer(read_only=True),
+        }
+
+    # change with every like and comment, so cached posts don't depend on
+    # them (see posts.signals) and get them refreshed with refresh_live_fields
+    live_fields = ("likes_count", "comments_count", "liked_by_me", "liked_by_users")
+
+    @classmethod
+    def prefetch_page(cls, posts, context):
+        data = cls._prefetch_likes(posts, context, selected_fields(cls, context))
+        if "author" in expanded_fields(cls, context):
+            data.update(viewer_links(
+                UserSerializer, [post.author for post in posts], context, fields=UserSerializer.Meta.fields
+            ))
+        return data
+
+    @classmethod
+    def _prefetch_likes(cls, posts, context, fields):
+        data = viewer_links(cls, posts, context, fields=fields)
+        if "liked_by_users" in fields:
+            data["liked_by_previews"] = liked_by_previews([post.pk for post in posts])
+        if like_buffer.is_enabled() and ("likes_count" in fields or "liked_by_me" in fields):
+            like_buffer.apply_pending(
+                posts,
+                data.get(cls._declared_fields["liked_by_me"].context_key(Post)),
+                getattr(context.get("request"), "user", None),
+                counts="likes_count" in fields,
+            )
+        return data
+
+    @classmethod
+    def refresh_live_fields(cls, items, context):
+        """
+        Bring the live fields of already serialized posts (`items` maps post
+        id -> data, e.g. from the response cache) up to date for the
+        request in `context`: one query for the counters, one per viewer or
+        preview field selected.
+        """
+        fields = [name for name in selected_fields(cls, context) if name in cls.live_fields]
+        if not fields or not items:
+            return
+        posts = Post.objects.only("id", "likes_count", "comments_count").in_bulk(list(items))
+        data = cls._prefetch_likes(list(posts.values()), context, fields)
+        liked_ids = data.get(cls._declared_fields["liked_by_me"].context_key(Post))
+        for post_id, item in items.items():
+            post = posts.get(post_id)
+            if post is None:
+                # deleted since; its tags make the entry unreachable from now on
+                continue
+            if "likes_count" in fields:
+                item["likes_count"] = post.likes_count
+            if "comments_count" in fields:
+                item["comments_count"] = post.comments_count
+            if "liked_by_me" in fields:
+                item["liked_by_me"] = post_id in liked_ids
+            if "liked_by_users" in fields:
+                item["liked_by_users"] = user_summaries(data["liked_by_previews"][post_id], context)
+
+    def to_representation(self, instance):
+        if self.parent is None:
+            # a post rendered on its own (detail, create and update responses)
+            # is a page of one: viewer flags and buffered likes as on a list
+            self.context.update(self.prefetch_page([instance], self.context))
+        return super().to_representation(instance)
 
     def get_liked_by_users(self, obj):
-        qs = self._get_like_queryset(obj).select_related("user")
-        users = [like.user for like in qs]
-        return UserSerializer(users, many=True, context=self.context).data
-
-
-class CommentSerializer(serializers.ModelSerializer):
-    user = UserSerializer(read_only=True)
-    likes_count = serializers.SerializerMethodField()
-    liked_by_users = serializers.SerializerMethodField()
-
-    class Meta:
-        model = Comment
-        fields = [
-            "id",
-            "post",
-            "user",
-            "content",
-            "created_at",
-            "likes_count",
-            "liked_by_users",
-        ]
-        read_only_fields = ["id", "post", "user", "created_at"]
+        # bounded preview; the full list is paginated at /api/posts/<pk>/likes/
+        previews = self.context.get("liked_by_previews")
+        if previews is None or obj.pk not in previews:
+            previews = liked_by_previews([obj.pk])
+        return user_summaries(previews[obj.pk], self.context)
 
-    def get_likes_count(self, obj):
-        # Comment has a ManyToManyField `liked_by`
-        return obj.liked_by.count()
 
-    def get_liked_by_users(self, obj):
-        users_qs = obj.liked_by.all()
-        return UserSerializer(users_qs, many=True, context=self.context).data
-# posts/serializers.py
-from rest_framework import serializers
-from .models import Post, Comment, Like
-from users.serializers import UserSerializer
+class PostSearchSerializer(PostSerializer):
+    rank = serializers.FloatField(read_only=True)
+    headline = serializers.CharField(read_only=True)
 
+    class Meta(PostSerializer.Meta):
+        fields = PostSerializer.Meta.fields + ["rank", "headline"]
 
-class LikeSerializer(serializers.ModelSerializer):
-    user = UserSerializer(read_only=True)
 
-    class Meta:
-        model = Like
-        fields = ["id", "user", "created_at"]
-
-
-class PostSerializer(serializers.ModelSerializer):
-    author = UserSerializer(read_only=True)
-    likes_count = serializers.SerializerMethodField()
-    liked_by_users = serializers.SerializerMethodField()
-
-    class Meta:
-        model = Post
-        fields = [
-            "id",
-            "author",
-            "content",
-            "media",
-            "created_at",
-            "likes_count",
-            "liked_by_users",
-        ]
-        read_only_fields = ["id", "author", "created_at"]
-
-    def _get_like_queryset(self, obj):
-        # handles reverse relation whether it's 'likes' or 'like_set'
-        if hasattr(obj, "likes"):
-            return obj.likes.all()
-        return obj.like_set.all()
-
-    def get_likes_count(self, obj):
-        return self._get_like_queryset(obj).count()
-
-    def get_liked_by_users(self, obj):
-        qs = self._get_like_queryset(obj).select_related("user")
-        users = [like.user for like in qs]
-        return UserSerializer(users, many=True, context=self.context).data
-
-
-class CommentSerializer(serializers.ModelSerializer):
-    user = UserSerializer(read_only=True)
-    likes_count = serializers.SerializerMethodField()
+class CommentSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    user = UserSummaryField()
+    liked_by_me = ViewerLinkField("liked_by")
     liked_by_users = serializers.SerializerMethodField()
 
     class Meta:
@@ -131,14 +164,27 @@ class CommentSerializer(serializers.ModelSerializer):
             "content",
             "created_at",
             "likes_count",
+            "liked_by_me",
             "liked_by_users",
         ]
-        read_only_fields = ["id", "post", "user", "created_at"]
-
-    def get_likes_count(self, obj):
-        # Comment has a ManyToManyField `liked_by`
-        return obj.liked_by.count()
+        read_only_fields = ["id", "post", "user", "created_at", "likes_count"]
+        expandable_fields = {
+            "liked_by_users": None,
+            "user": lambda: UserSerializer(read_only=True),
+        }
+
+    @classmethod
+    def prefetch_page(cls, comments, context):
+        data = viewer_links(cls, comments, context)
+        if "user" in expanded_fields(cls, context):
+            data.update(viewer_links(
+                UserSerializer, [comment.user for comment in comments], context, fields=UserSerializer.Meta.fields
+            ))
+        if "liked_by_users" in selected_fields(cls, context):
+            # the likers of the whole page in one query instead of one per comment
+            likers = CustomUser.objects.only("id", "username", "profile_pic")
+            prefetch_related_objects(comments, Prefetch("liked_by", queryset=likers))
+        return data
 
     def get_liked_by_users(self, obj):
-        users_qs = obj.liked_by.all()
-        return UserSerializer(users_qs, many=True, context=self.context).data
+        return user_summaries(obj.liked_by.all(), self.context)
@@ -0,0 +1,20 @@
+# posts/signals.py
+"""
+Invalidate cached responses (social_hub.cache) when posts change.
+
+Likes and comments don't invalidate anything: the counters and viewer
+flags they move are refreshed on every cache hit (posts.views.PostCacheMixin).
+"""
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from social_hub.cache import invalidate
+from .models import Post
+
+
+@receiver([post_save, post_delete], sender=Post)
+def post_changed(sender, instance, **kwargs):
+    transaction.on_commit(partial(invalidate, f"post:{instance.pk}", f"user_posts:{instance.author_id}"))
@@ -1,3 +1,426 @@
-from django.test import TestCase
+import io
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection
+from django.db.models.signals import post_delete
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from social_hub.counters import adjust_counter
+from social_hub.relations import add_link, remove_link
+from social_hub.testing import APITestCase, make_user
+from users.models import UserFollow
+from . import like_buffer, timeline
+from .models import Comment, Like, Post
+from .search import search_posts
+from .serializers import PostSerializer
+
+
+@override_settings(TIMELINE={"BACKEND": "posts.timeline.InMemoryTimelineStore", "FANOUT_FOLLOWER_LIMIT": 2})
+class TimelineTests(TestCase):
+    def setUp(self):
+        timeline.get_timeline_store.cache_clear()
+        self.author = make_user("author")
+        self.readers = [make_user(f"reader{i}") for i in range(3)]
+        for reader in self.readers:
+            UserFollow.objects.create(follower=reader, following=self.author)
+            timeline.rebuild(reader.id)
+
+    def post(self):
+        post = Post.objects.create(author=self.author, content="hello")
+        timeline.fan_out_post(post)
+        return post
+
+    def test_celebrity_posts_are_merged_in_on_read(self):
+        post = self.post()
+        store = timeline.get_timeline_store()
+        self.assertTrue(store.is_celebrity(self.author.id))
+        self.assertEqual(store.range(self.readers[0].id), [])
+        self.assertEqual(timeline.home_feed_ids(self.readers[0].id), [post.id])
+
+    def test_author_back_under_the_limit_is_no_longer_a_celebrity(self):
+        first = self.post()
+        UserFollow.objects.filter(follower=self.readers[2]).delete()
+        second = self.post()
+
+        store = timeline.get_timeline_store()
+        self.assertFalse(store.is_celebrity(self.author.id))
+        for reader in self.readers[:2]:
+            self.assertEqual(store.range(reader.id), [second.id, first.id])
+
+
+class CounterTests(APITestCase):
+    def setUp(self):
+        self.user = make_user("reader")
+        self.post = Post.objects.create(author=make_user("author"), content="hello")
+        self.client.force_authenticate(self.user)
+
+    def counts(self):
+        self.post.refresh_from_db()
+        return self.post.likes_count, self.post.comments_count
+
+    def test_counters_follow_likes_and_comments(self):
+        like_url = reverse("post-like", args=[self.post.pk])
+        self.client.post(like_url)
+        self.assertEqual(self.counts(), (1, 0))
+        self.client.post(like_url)
+        self.assertEqual(self.counts(), (0, 0))
+
+        response = self.client.post(reverse("comment-list-create", args=[self.post.pk]), {"content": "nice"})
+        self.assertEqual(self.counts(), (0, 1))
+        self.client.delete(reverse("comment-detail", args=[response.data["id"]]))
+        self.assertEqual(self.counts(), (0, 0))
+
+    def test_counters_never_go_below_zero(self):
+        adjust_counter(Post, self.post.pk, "likes_count", -1)
+        self.assertEqual(self.counts(), (0, 0))
+
+    def test_recount_repairs_drift(self):
+        Like.objects.create(post=self.post, user=self.user)
+        Comment.objects.create(post=self.post, user=self.user, content="nice")
+        Post.objects.filter(pk=self.post.pk).update(likes_count=7)
+
+        out = io.StringIO()
+        call_command("recount_counters", "--model", "posts.Post", "--dry-run", stdout=out)
+        self.assertIn("posts.Post.likes_count: 1 rows drifted", out.getvalue())
+        self.assertEqual(self.counts(), (7, 0))
+
+        call_command("recount_counters", stdout=io.StringIO())
+        self.assertEqual(self.counts(), (1, 1))
+
+
+class LikersTests(APITestCase):
+    def setUp(self):
+        self.post = Post.objects.create(author=make_user("author"), content="hello")
+        self.comment = Comment.objects.create(post=self.post, user=self.post.author, content="first")
+        self.fans = [make_user(f"fan{i}") for i in range(3)]
+        for fan in self.fans:
+            self.client.force_authenticate(fan)
+            self.client.put(reverse("post-like", args=[self.post.pk]))
+            self.client.put(reverse("comment-like", args=[self.comment.pk]))
+
+    def assertPages(self, url, key):
+        response = self.client.get(url, {"page_size": 2})
+        self.assertEqual(response.data["count"], 3)
+        self.assertEqual([user["username"] for user in response.data[key]], ["fan2", "fan1"])
+        response = self.client.get(response.data["next"])
+        self.assertEqual([user["username"] for user in response.data[key]], ["fan0"])
+        self.assertIsNone(response.data["next"])
+
+    def test_post_likers_are_paginated(self):
+        self.assertPages(reverse("post-likers", args=[self.post.pk]), "results")
+
+    def test_comment_likers_are_paginated(self):
+        self.assertPages(reverse("comment-like", args=[self.comment.pk]), "likes")
+
+
+class SearchTests(APITestCase):
+    def setUp(self):
+        author = make_user("author")
+        self.posts = [
+            Post.objects.create(author=author, content=content)
+            for content in [
+                "Remote work with Python",
+                "Remote work, remote work and more remote work",
+                "Remote teams that work async",
+                "Back to the office",
+            ]
+        ]
+        self.client.force_authenticate(author)
+
+    def test_search_posts(self):
+        matches = search_posts("remote work").order_by("-rank", "-id")
+        self.assertEqual(matches[0], self.posts[1])
+        self.assertEqual(set(matches), set(self.posts[:3]))
+        self.assertEqual(set(search_posts('"remote work" -python')), {self.posts[1]})
+        self.assertIn("<mark>", matches[0].headline)
+
+    def test_results_are_paginated_by_rank(self):
+        expected = list(search_posts("remote work").order_by("-rank", "-id").values_list("id", flat=True))
+        response = self.client.get(reverse("post-search"), {"q": "remote work", "page_size": 2})
+        ids = [post["id"] for post in response.data["results"]]
+        response = self.client.get(response.data["next"])
+        ids += [post["id"] for post in response.data["results"]]
+        self.assertEqual(ids, expected)
+        self.assertIsNone(response.data["next"])
+
+    def test_search_vector_is_not_loaded(self):
+        self.assertIn("search_vector", Post.objects.get(pk=self.posts[0].pk).get_deferred_fields())
+
+
+class LinkTests(TestCase):
+    def setUp(self):
+        self.user = make_user("liker")
+        self.post = Post.objects.create(author=make_user("author"), content="hello")
+
+    def link_queries(self, queries):
+        table = Like._meta.db_table
+        return [query["sql"].split(" ", 1)[0] for query in queries if f'"{table}"' in query["sql"]]
+
+    def test_remove_link_is_a_single_delete(self):
+        add_link(Post, "likes", self.post.pk, self.user)
+        # a receiver would make the ORM's delete() collect (SELECT) the rows first
+        def receiver(**kwargs):
+            pass
+        post_delete.connect(receiver, sender=Like)
+        self.addCleanup(post_delete.disconnect, receiver, sender=Like)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertTrue(remove_link(Post, "likes", self.post.pk, self.user))
+        self.assertEqual(self.link_queries(queries), ["DELETE"])
+        self.assertFalse(Like.objects.exists())
+
+    def test_add_and_remove_are_idempotent(self):
+        self.assertTrue(add_link(Post, "likes", self.post.pk, self.user))
+        self.assertFalse(add_link(Post, "likes", self.post.pk, self.user))
+        self.assertTrue(remove_link(Post, "likes", self.post.pk, self.user))
+        self.assertFalse(remove_link(Post, "likes", self.post.pk, self.user))
+
+
+class SparseFieldsTests(APITestCase):
+    def setUp(self):
+        self.user = make_user("reader")
+        self.post = Post.objects.create(author=make_user("author"), content="hello")
+        add_link(Post, "likes", self.post.pk, self.user)
+        self.client.force_authenticate(self.user)
+
+    def get_post(self, **params):
+        response = self.client.get(reverse("post-list-create"), params)
+        self.assertEqual(response.status_code, 200)
+        return response.data["results"][0]
+
+    def test_fields_limits_the_response(self):
+        self.assertEqual(set(self.get_post(fields="id,content")), {"id", "content"})
+
+    def test_heavy_fields_are_opt_in(self):
+        self.assertNotIn("liked_by_users", self.get_post())
+        post = self.get_post(expand="liked_by_users")
+        self.assertEqual([user["username"] for user in post["liked_by_users"]], ["reader"])
+
+    def test_expand_swaps_the_summary_for_the_full_profile(self):
+        self.assertNotIn("following", self.get_post()["author"])
+        self.assertFalse(self.get_post(expand="author")["author"]["following"])
+
+    def test_plain_django_request(self):
+        request = RequestFactory().get("/", {"fields": "id,content"})
+        data = PostSerializer(self.post, context={"request": request}).data
+        self.assertEqual(dict(data), {"id": self.post.id, "content": "hello"})
+
+
+class ConditionalGetTests(APITestCase):
+    def setUp(self):
+        self.author = make_user("author")
+        self.viewer = make_user("viewer")
+        self.post = Post.objects.create(author=self.author, content="hello")
+        self.client.force_authenticate(self.viewer)
+
+    def get(self, url, params=None, **headers):
+        return self.client.get(url, params, headers=headers)
+
+    def test_detail_answers_304_until_the_post_or_its_author_changes(self):
+        url = reverse("post-detail", args=[self.post.pk])
+        response = self.get(url)
+        etag, last_modified = response["ETag"], response["Last-Modified"]
+        self.assertEqual(self.get(url, if_none_match=etag).status_code, 304)
+        self.assertEqual(self.get(url, if_modified_since=last_modified).status_code, 304)
+
+        self.author.username = "renamed"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.author.save()
+        response = self.get(url, if_none_match=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_list_is_validated_by_etag_only(self):
+        url = reverse("posts-by-user", args=[self.author.pk])
+        Post.objects.create(author=self.author, content="second")
+        response = self.get(url)
+        self.assertNotIn("Last-Modified", response)
+        etag = response["ETag"]
+        self.assertEqual(self.get(url, if_none_match=etag).status_code, 304)
+
+        # deleting a row doesn't move max(updated_at)
+        self.post.delete()
+        self.assertEqual(self.get(url, if_none_match=etag).status_code, 200)
+
+    def test_etag_follows_the_viewer_following_the_author(self):
+        params = {"expand": "author"}
+        detail_url = reverse("post-detail", args=[self.post.pk])
+        list_url = reverse("posts-by-user", args=[self.author.pk])
+        detail = self.get(detail_url, params)
+        # per-viewer state has no modification time
+        self.assertNotIn("Last-Modified", detail)
+        etags = {detail_url: detail["ETag"], list_url: self.get(list_url, params)["ETag"]}
+        for url, etag in etags.items():
+            self.assertEqual(self.get(url, params, if_none_match=etag).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            UserFollow.objects.create(follower=self.viewer, following=self.author)
+        response = self.get(detail_url, params, if_none_match=etags[detail_url])
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data["author"]["following"])
+        response = self.get(list_url, params, if_none_match=etags[list_url])
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data["results"][0]["author"]["following"])
+
+
+class PostCacheTests(APITestCase):
+    def setUp(self):
+        caches["default"].clear()
+        caches["local"].clear()
+        self.author = make_user("author")
+        self.viewers = [make_user("viewer0"), make_user("viewer1")]
+        self.post = Post.objects.create(author=self.author, content="hello")
+
+    def get(self, viewer, url, params=None):
+        self.client.force_authenticate(viewer)
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def assertHit(self, response):
+        self.assertIn(response["X-Cache"], ("HIT-LOCAL", "HIT"))
+
+    def test_likes_and_comments_are_refreshed_on_a_hit(self):
+        url = reverse("post-detail", args=[self.post.pk])
+        self.assertEqual(self.get(self.viewers[0], url)["X-Cache"], "MISS")
+        self.client.put(reverse("post-like", args=[self.post.pk]))
+        self.client.post(reverse("comment-list-create", args=[self.post.pk]), {"content": "nice"})
+
+        response = self.get(self.viewers[0], url)
+        self.assertHit(response)
+        self.assertEqual(response.data["likes_count"], 1)
+        self.assertEqual(response.data["comments_count"], 1)
+        self.assertTrue(response.data["liked_by_me"])
+
+        # shared with other viewers, each with their own liked_by_me
+        response = self.get(self.viewers[1], url)
+        self.assertHit(response)
+        self.assertFalse(response.data["liked_by_me"])
+
+    def test_detail_follows_its_author(self):
+        url = reverse("post-detail", args=[self.post.pk])
+        self.get(self.viewers[0], url)
+        self.author.username = "renamed"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.author.save()
+        response = self.get(self.viewers[0], url)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.data["author"]["username"], "renamed")
+
+    def test_invalidated_once_the_write_commits(self):
+        url = reverse("post-detail", args=[self.post.pk])
+        self.get(self.viewers[0], url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.content = "edited"
+            self.post.save()
+            # a read before the commit still gets the entry of the committed
+            # post, instead of refilling the next version from this write
+            response = self.get(self.viewers[0], url)
+            self.assertHit(response)
+            self.assertEqual(response.data["content"], "hello")
+        response = self.get(self.viewers[0], url)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.data["content"], "edited")
+
+    def test_hit_takes_the_author_from_the_version_stamp(self):
+        url = reverse("post-detail", args=[self.post.pk])
+        self.get(self.viewers[0], url)
+        # the version stamp, then the live fields and the viewer's like
+        with self.assertNumQueries(3):
+            self.assertHit(self.get(self.viewers[0], url))
+
+    def test_list_is_refreshed_on_a_hit(self):
+        url = reverse("posts-by-user", args=[self.author.pk])
+        self.get(self.viewers[0], url, {"expand": "liked_by_users"})
+        self.client.put(reverse("post-like", args=[self.post.pk]))
+
+        response = self.get(self.viewers[1], url, {"expand": "liked_by_users"})
+        self.assertHit(response)
+        [post] = response.data["results"]
+        self.assertEqual(post["likes_count"], 1)
+        self.assertFalse(post["liked_by_me"])
+        self.assertEqual([user["username"] for user in post["liked_by_users"]], ["viewer0"])
+
+    def test_list_without_ids_is_not_cached(self):
+        url = reverse("posts-by-user", args=[self.author.pk])
+        self.assertNotIn("X-Cache", self.get(self.viewers[0], url, {"fields": "likes_count"}))
+        self.assertIn("X-Cache", self.get(self.viewers[0], url, {"fields": "id,likes_count"}))
+
+
+@override_settings(LIKE_BUFFER={"ENABLED": True, "BACKEND": "posts.like_buffer.InMemoryLikeBuffer"})
+class LikeBufferTests(APITestCase):
+    def setUp(self):
+        like_buffer.get_like_buffer.cache_clear()
+        self.post = Post.objects.create(author=make_user("author"), content="viral")
+        self.fans = [make_user(f"fan{i}") for i in range(3)]
+        self.client.force_authenticate(self.fans[0])
+
+    def like(self, user):
+        like_buffer.record(self.post.pk, user.pk, True)
+
+    def test_detail_shows_buffered_likes(self):
+        url = reverse("post-detail", args=[self.post.pk])
+        etag = self.client.get(url)["ETag"]
+        response = self.client.put(reverse("post-like", args=[self.post.pk]))
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse(Like.objects.exists())
+
+        response = self.client.get(url, headers={"if-none-match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["likes_count"], 1)
+        self.assertTrue(response.data["liked_by_me"])
+
+    def test_flush_writes_the_buffer(self):
+        for fan in self.fans:
+            self.like(fan)
+        like_buffer.record(self.post.pk, self.fans[2].pk, False)
+        self.assertEqual(like_buffer.flush(), {"posts": 1, "likes": 2, "unlikes": 1})
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 2)
+        self.assertEqual(like_buffer.get_like_buffer().pending([self.post.pk]), ({}, {}))
+
+    def test_flush_moves_the_counter_without_recounting(self):
+        Like.objects.create(post=self.post, user=self.fans[1])
+        # drift the flush must leave to recount_counters
+        Post.objects.filter(pk=self.post.pk).update(likes_count=10)
+        self.like(self.fans[0])
+        like_buffer.record(self.post.pk, self.fans[1].pk, False)
+        self.like(self.fans[2])
+        with CaptureQueriesContext(connection) as queries:
+            like_buffer.flush()
+        self.assertFalse(any("COUNT(" in query["sql"] for query in queries))
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 11)
+
+    def test_crash_before_writing_is_replayed(self):
+        for fan in self.fans:
+            self.like(fan)
+        # the flusher claimed the intents and died
+        self.assertEqual(like_buffer.get_like_buffer().claim(self.post.pk), like_buffer.CLAIMED)
+        self.like(make_user("latecomer"))
+
+        like_buffer.flush()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 4)
+        self.assertEqual(Like.objects.count(), 4)
+
+    def test_crash_after_commit_counts_once(self):
+        for fan in self.fans:
+            self.like(fan)
+        buffer = like_buffer.get_like_buffer()
+        with mock.patch.object(buffer, "finish", side_effect=RuntimeError("flusher died")):
+            with self.assertRaises(RuntimeError):
+                like_buffer.flush()
+        # the rows are written but the snapshot and its delta are still there
+        self.assertEqual(Like.objects.count(), 3)
+
+        like_buffer.flush()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 3)
+        self.assertEqual(buffer.pending([self.post.pk]), ({}, {}))
+
+        response = self.client.get(reverse("post-detail", args=[self.post.pk]))
+        self.assertEqual(response.data["likes_count"], 3)
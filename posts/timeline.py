@@ -0,0 +1,341 @@
+# posts/timeline.py
+"""
+Home timelines built with fan-out-on-write.
+
+Each user has a capped timeline of post IDs. When a post is created its ID is
+pushed onto the author's timeline and onto the timeline of every follower.
+Authors with more than ``FANOUT_FOLLOWER_LIMIT`` followers skip the push. They
+are remembered as "celebrities", and their posts are merged in when a feed is
+read (fan-out-on-read).
+
+The store backend is configured with ``settings.TIMELINE["BACKEND"]``.
+``RedisTimelineStore`` is used in production and ``InMemoryTimelineStore`` in
+tests.
+"""
+import threading
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from users.models import UserFollow
+from .models import Post
+
+
+DEFAULTS = {
+    "BACKEND": "posts.timeline.RedisTimelineStore",
+    "REDIS_URL": None,
+    "MAX_LENGTH": 800,
+    "FANOUT_FOLLOWER_LIMIT": 10000,
+    "TTL": 60 * 60 * 24 * 14,
+}
+
+
+def timeline_settings():
+    return {**DEFAULTS, **getattr(settings, "TIMELINE", {})}
+
+
+# ---------- Stores ----------
+
+class BaseTimelineStore:
+    """
+    Interface for timeline stores. Timelines are sets of post IDs, read newest
+    first. A timeline that was never built does not "exist", which tells the
+    caller to rebuild it from the database.
+    """
+
+    def __init__(self, max_length, ttl=None, **options):
+        self.max_length = max_length
+        self.ttl = ttl
+
+    def exists(self, user_id):
+        raise NotImplementedError
+
+    def push(self, user_ids, post_id):
+        """Add `post_id` to every existing timeline in `user_ids`."""
+        raise NotImplementedError
+
+    def add(self, user_id, post_ids, create=False):
+        """Add several posts to one timeline, creating it when `create` is set."""
+        raise NotImplementedError
+
+    def remove(self, user_id, post_ids):
+        raise NotImplementedError
+
+    def range(self, user_id, max_id=None, limit=20):
+        """Return up to `limit` post IDs lower than `max_id`, newest first."""
+        raise NotImplementedError
+
+    def mark_celebrity(self, author_id):
+        raise NotImplementedError
+
+    def unmark_celebrity(self, author_id):
+        raise NotImplementedError
+
+    def is_celebrity(self, author_id):
+        raise NotImplementedError
+
+    def celebrities(self):
+        raise NotImplementedError
+
+
+class InMemoryTimelineStore(BaseTimelineStore):
+    """Process-local store. Used by the test settings."""
+
+    def __init__(self, max_length, ttl=None, **options):
+        super().__init__(max_length, ttl)
+        self._timelines = {}
+        self._celebrities = set()
+        self._lock = threading.Lock()
+
+    def _trim(self, ids):
+        if len(ids) > self.max_length:
+            for post_id in sorted(ids)[: len(ids) - self.max_length]:
+                ids.discard(post_id)
+
+    def exists(self, user_id):
+        return user_id in self._timelines
+
+    def push(self, user_ids, post_id):
+        with self._lock:
+            for user_id in user_ids:
+                ids = self._timelines.get(user_id)
+                if ids is not None:
+                    ids.add(post_id)
+                    self._trim(ids)
+
+    def add(self, user_id, post_ids, create=False):
+        with self._lock:
+            ids = self._timelines.get(user_id)
+            if ids is None:
+                if not create:
+                    return
+                ids = self._timelines[user_id] = set()
+            ids.update(post_ids)
+            self._trim(ids)
+
+    def remove(self, user_id, post_ids):
+        with self._lock:
+            ids = self._timelines.get(user_id)
+            if ids is not None:
+                ids.difference_update(post_ids)
+
+    def range(self, user_id, max_id=None, limit=20):
+        with self._lock:
+            ids = list(self._timelines.get(user_id, ()))
+        if max_id is not None:
+            ids = [post_id for post_id in ids if post_id < max_id]
+        return sorted(ids, reverse=True)[:limit]
+
+    def mark_celebrity(self, author_id):
+        with self._lock:
+            self._celebrities.add(author_id)
+
+    def unmark_celebrity(self, author_id):
+        with self._lock:
+            self._celebrities.discard(author_id)
+
+    def is_celebrity(self, author_id):
+        with self._lock:
+            return author_id in self._celebrities
+
+    def celebrities(self):
+        with self._lock:
+            return set(self._celebrities)
+
+
+class RedisTimelineStore(BaseTimelineStore):
+    """
+    Timelines as Redis sorted sets scored by post ID, so reads are a single
+    ZREVRANGEBYSCORE. A sentinel member with score 0 marks a timeline that was
+    built but is empty.
+    """
+
+    key_prefix = "timeline:"
+    celebrities_key = "timeline:celebrities"
+    sentinel = "0"
+    pipeline_chunk = 1000
+
+    def __init__(self, max_length, ttl=None, redis_url=None, **options):
+        import redis
+
+        super().__init__(max_length, ttl)
+        self.client = redis.Redis.from_url(redis_url or settings.REDIS_URL)
+
+    def _key(self, user_id):
+        return f"{self.key_prefix}{user_id}"
+
+    def _add_to_pipeline(self, pipe, key, post_ids):
+        pipe.zadd(key, {str(post_id): post_id for post_id in post_ids})
+        # keep the sentinel plus the newest `max_length` posts
+        pipe.zremrangebyrank(key, 1, -(self.max_length + 1))
+
+    def exists(self, user_id):
+        return bool(self.client.exists(self._key(user_id)))
+
+    def push(self, user_ids, post_id):
+        user_ids = list(user_ids)
+        for start in range(0, len(user_ids), self.pipeline_chunk):
+            chunk = user_ids[start:start + self.pipeline_chunk]
+            pipe = self.client.pipeline(transaction=False)
+            for user_id in chunk:
+                pipe.exists(self._key(user_id))
+            existing = pipe.execute()
+
+            pipe = self.client.pipeline(transaction=False)
+            for user_id, exists in zip(chunk, existing):
+                if exists:
+                    self._add_to_pipeline(pipe, self._key(user_id), [post_id])
+            pipe.execute()
+
+    def add(self, user_id, post_ids, create=False):
+        key = self._key(user_id)
+        if not create and not self.client.exists(key):
+            return
+        pipe = self.client.pipeline()
+        pipe.zadd(key, {self.sentinel: 0})
+        if post_ids:
+            self._add_to_pipeline(pipe, key, post_ids)
+        if self.ttl:
+            pipe.expire(key, self.ttl)
+        pipe.execute()
+
+    def remove(self, user_id, post_ids):
+        if post_ids:
+            self.client.zrem(self._key(user_id), *[str(post_id) for post_id in post_ids])
+
+    def range(self, user_id, max_id=None, limit=20):
+        key = self._key(user_id)
+        upper = f"({max_id}" if max_id is not None else "+inf"
+        pipe = self.client.pipeline(transaction=False)
+        pipe.zrevrangebyscore(key, upper, "(0", start=0, num=limit)
+        if self.ttl:
+            pipe.expire(key, self.ttl)
+        members = pipe.execute()[0]
+        return [int(member) for member in members]
+
+    def mark_celebrity(self, author_id):
+        self.client.sadd(self.celebrities_key, author_id)
+
+    def unmark_celebrity(self, author_id):
+        self.client.srem(self.celebrities_key, author_id)
+
+    def is_celebrity(self, author_id):
+        return bool(self.client.sismember(self.celebrities_key, author_id))
+
+    def celebrities(self):
+        return {int(member) for member in self.client.smembers(self.celebrities_key)}
+
+
+@lru_cache(maxsize=None)
+def get_timeline_store():
+    config = timeline_settings()
+    store_class = import_string(config["BACKEND"])
+    return store_class(
+        max_length=config["MAX_LENGTH"],
+        ttl=config["TTL"],
+        redis_url=config["REDIS_URL"],
+    )
+
+
+@receiver(setting_changed)
+def _reset_timeline_store(*, setting, **kwargs):
+    if setting in ("TIMELINE", "REDIS_URL"):
+        get_timeline_store.cache_clear()
+
+
+# ---------- Fan-out ----------
+
+def _following_ids(user_id):
+    return list(
+        UserFollow.objects.filter(follower_id=user_id).values_list("following_id", flat=True)
+    )
+
+
+def _recent_post_ids(author_ids, limit, max_id=None):
+    qs = Post.objects.filter(author_id__in=author_ids)
+    if max_id is not None:
+        qs = qs.filter(id__lt=max_id)
+    return list(qs.order_by("-id").values_list("id", flat=True)[:limit])
+
+
+def fan_out_post(post):
+    """
+    Push a newly created post onto its author's timeline and, unless the
+    author has too many followers, onto every follower's timeline.
+
+    An author who has dropped back under the limit stops being a celebrity.
+    Their followers' timelines, which were missing the author's posts, are
+    backfilled first, so no read misses them in between.
+    """
+    store = get_timeline_store()
+    limit = timeline_settings()["FANOUT_FOLLOWER_LIMIT"]
+    follower_ids = list(
+        UserFollow.objects.filter(following_id=post.author_id)
+        .values_list("follower_id", flat=True)[: limit + 1]
+    )
+    if len(follower_ids) > limit:
+        store.mark_celebrity(post.author_id)
+        follower_ids = []
+    elif store.is_celebrity(post.author_id):
+        recent_ids = _recent_post_ids([post.author_id], store.max_length)
+        for follower_id in follower_ids:
+            store.add(follower_id, recent_ids)
+        store.unmark_celebrity(post.author_id)
+    store.push([post.author_id, *follower_ids], post.id)
+
+
+def follow(follower_id, following_id):
+    """Backfill a followed author's recent posts into the follower's timeline."""
+    store = get_timeline_store()
+    if following_id in store.celebrities():
+        return
+    store.add(follower_id, _recent_post_ids([following_id], store.max_length))
+
+
+def unfollow(follower_id, following_id):
+    store = get_timeline_store()
+    store.remove(follower_id, _recent_post_ids([following_id], store.max_length))
+
+
+def rebuild(user_id):
+    """Build a timeline from the database (cold start or evicted key)."""
+    store = get_timeline_store()
+    celebrities = store.celebrities()
+    author_ids = [a for a in _following_ids(user_id) if a not in celebrities]
+    author_ids.append(user_id)
+    store.add(user_id, _recent_post_ids(author_ids, store.max_length), create=True)
+
+
+# ---------- Read ----------
+
+def home_feed_ids(user_id, max_id=None, limit=20):
+    store = get_timeline_store()
+    if not store.exists(user_id):
+        rebuild(user_id)
+    ids = store.range(user_id, max_id=max_id, limit=limit)
+
+    # fan-out-on-read for followed authors that were too big to push to
+    celebrities = store.celebrities()
+    if celebrities:
+        followed = celebrities.intersection(_following_ids(user_id))
+        if followed:
+            ids = sorted(
+                set(ids) | set(_recent_post_ids(followed, limit, max_id=max_id)),
+                reverse=True,
+            )[:limit]
+    return ids
+
+
+def home_feed(user, max_id=None, limit=20):
+    """
+    Return ``(posts, next_max_id)`` for the user's home feed, newest first.
+    `next_max_id` is None on the last page.
+    """
+    ids = home_feed_ids(user.id, max_id=max_id, limit=limit)
+    posts = Post.objects.select_related("author").in_bulk(ids)
+    next_max_id = ids[-1] if len(ids) == limit else None
+    # deleted posts simply drop out of the feed
+    return [posts[post_id] for post_id in ids if post_id in posts], next_max_id
@@ -1,10 +1,12 @@
 from django.urls import path
 from .views import (
     PostListCreateView,
+    HomeFeedView,
     PostRetrieveUpdateDestroyView,
     PostsByUserView,
     PostSearchView,
     PostLikeToggleView,
+    PostLikersView,
     CommentListCreateView,
     CommentRetrieveDestroyView,
     CommentLikeToggleView,
@@ -13,12 +15,14 @@ from .views import (
 urlpatterns = [
     # ✅ Posts
     path('', PostListCreateView.as_view(), name='post-list-create'),
+    path('feed/', HomeFeedView.as_view(), name='post-home-feed'),
     path('<int:pk>/', PostRetrieveUpdateDestroyView.as_view(), name='post-detail'),
     path('user/<int:user_id>/', PostsByUserView.as_view(), name='posts-by-user'),
     path('search/', PostSearchView.as_view(), name='post-search'),
 
     # ✅ Post likes (toggle + list who liked)
     path('<int:pk>/like/', PostLikeToggleView.as_view(), name='post-like'),
+    path('<int:pk>/likes/', PostLikersView.as_view(), name='post-likers'),
 
     # ✅ Comments on a post
     path('<int:post_id>/comments/', CommentListCreateView.as_view(), name='comment-list-create'),
@@ -1,13 +1,23 @@
 # posts/views.py
+from django.db import transaction
 from django.shortcuts import get_object_or_404
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework.exceptions import PermissionDenied
+from rest_framework.exceptions import PermissionDenied, ValidationError
 
+from . import like_buffer, timeline
 from .models import Post, Comment, Like
-from .serializers import PostSerializer, CommentSerializer
+from .search import search_posts
+from .serializers import PostSerializer, PostSearchSerializer, CommentSerializer
 from users.models import CustomUser
+from social_hub.cache import CacheResponseMixin
+from social_hub.conditional import ConditionalGetMixin
+from social_hub.counters import adjust_counter
+from social_hub.mixins import LinkToggleMixin, PagePrefetchMixin
+from social_hub.pagination import KeysetPagination
+from social_hub.query_budget import query_budget
+from social_hub.serializers import expanded_fields, selected_fields
 
 
 # ---------- Helpers ----------
@@ -26,35 +36,56 @@ def _user_avatar_url(request, user):
     return None
 
 
-def _post_like_queryset(post):
+def _paginated_likers(request, likes, view, user_field="user"):
     """
-    Return an iterable of (user) who liked the post, and the mechanism used:
-    - if Post has M2M 'liked_by' -> use that
-    - else use Like model (reverse name 'likes' or 'like_set')
-    Returns tuple (users_iterable, 'm2m'|'like_model')
+    One keyset page of the users behind `likes` (the rows linking each liker
+    to the liked object, in `user_field`), newest first.
+    Returns (paginator, users_data) with a minimal user representation.
     """
-    if hasattr(post, "liked_by"):
-        return (post.liked_by.all(), "m2m")
-
-    # fallback to Like model
-    # check for related_name 'likes' or default like_set
-    if hasattr(post, "likes"):
-        likes_qs = post.likes.select_related("user").all()
-    else:
-        likes_qs = getattr(post, "like_set", Like.objects.filter(post=post)).select_related("user")
-    users = [lk.user for lk in likes_qs]
-    return (users, "like_model")
+    paginator = KeysetPagination()
+    likes = paginator.paginate_queryset(likes.select_related(user_field), request, view=view)
+    users_data = [
+        {
+            "id": user.id,
+            "username": user.username,
+            "avatar": _user_avatar_url(request, user),
+        }
+        for user in (getattr(like, user_field) for like in likes)
+    ]
+    return paginator, users_data
 
 
 # ---------- Posts ----------
 
-class PostListCreateView(generics.ListCreateAPIView):
+class PostCacheMixin(CacheResponseMixin):
+    """
+    Response cache for posts. Likes and comments don't invalidate it (a
+    popular post gets them all the time): the live fields of a cached post
+    are refreshed on every hit instead, the viewer's liked_by_me included,
+    so only ?expand=author (the author's `following`) is cached per viewer.
+    """
+
+    def cache_varies_on_viewer(self, request):
+        return "author" in expanded_fields(PostSerializer, {"request": request})
+
+    def get_cached_posts(self, data):
+        """Map post id -> serialized post in the cached `data`."""
+        raise NotImplementedError
+
+    def refresh_cached_data(self, data):
+        PostSerializer.refresh_live_fields(self.get_cached_posts(data), self.get_serializer_context())
+        return data
+
+
+@query_budget(max_queries=8)
+class PostListCreateView(PagePrefetchMixin, generics.ListCreateAPIView):
     queryset = Post.objects.all().order_by("-created_at")
     serializer_class = PostSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def perform_create(self, serializer):
-        serializer.save(author=self.request.user)
+        post = serializer.save(author=self.request.user)
+        transaction.on_commit(lambda: timeline.fan_out_post(post))
 
     def get_serializer_context(self):
         ctx = super().get_serializer_context()
@@ -62,10 +93,59 @@ class PostListCreateView(generics.ListCreateAPIView):
         return ctx
 
 
-class PostRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
+@query_budget(max_queries=8)
+class HomeFeedView(PagePrefetchMixin, generics.GenericAPIView):
+    """
+    Posts from the authenticated user and the people they follow, newest first.
+    Example: GET /api/posts/feed/?limit=20&max_id=<next_max_id>
+    """
+    serializer_class = PostSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    default_limit = 20
+    max_limit = 100
+
+    def _int_param(self, name, default=None):
+        value = self.request.query_params.get(name)
+        if value in (None, ""):
+            return default
+        try:
+            return int(value)
+        except ValueError:
+            raise ValidationError({name: "Must be an integer."})
+
+    def get(self, request):
+        limit = min(max(self._int_param("limit", self.default_limit), 1), self.max_limit)
+        max_id = self._int_param("max_id")
+        posts, next_max_id = timeline.home_feed(request.user, max_id=max_id, limit=limit)
+        serializer = self.get_serializer(posts, many=True)
+        return Response({"next_max_id": next_max_id, "results": serializer.data})
+
+
+@query_budget(max_queries=8)
+class PostRetrieveUpdateDestroyView(ConditionalGetMixin, PostCacheMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Post.objects.all()
     serializer_class = PostSerializer
     permission_classes = [permissions.IsAuthenticated]
+    version_fields = ("updated_at", "likes_count", "comments_count", "author__updated_at", "author_id")
+
+    def get_cache_tags(self):
+        tags = [f"post:{self.kwargs['pk']}"]
+        if self.version_row is not None:
+            # and its author's, for the author shown in it
+            tags.append(f"user:{self.version_row['author_id']}")
+        return tags
+
+    def get_cached_posts(self, data):
+        return {int(self.kwargs["pk"]): data}
+
+    def get_extra_version_parts(self):
+        parts = ()
+        if self.version_row is not None and "author" in expanded_fields(PostSerializer, {"request": self.request}):
+            # the author's `following` flag changes without touching either row
+            parts += (self.viewer_follows(self.version_row["author_id"]),)
+        if like_buffer.is_enabled():
+            parts += like_buffer.pending_version(int(self.kwargs["pk"]), self.request.user)
+        return parts
 
     def perform_update(self, serializer):
         post = self.get_object()
@@ -86,51 +166,59 @@ class PostRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
 
 # ---------- Post like/unlike & GET likes ----------
 
-class PostLikeToggleView(APIView):
+class PostLikeToggleView(LinkToggleMixin, APIView):
+    """
+    PUT likes, DELETE unlikes (both idempotent), POST toggles.
+    GET returns the like count and the first page of likers.
+    With LIKE_BUFFER enabled, likes go through posts.like_buffer.
+    """
     permission_classes = [permissions.IsAuthenticated]
+    model = Post
+    relation = "likes"
+    counter_field = "likes_count"
+    added_message = "Post liked."
+    removed_message = "Post unliked."
 
-    def post(self, request, pk):
-        post = get_object_or_404(Post, pk=pk)
-
-        # If Post uses M2M liked_by
-        if hasattr(post, "liked_by"):
-            if request.user in post.liked_by.all():
-                post.liked_by.remove(request.user)
-                return Response({"message": "Post unliked."}, status=status.HTTP_200_OK)
-            post.liked_by.add(request.user)
-            return Response({"message": "Post liked."}, status=status.HTTP_201_CREATED)
-
-        # Otherwise use Like model
-        like_qs = Like.objects.filter(user=request.user, post=post)
-        if like_qs.exists():
-            like_qs.delete()
-            return Response({"message": "Post unliked."}, status=status.HTTP_200_OK)
-        # create
-        Like.objects.create(user=request.user, post=post)
-        return Response({"message": "Post liked."}, status=status.HTTP_201_CREATED)
+    def set_link(self, pk, linked):
+        if like_buffer.is_enabled():
+            return like_buffer.record(int(pk), self.request.user.pk, linked)
+        return super().set_link(pk, linked)
 
     def get(self, request, pk):
         post = get_object_or_404(Post, pk=pk)
-        users_or_iter, mechanism = _post_like_queryset(post)
+        if like_buffer.is_enabled():
+            like_buffer.apply_pending([post])
+        paginator, users_data = _paginated_likers(request, Like.objects.filter(post=post), self)
+        return Response(
+            {
+                "count": post.likes_count,
+                "likes": users_data,
+                "next": paginator.get_next_link(),
+                "previous": paginator.get_previous_link(),
+            },
+            status=status.HTTP_200_OK,
+        )
 
-        # users_or_iter might already be list/queryset of users
-        # build minimal user representation with avatar
-        users_data = []
-        for u in users_or_iter:
-            users_data.append(
-                {
-                    "id": u.id,
-                    "username": u.username,
-                    "avatar": _user_avatar_url(request, u),
-                }
-            )
 
-        return Response({"count": len(users_data), "likes": users_data}, status=status.HTTP_200_OK)
+class PostLikersView(APIView):
+    """
+    Paginated list of users who liked a post, newest first.
+    Example: GET /api/posts/<pk>/likes/?cursor=<next>
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, pk):
+        post = get_object_or_404(Post, pk=pk)
+        paginator, users_data = _paginated_likers(request, Like.objects.filter(post=post), self)
+        response = paginator.get_paginated_response(users_data)
+        response.data["count"] = post.likes_count
+        return response
 
 
 # ---------- Comments ----------
 
-class CommentListCreateView(generics.ListCreateAPIView):
+@query_budget(max_queries=8)
+class CommentListCreateView(PagePrefetchMixin, generics.ListCreateAPIView):
     serializer_class = CommentSerializer
     permission_classes = [permissions.IsAuthenticated]
 
@@ -139,8 +227,10 @@ class CommentListCreateView(generics.ListCreateAPIView):
         return Comment.objects.filter(post_id=post_id).order_by("-created_at")
 
     def perform_create(self, serializer):
-        post_id = self.kwargs["post_id"]
-        serializer.save(user=self.request.user, post_id=post_id)
+        post = get_object_or_404(Post, pk=self.kwargs["post_id"])
+        with transaction.atomic():
+            serializer.save(user=self.request.user, post=post)
+            adjust_counter(Post, post.pk, "comments_count", 1)
 
 
 class CommentRetrieveDestroyView(generics.RetrieveDestroyAPIView):
@@ -151,41 +241,67 @@ class CommentRetrieveDestroyView(generics.RetrieveDestroyAPIView):
     def perform_destroy(self, instance):
         if instance.user != self.request.user:
             raise PermissionDenied("You can only delete your own comment.")
-        instance.delete()
+        with transaction.atomic():
+            instance.delete()
+            adjust_counter(Post, instance.post_id, "comments_count", -1)
 
 
-class CommentLikeToggleView(APIView):
+class CommentLikeToggleView(LinkToggleMixin, APIView):
+    """
+    PUT likes, DELETE unlikes (both idempotent), POST toggles.
+    GET returns the like count and the first page of likers.
+    """
     permission_classes = [permissions.IsAuthenticated]
-
-    def post(self, request, pk):
-        comment = get_object_or_404(Comment, pk=pk)
-
-        # Comment model uses M2M named liked_by (per your model)
-        if request.user in comment.liked_by.all():
-            comment.liked_by.remove(request.user)
-            return Response({"message": "Comment unliked."}, status=status.HTTP_200_OK)
-        comment.liked_by.add(request.user)
-        return Response({"message": "Comment liked."}, status=status.HTTP_201_CREATED)
+    # the link rows have no timestamp; their ids are in like order
+    cursor_ordering = ("-id",)
+    model = Comment
+    relation = "liked_by"
+    counter_field = "likes_count"
+    added_message = "Comment liked."
+    removed_message = "Comment unliked."
 
     def get(self, request, pk):
         comment = get_object_or_404(Comment, pk=pk)
-        users_qs = comment.liked_by.all()
-        data = [
+        liked_by = Comment.liked_by
+        paginator, users_data = _paginated_likers(
+            request, liked_by.through.objects.filter(comment=comment), self, liked_by.field.m2m_reverse_field_name()
+        )
+        return Response(
             {
-                "id": u.id,
-                "username": u.username,
-                "avatar": _user_avatar_url(request, u),
-            }
-            for u in users_qs
-        ]
-        return Response({"count": users_qs.count(), "likes": data}, status=status.HTTP_200_OK)
+                "count": comment.likes_count,
+                "likes": users_data,
+                "next": paginator.get_next_link(),
+                "previous": paginator.get_previous_link(),
+            },
+            status=status.HTTP_200_OK,
+        )
 
 
 # ---------- Utility endpoints ----------
 
-class PostsByUserView(generics.ListAPIView):
+@query_budget(max_queries=8)
+class PostsByUserView(ConditionalGetMixin, PostCacheMixin, PagePrefetchMixin, generics.ListAPIView):
     serializer_class = PostSerializer
     permission_classes = [permissions.AllowAny]
+    version_user_kwarg = "user_id"
+
+    def get_version_stamp(self):
+        # buffered likes move neither likes_count nor updated_at until flushed
+        if like_buffer.is_enabled():
+            return None
+        return super().get_version_stamp()
+
+    def get_cache_tags(self):
+        user_id = self.kwargs["user_id"]
+        return [f"user_posts:{user_id}", f"user:{user_id}"]
+
+    def is_cacheable(self, request):
+        # the live fields of a cached page are found by post id
+        fields = selected_fields(PostSerializer, {"request": request})
+        return "id" in fields or not set(fields) & set(PostSerializer.live_fields)
+
+    def get_cached_posts(self, data):
+        return {post["id"]: post for post in data["results"]}
 
     def get_queryset(self):
         user_id = self.kwargs["user_id"]
@@ -193,10 +309,23 @@ class PostsByUserView(generics.ListAPIView):
         return Post.objects.filter(author=user).order_by("-created_at")
 
 
-class PostSearchView(generics.ListAPIView):
-    serializer_class = PostSerializer
+@query_budget(max_queries=6)
+class PostSearchView(PagePrefetchMixin, generics.ListAPIView):
+    """
+    Full-text search, best matches first.
+    Example: GET /api/posts/search/?q="remote work" -python
+    """
+    serializer_class = PostSearchSerializer
     permission_classes = [permissions.AllowAny]
 
+    def _search_text(self):
+        return self.request.query_params.get("q", "").strip()
+
+    def get_cursor_ordering(self):
+        return ("-rank", "-id") if self._search_text() else ("-created_at", "-id")
+
     def get_queryset(self):
-        q = self.request.query_params.get("q", "")
-        return Post.objects.filter(content__icontains=q).order_by("-created_at")
+        q = self._search_text()
+        if not q:
+            return Post.objects.none()
+        return search_posts(q).select_related("author")
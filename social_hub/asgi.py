@@ -2,6 +2,14 @@
 ASGI config for social_hub project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+HTTP requests go to Django, resolved against ``ASGI_URLCONF`` so the hot
+read endpoints are served by async views (see social_hub/async_views.py);
+WebSocket connections are authenticated with a JWT and routed to the chat
+consumers. Serve it with ``./start_asgi.sh``.
+
+Persistent database connections are off by default here (DB_CONN_MAX_AGE):
+async views run queries on short-lived per-request threads, and a
+connection kept open on such a thread is never reused.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
@@ -9,8 +17,35 @@ https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'social_hub.settings')
+os.environ.setdefault('DB_CONN_MAX_AGE', '0')
+
+
+class AsyncRoutesASGIHandler(ASGIHandler):
+    """Resolve HTTP requests against settings.ASGI_URLCONF instead of ROOT_URLCONF."""
+
+    def create_request(self, scope, body_file):
+        request, error_response = super().create_request(scope, body_file)
+        if request is not None and getattr(settings, 'ASGI_URLCONF', None):
+            request.urlconf = settings.ASGI_URLCONF
+        return request, error_response
+
+
+# Initialise Django before importing consumers, which import models
+# (this is what get_asgi_application() does, with our handler).
+django.setup(set_prefix=False)
+django_asgi_app = AsyncRoutesASGIHandler()
+
+from channels.routing import ProtocolTypeRouter, URLRouter  # noqa: E402
+
+from chat.middleware import JWTAuthMiddleware  # noqa: E402
+from chat.routing import websocket_urlpatterns  # noqa: E402
 
-application = get_asgi_application()
+application = ProtocolTypeRouter({
+    'http': django_asgi_app,
+    'websocket': JWTAuthMiddleware(URLRouter(websocket_urlpatterns)),
+})
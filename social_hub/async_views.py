@@ -0,0 +1,144 @@
+# social_hub/async_views.py
+"""
+Async variants of DRF views for the I/O-bound read endpoints.
+
+Under ASGI a sync view holds a thread for the whole request, including the
+time it waits on the database. The views built from these mixins serve GET
+and HEAD as coroutines instead. Rows come from Django's async ORM, so the
+event loop serves other requests while a query is in flight. Any other
+method runs the view's regular sync dispatch in a thread, so one class can
+serve the whole URL (e.g. list + create).
+
+They are routed by ``social_hub.urls_asgi``, which the ASGI entry point
+(``social_hub.asgi``) resolves against instead of ROOT_URLCONF. WSGI
+deployments keep the sync views.
+
+The async ORM runs all of a request's queries on that request's one
+database thread, so ``asyncio.gather`` over two async ORM calls still runs
+them one after the other. ``parallel_query`` runs an independent query on a
+worker thread with its own connection; gather it with the async ORM calls
+to overlap them.
+
+DRF itself is sync. Authentication, permissions and serialization (which
+may batch-load through ``prefetch_page``) run through ``sync_to_async``.
+"""
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from django.shortcuts import aget_object_or_404
+from rest_framework.response import Response
+
+
+def _on_own_connection(func):
+    def run(*args, **kwargs):
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+    return run
+
+
+async def parallel_query(func, *args, **kwargs):
+    """Run the blocking `func` on a worker thread (and database connection) of its own."""
+    return await sync_to_async(_on_own_connection(func), thread_sensitive=False)(*args, **kwargs)
+
+
+class AsyncViewMixin:
+    """
+    Serve GET and HEAD with the view's ``async def get``; everything else
+    goes through APIView.dispatch in a thread. Put it first in the bases.
+
+    The default ``get`` awaits ``abuild_response()`` behind the view's
+    ConditionalGetMixin and CacheResponseMixin, if it has them: the 304
+    check and the cache lookup come before any rows are loaded.
+    """
+    view_is_async = True
+    async_methods = ("GET", "HEAD")
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # OPTIONS and the browsable API describe the view as its sync base does
+        if cls.__doc__ is None:
+            cls.__doc__ = next(base for base in cls.__mro__ if not issubclass(base, AsyncViewMixin)).__doc__
+
+    def get_view_name(self):
+        return super().get_view_name().removeprefix("Async ")
+
+    async def dispatch(self, request, *args, **kwargs):
+        if request.method not in self.async_methods:
+            return await sync_to_async(super().dispatch)(request, *args, **kwargs)
+
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+        try:
+            # authentication loads the user from the database
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            response = await self.get(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+    async def abuild_response(self, request, *args, **kwargs):
+        raise NotImplementedError
+
+    async def get(self, request, *args, **kwargs):
+        async def build():
+            return await self.abuild_response(request, *args, **kwargs)
+
+        async def cached():
+            if hasattr(self, "acached_get"):
+                return await self.acached_get(request, build)
+            return await build()
+
+        if hasattr(self, "aconditional_get"):
+            return await self.aconditional_get(request, cached)
+        return await cached()
+
+
+class AsyncListMixin(AsyncViewMixin):
+    """Async ``list()`` for a ListAPIView, paginated and page-prefetched like the sync one."""
+
+    async def aget_queryset(self):
+        """get_queryset() for async views; override when building it needs a query."""
+        return self.get_queryset()
+
+    async def apaginate_queryset(self, queryset):
+        if self.paginator is None:
+            return None
+        if hasattr(self, "narrow_page_queryset"):
+            queryset = self.narrow_page_queryset(queryset)
+        if hasattr(self.paginator, "apaginate_queryset"):
+            return await self.paginator.apaginate_queryset(queryset, self.request, view=self)
+        return await sync_to_async(self.paginator.paginate_queryset)(queryset, self.request, view=self)
+
+    def serialize_page(self, page):
+        return self.get_serializer(page, many=True).data
+
+    async def abuild_response(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(await self.aget_queryset())
+        page = await self.apaginate_queryset(queryset)
+        if page is None:
+            return Response(await sync_to_async(self.serialize_page)([row async for row in queryset]))
+        return self.get_paginated_response(await sync_to_async(self.serialize_page)(page))
+
+
+class AsyncRetrieveMixin(AsyncViewMixin):
+    """Async ``retrieve()`` for a RetrieveAPIView."""
+
+    async def aget_object(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        obj = await aget_object_or_404(queryset, **{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        self.check_object_permissions(self.request, obj)
+        return obj
+
+    def serialize_object(self, instance):
+        return self.get_serializer(instance).data
+
+    async def abuild_response(self, request, *args, **kwargs):
+        instance = await self.aget_object()
+        return Response(await sync_to_async(self.serialize_object)(instance))
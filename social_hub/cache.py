@@ -0,0 +1,285 @@
+# social_hub/cache.py
+"""
+Two-tier response and fragment cache.
+
+Values are read from a short-lived process-local tier (``caches["local"]``)
+in front of the shared Redis tier (``caches["default"]``). Entries are never
+deleted for invalidation. Instead every key embeds the current version of
+the tags it depends on ("post:12", "user_posts:3", ...), and the signal
+handlers in each app's ``signals.py`` call ``invalidate(*tags)`` to bump
+those versions. Stale entries then become unreachable in both tiers at once
+and expire on their own. Tag versions always come from the shared tier, so
+every worker sees an invalidation immediately.
+
+Fills are single-flight. Each entry has a fresh period (``TIMEOUT``)
+followed by a stale period (``STALE_TIMEOUT``). The first request to find
+an entry stale or missing takes a per-key lock (``cache.add`` on the shared
+tier, which is atomic on Redis and on the local-memory backend) and
+recomputes it. Meanwhile the other requests get the stale value. Only an
+entry that outlived its fresh period is served stale: after an
+invalidation, which may have deleted what the old entries show, there is
+nothing under the new key yet. Then they wait up to ``LOCK_WAIT`` seconds
+for the lock holder, so one trending object never turns into a herd of
+identical database queries.
+
+Fills read from the primary database, never a lagging replica.
+
+Hits, misses and stale answers are counted per process (``cache_stats()``),
+exported to Prometheus (``cache_events_total``, see social_hub.metrics) and
+reported on cached responses in the ``X-Cache`` header.
+"""
+import hashlib
+import threading
+import time
+from collections import Counter
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.response import Response
+
+from .db_router import on_primary
+from .metrics import CACHE_EVENTS
+
+
+DEFAULTS = {
+    "TIMEOUT": 300,
+    "STALE_TIMEOUT": 30,
+    "LOCAL_TIMEOUT": 5,
+    "LOCK_TIMEOUT": 10,
+    "LOCK_WAIT": 2.0,
+    "KEY_PREFIX": "cache",
+}
+
+POLL_INTERVAL = 0.05
+
+MISSING = object()
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def cache_settings():
+    return {**DEFAULTS, **getattr(settings, "RESPONSE_CACHE", {})}
+
+
+def _record(outcome):
+    with _stats_lock:
+        _stats[outcome] += 1
+    CACHE_EVENTS.labels(outcome).inc()
+
+
+def cache_stats():
+    """Hit/miss counts for this process, plus the overall hit ratio."""
+    with _stats_lock:
+        stats = {
+            "local_hits": _stats["local_hit"],
+            "hits": _stats["hit"],
+            "stale_hits": _stats["stale"],
+            "misses": _stats["miss"],
+            "lock_waits": _stats["wait"],
+        }
+    lookups = stats["local_hits"] + stats["hits"] + stats["stale_hits"] + stats["misses"]
+    stats["hit_ratio"] = round((lookups - stats["misses"]) / lookups, 4) if lookups else None
+    return stats
+
+
+# ---------- Tags ----------
+
+def _tag_key(tag):
+    return f"{cache_settings()['KEY_PREFIX']}:tag:{tag}"
+
+
+def tag_versions(tags):
+    """Current version of each tag, as one string for use in a key."""
+    shared = caches["default"]
+    keys = [_tag_key(tag) for tag in tags]
+    versions = shared.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # start from the clock, so a tag whose version was evicted can't
+            # come back at a version that old entries were stored under
+            shared.add(key, time.time_ns(), timeout=None)
+            versions[key] = shared.get(key)
+    return ".".join(str(versions[key]) for key in keys)
+
+
+def invalidate(*tags):
+    """
+    Make every entry that depends on any of `tags` unreachable.
+
+    Writers call this from ``transaction.on_commit``: bumped while their
+    transaction is still open, a concurrent read would refill the new
+    version from the old rows and serve them until the entry expires.
+    """
+    shared = caches["default"]
+    for tag in tags:
+        key = _tag_key(tag)
+        try:
+            shared.incr(key)
+        except ValueError:
+            shared.add(key, time.time_ns(), timeout=None)
+
+
+# ---------- Tiered get/set ----------
+
+def make_key(name, parts, tags):
+    """The key of (name, parts) at the current versions of `tags`."""
+    digest = hashlib.md5(
+        "|".join(str(part) for part in parts).encode(), usedforsecurity=False
+    ).hexdigest()
+    return f"{cache_settings()['KEY_PREFIX']}:{name}:{digest}:{tag_versions(tags)}"
+
+
+def _get_entry(key):
+    local, shared = caches["local"], caches["default"]
+    entry = local.get(key, MISSING)
+    if entry is not MISSING:
+        return entry, "local_hit"
+    entry = shared.get(key, MISSING)
+    if entry is not MISSING:
+        local.set(key, entry, cache_settings()["LOCAL_TIMEOUT"])
+        return entry, "hit"
+    return MISSING, "miss"
+
+
+def _fill(key, compute, timeout, lock_key=None):
+    config = cache_settings()
+    timeout = config["TIMEOUT"] if timeout is None else timeout
+    try:
+        # a replica that hasn't caught up with the write behind an invalidation
+        # would otherwise be cached under the new tag versions
+        with on_primary():
+            value = compute()
+        if value is not MISSING:
+            entry = (value, time.time() + timeout)
+            lifetime = timeout + config["STALE_TIMEOUT"]
+            caches["default"].set(key, entry, lifetime)
+            caches["local"].set(key, entry, min(lifetime, config["LOCAL_TIMEOUT"]))
+        return value
+    finally:
+        if lock_key is not None:
+            caches["default"].delete(lock_key)
+
+
+def fetch(key, compute, timeout=None):
+    """
+    Return ``(value, outcome)`` for `key`, calling `compute()` at most once
+    across all workers while the key is being refilled. `compute` may return
+    MISSING to skip storing its result (it is then returned as is).
+    Outcome is one of HIT-LOCAL, HIT, STALE or MISS.
+    """
+    config = cache_settings()
+    lock_key = f"{key}:lock"
+
+    def acquire():
+        return caches["default"].add(lock_key, 1, config["LOCK_TIMEOUT"])
+
+    entry, outcome = _get_entry(key)
+    if entry is not MISSING:
+        value, fresh_until = entry
+        if time.time() < fresh_until:
+            _record(outcome)
+            return value, "HIT-LOCAL" if outcome == "local_hit" else "HIT"
+        if not acquire():
+            _record("stale")
+            return value, "STALE"
+        _record("miss")
+        return _fill(key, compute, timeout, lock_key), "MISS"
+
+    if acquire():
+        _record("miss")
+        return _fill(key, compute, timeout, lock_key), "MISS"
+
+    # someone else is filling the key
+    _record("wait")
+    deadline = time.monotonic() + config["LOCK_WAIT"]
+    while time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        entry = caches["default"].get(key, MISSING)
+        if entry is not MISSING:
+            _record("hit")
+            return entry[0], "HIT"
+    # the lock holder is too slow (or died); compute without the lock
+    _record("miss")
+    return _fill(key, compute, timeout), "MISS"
+
+
+def cached_fragment(name, parts, tags, compute, timeout=None):
+    """Return the cached result of `compute()` for (name, parts), computing it on a miss."""
+    value, _ = fetch(make_key(name, parts, tags), compute, timeout)
+    return value
+
+
+# ---------- Views ----------
+
+class CacheResponseMixin:
+    """
+    Cache successful GET responses of a DRF view.
+
+    The response *data* is cached, not the rendered bytes, so content
+    negotiation still applies. Views return the tags the response depends
+    on from ``get_cache_tags()``. Responses carrying per-viewer fields
+    (liked_by_me, following, ...) are keyed per authenticated user and
+    shared between anonymous ones, unless ``cache_varies_on_viewer()``
+    says otherwise.
+
+    Fields that change too often to invalidate on (counters, the viewer's
+    own likes) can be left out of the tags and brought up to date on every
+    hit by ``refresh_cached_data()``.
+    """
+    cache_timeout = None
+    cache_vary_on_viewer = True
+
+    def get_cache_tags(self):
+        raise NotImplementedError
+
+    def is_cacheable(self, request):
+        return True
+
+    def cache_varies_on_viewer(self, request):
+        return self.cache_vary_on_viewer
+
+    def refresh_cached_data(self, data):
+        """Return `data`, a copy of a cached response's data, with its live fields updated."""
+        return data
+
+    def get_cache_key(self, request):
+        viewer = request.user.pk if self.cache_varies_on_viewer(request) and request.user.is_authenticated else 0
+        query = sorted(request.query_params.lists())
+        return make_key(
+            "response",
+            [type(self).__module__, type(self).__qualname__, request.path, query, viewer],
+            self.get_cache_tags(),
+        )
+
+    def get(self, request, *args, **kwargs):
+        if not self.is_cacheable(request):
+            return super().get(request, *args, **kwargs)
+        return self._cached_response(
+            self.get_cache_key(request), lambda: super(CacheResponseMixin, self).get(request, *args, **kwargs)
+        )
+
+    async def acached_get(self, request, respond):
+        """
+        get() for async views. `respond` is a coroutine function that builds
+        the response on a miss. The cache calls block (and may wait for
+        another worker's fill), so they run in a thread.
+        """
+        if not self.is_cacheable(request):
+            return await respond()
+        key = await sync_to_async(self.get_cache_key)(request)
+        return await sync_to_async(self._cached_response)(key, async_to_sync(respond))
+
+    def _cached_response(self, key, respond):
+        rendered = None
+
+        def compute():
+            nonlocal rendered
+            rendered = respond()
+            return rendered.data if rendered.status_code == 200 else MISSING
+
+        data, outcome = fetch(key, compute, self.cache_timeout)
+        response = rendered if rendered is not None else Response(self.refresh_cached_data(data))
+        response["X-Cache"] = outcome
+        return response
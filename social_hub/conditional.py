@@ -0,0 +1,176 @@
+# social_hub/conditional.py
+"""
+Conditional GET (ETag / Last-Modified) for DRF views.
+
+The validators come from a cheap "version stamp" query instead of the
+rendered body, so a matching ``If-None-Match`` or ``If-Modified-Since`` is
+answered with 304 before anything is serialized:
+
+- detail views: the object's ``updated_at`` and counters, plus the
+  ``updated_at`` of the users it shows (``author__updated_at``), one
+  indexed row;
+- list views: ``max(updated_at)`` and the row count of the filtered queryset;
+- whatever else the response shows, from ``get_extra_version_parts()``:
+  for lists of one user's rows (``version_user_kwarg``) that user's
+  ``updated_at`` and whether the viewer follows them, and for detail views
+  with their owner expanded whether the viewer follows the owner.
+
+Counter changes move ``updated_at`` too (see social_hub.counters). The ETag
+also covers the viewer, the query string and the negotiated media type,
+because responses carry per-viewer fields and come in JSON or MessagePack.
+
+Last-Modified is only sent when the stamp is nothing but modification
+times, i.e. for detail views without extra parts. A list's
+``max(updated_at)`` doesn't move when a row is deleted, and per-viewer state
+has no time at all, so those responses are validated by ETag only.
+"""
+import hashlib
+from datetime import datetime
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from .relations import linked_ids
+
+
+class ConditionalGetMixin:
+    """
+    Add ETag and Last-Modified to GET responses and answer 304 when the
+    client's copy is current. ``version_fields`` are the columns read for a
+    detail stamp; lists read the maximum of the first one. By-user lists set
+    ``version_user_kwarg`` to the URL kwarg holding the user's id.
+
+    Once stamped, a detail view has the row it read as ``version_row``
+    ({field: value}), so other columns it needs (the ids behind its cache
+    tags) can come from the same query.
+    """
+    version_fields = ("updated_at",)
+    version_user_kwarg = None
+    version_row = None
+
+    def is_detail(self):
+        return (self.lookup_url_kwarg or self.lookup_field) in self.kwargs
+
+    def _stamp_queryset(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        if self.is_detail():
+            lookup = self.kwargs[self.lookup_url_kwarg or self.lookup_field]
+            return queryset.filter(**{self.lookup_field: lookup}).values_list(*self.version_fields)
+        return queryset
+
+    def _list_aggregates(self):
+        return {"latest": Max(self.version_fields[0]), "count": Count("pk")}
+
+    def _has_extra_version_parts(self):
+        overridden = type(self).get_extra_version_parts is not ConditionalGetMixin.get_extra_version_parts
+        return overridden or self.version_user_kwarg is not None
+
+    def _keep_row(self, row):
+        if self.is_detail() and row is not None:
+            self.version_row = dict(zip(self.version_fields, row))
+
+    def _stamp(self, row, extra):
+        if not self.is_detail():
+            return None, (row["latest"], row["count"], *extra)
+        if row is None:
+            return None
+        times = [part for part in row if isinstance(part, datetime)]
+        return (max(times) if times and not extra else None), (*row, *extra)
+
+    def get_version_stamp(self):
+        """
+        ``(last_modified, parts)`` for the response about to be built, or
+        None to skip conditional handling (e.g. the object doesn't exist).
+        `last_modified` is None unless the parts are all modification times.
+        """
+        queryset = self._stamp_queryset()
+        row = queryset.first() if self.is_detail() else queryset.aggregate(**self._list_aggregates())
+        self._keep_row(row)
+        return self._stamp(row, self.get_extra_version_parts())
+
+    async def aget_version_stamp(self):
+        """get_version_stamp() for async views (see social_hub.async_views)."""
+        queryset = self._stamp_queryset()
+        if self.is_detail():
+            row = await queryset.afirst()
+        else:
+            row = await queryset.aaggregate(**self._list_aggregates())
+        self._keep_row(row)
+        extra = await sync_to_async(self.get_extra_version_parts)() if self._has_extra_version_parts() else ()
+        return self._stamp(row, extra)
+
+    def get_extra_version_parts(self):
+        """
+        Parts of the version that the stamp query doesn't read. By default,
+        for a list of one user's rows, that user's ``updated_at`` (their
+        summary is in every row) and whether the viewer follows them.
+        """
+        if self.version_user_kwarg is None:
+            return ()
+        user_id = self.kwargs[self.version_user_kwarg]
+        updated_at = get_user_model().objects.filter(pk=user_id).values_list("updated_at", flat=True).first()
+        return updated_at, self.viewer_follows(user_id)
+
+    def viewer_follows(self, user_id):
+        """Whether the viewer follows `user_id`: the ``following`` flag of a user the response shows."""
+        return bool(linked_ids(get_user_model(), "followers_set", [user_id], self.request.user))
+
+    def get_etag(self, parts):
+        request = self.request
+        viewer = request.user.pk if request.user.is_authenticated else 0
+        raw = "|".join(
+            str(part)
+            for part in (
+                type(self).__qualname__,
+                request.path,
+                sorted(request.query_params.lists()),
+                request.accepted_media_type,
+                viewer,
+                *parts,
+            )
+        )
+        return "W/" + quote_etag(hashlib.md5(raw.encode(), usedforsecurity=False).hexdigest())
+
+    def get_validators(self, stamp):
+        last_modified, parts = stamp
+        return self.get_etag(parts), int(last_modified.timestamp()) if last_modified else None
+
+    def set_validators(self, response, etag, timestamp):
+        response["ETag"] = etag
+        if timestamp is not None:
+            response["Last-Modified"] = http_date(timestamp)
+        patch_vary_headers(response, ("Accept", "Authorization"))
+        return response
+
+    def get(self, request, *args, **kwargs):
+        stamp = self.get_version_stamp()
+        if stamp is None:
+            return super().get(request, *args, **kwargs)
+
+        etag, timestamp = self.get_validators(stamp)
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+        return self.set_validators(response, etag, timestamp)
+
+    async def aconditional_get(self, request, respond):
+        """
+        get() for async views. `respond` is a coroutine function that builds
+        the full response; it is only awaited when the client's copy is stale.
+        """
+        stamp = await self.aget_version_stamp()
+        if stamp is None:
+            return await respond()
+
+        etag, timestamp = self.get_validators(stamp)
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = await respond()
+            if response.status_code != 200:
+                return response
+        return self.set_validators(response, etag, timestamp)
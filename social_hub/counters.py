@@ -0,0 +1,55 @@
+# social_hub/counters.py
+"""
+Denormalized counter columns (likes_count, comments_count, interested_count).
+
+Counters are changed with ``adjust_counter`` inside the same transaction as the
+row they count, using an ``F()`` expression so concurrent requests don't lose
+updates. The same UPDATE moves the row's ``updated_at``, which conditional GETs
+(social_hub.conditional) use as the version of the object. Drift, e.g. from cascade deletes, is repaired by the
+``recount_counters`` management command.
+"""
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest, Now
+
+
+# (model label, counter field, relation that is counted)
+COUNTERS = [
+    ("posts.Post", "likes_count", "likes"),
+    ("posts.Post", "comments_count", "comments"),
+    ("posts.Comment", "likes_count", "liked_by"),
+    ("events.Event", "interested_count", "interested_users"),
+    ("jobs.Job", "interested_count", "interested_users"),
+]
+
+
+def adjust_counter(model, pk, field, delta):
+    """Add `delta` to `field` on one row, never going below zero."""
+    expression = F(field) + delta
+    if delta < 0:
+        expression = Greatest(expression, 0)
+    changes = {field: expression}
+    if any(f.name == "updated_at" for f in model._meta.concrete_fields):
+        changes["updated_at"] = Now()
+    return model.objects.filter(pk=pk).update(**changes)
+
+
+def count_subquery(model, relation):
+    """
+    ``COALESCE((SELECT COUNT(*) ...), 0)`` of `relation` for the outer row.
+    Works for reverse foreign keys and many-to-many fields.
+    """
+    field = model._meta.get_field(relation)
+    if field.many_to_many:
+        related_model = field.remote_field.through
+        link = field.m2m_field_name()
+    else:
+        related_model = field.related_model
+        link = field.field.name
+    counts = (
+        related_model.objects.filter(**{link: OuterRef("pk")})
+        .order_by()
+        .values(link)
+        .annotate(total=Count("*"))
+        .values("total")
+    )
+    return Coalesce(Subquery(counts), 0)
@@ -0,0 +1,48 @@
+# social_hub/db_pool.py
+"""
+Stats for the database connection pools.
+
+With ``DB_POOL=1`` (see settings) every database alias gets a psycopg 3
+pool through Django's ``OPTIONS["pool"]``. Each process then holds at most
+``max_size`` connections per database, shared by all of its threads,
+instead of one persistent connection per thread.
+
+``pool_stats()`` reports, per pool, how full it is:
+
+- ``in_use`` / ``saturation``: connections checked out, absolute and as a
+  share of ``max_size``. Sustained saturation near 1 means the pool is too
+  small for the worker's concurrency;
+- ``waiting``: requests queued for a connection right now;
+- ``wait_ms_avg``: average time a checkout waited, over the pool's life;
+- ``checkout_errors``: checkouts that failed, mostly by waiting longer
+  than ``timeout`` seconds;
+- ``bad_returns``: connections found broken when given back.
+"""
+from django.db import connections
+
+
+def pool_stats():
+    """``{alias: stats}`` for every database that has a pool in this process."""
+    stats = {}
+    for alias in connections:
+        pool = getattr(connections[alias], "pool", None)
+        if pool is None:
+            continue
+        raw = pool.get_stats()
+        in_use = raw.get("pool_size", 0) - raw.get("pool_available", 0)
+        requests = raw.get("requests_num", 0)
+        stats[alias] = {
+            "min_size": raw.get("pool_min", pool.min_size),
+            "max_size": raw.get("pool_max", pool.max_size),
+            "size": raw.get("pool_size", 0),
+            "available": raw.get("pool_available", 0),
+            "in_use": in_use,
+            "saturation": round(in_use / pool.max_size, 4),
+            "waiting": raw.get("requests_waiting", 0),
+            "requests": requests,
+            "wait_ms_avg": round(raw.get("requests_wait_ms", 0) / requests, 2) if requests else 0,
+            "checkout_errors": raw.get("requests_errors", 0),
+            "bad_returns": raw.get("returns_bad", 0),
+            "connections_lost": raw.get("connections_lost", 0),
+        }
+    return stats
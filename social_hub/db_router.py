@@ -0,0 +1,242 @@
+# social_hub/db_router.py
+"""
+Primary/replica routing.
+
+Writes always go to ``default``. Reads go to a read replica when one is
+configured (``settings.READ_REPLICAS["ALIASES"]``) and either
+
+- the request is a safe method (GET, HEAD, OPTIONS), see
+  ``ReplicaRoutingMiddleware``, or
+- the code asked for it: ``on_replica(queryset)`` or
+  ``with reads_from_replica(): ...``.
+
+Everything else reads from the primary, including reads inside a
+``transaction.atomic()`` block on it and reads in ``with on_primary(): ...``.
+
+After a successful write request (POST, PUT, PATCH, DELETE) the JWT user is
+pinned to the primary for ``PIN_SECONDS``. The pin is kept in the shared
+cache, so their next reads see their own writes whichever worker serves
+them, even while the replicas lag behind.
+
+Each request uses one replica for all its reads. The replica is picked at
+random, weighted by ``WEIGHTS``, among those that passed their last health
+check. The check runs at most every ``HEALTH_CHECK_INTERVAL`` seconds per
+process: the replica must accept a connection and, on Postgres, lag no more
+than ``MAX_LAG`` seconds behind the primary. With no healthy replica, reads
+fall back to the primary.
+"""
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from .query_budget import not_recorded
+
+
+DEFAULTS = {
+    "ALIASES": [],
+    "WEIGHTS": {},
+    "PIN_SECONDS": 5,
+    "MAX_LAG": 10,
+    "HEALTH_CHECK_INTERVAL": 5,
+}
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+# alias that reads in the current request/task go to; None means the primary
+_read_alias = ContextVar("read_alias", default=None)
+
+_health = {}
+_health_lock = threading.Lock()
+
+
+def replica_settings():
+    return {**DEFAULTS, **getattr(settings, "READ_REPLICAS", {})}
+
+
+# ---------- Replica health ----------
+
+LAG_SQL = """
+    SELECT CASE
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+"""
+
+
+def check_replica(alias):
+    """Whether `alias` is reachable and close enough to the primary to read from."""
+    connection = connections[alias]
+    try:
+        connection.ensure_connection()
+        if connection.vendor != "postgresql":
+            return True
+        with connection.cursor() as cursor:
+            cursor.execute(LAG_SQL)
+            lag = cursor.fetchone()[0]
+    except DatabaseError:
+        return False
+    # NULL when the server isn't a standby at all
+    return lag is None or lag <= replica_settings()["MAX_LAG"]
+
+
+def is_healthy(alias):
+    healthy, checked_at = _health.get(alias, (True, float("-inf")))
+    if time.monotonic() - checked_at < replica_settings()["HEALTH_CHECK_INTERVAL"]:
+        return healthy
+    if not _health_lock.acquire(blocking=False):
+        # another thread is checking; go by the previous result meanwhile
+        return healthy
+    try:
+        # the request that happens to run the check isn't charged for it
+        with not_recorded():
+            healthy = check_replica(alias)
+        _health[alias] = (healthy, time.monotonic())
+    finally:
+        _health_lock.release()
+    return healthy
+
+
+def pick_replica():
+    """A healthy replica alias, chosen by weight, or the primary if there is none."""
+    config = replica_settings()
+    aliases = [alias for alias in config["ALIASES"] if is_healthy(alias)]
+    if not aliases:
+        return DEFAULT_DB_ALIAS
+    weights = [config["WEIGHTS"].get(alias, 1) for alias in aliases]
+    return random.choices(aliases, weights=weights)[0]
+
+
+# ---------- Explicit routing ----------
+
+@contextmanager
+def reads_from_replica():
+    token = _read_alias.set(pick_replica())
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+@contextmanager
+def on_primary():
+    token = _read_alias.set(None)
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+def on_replica(queryset):
+    """`queryset` bound to a replica: for reads that tolerate replication lag."""
+    return queryset.using(pick_replica())
+
+
+# ---------- Router ----------
+
+class PrimaryReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        alias = _read_alias.get()
+        if alias is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        instance = hints.get("instance")
+        if instance is not None and instance._state.db:
+            # related objects come from where the instance did
+            return instance._state.db
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+# ---------- Middleware ----------
+
+_jwt = JWTAuthentication()
+
+
+def _jwt_user_id(request):
+    """The user id in the request's access token, without loading the user."""
+    header = _jwt.get_header(request)
+    try:
+        raw_token = _jwt.get_raw_token(header) if header else None
+        if raw_token is None:
+            return None
+        return _jwt.get_validated_token(raw_token).get(jwt_settings.USER_ID_CLAIM)
+    except (AuthenticationFailed, InvalidToken, TokenError):
+        # a malformed header is the view's to reject with a 401
+        return None
+
+
+def _pin_key(user_id):
+    return f"dbpin:{user_id}"
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Route the reads of safe requests to a replica, unless the user wrote
+    within the last ``PIN_SECONDS``; pin the user after a successful write.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not replica_settings()["ALIASES"]:
+            return self.get_response(request)
+
+        user_id = _jwt_user_id(request)
+        if request.method in SAFE_METHODS:
+            pinned = user_id is not None and caches["default"].get(_pin_key(user_id))
+            token = _read_alias.set(None if pinned else pick_replica())
+            try:
+                return self.get_response(request)
+            finally:
+                _read_alias.reset(token)
+
+        response = self.get_response(request)
+        if user_id is not None and response.status_code < 400:
+            caches["default"].set(_pin_key(user_id), 1, replica_settings()["PIN_SECONDS"])
+        return response
+
+    async def __acall__(self, request):
+        if not replica_settings()["ALIASES"]:
+            return await self.get_response(request)
+
+        user_id = _jwt_user_id(request)
+        if request.method in SAFE_METHODS:
+            pinned = user_id is not None and await caches["default"].aget(_pin_key(user_id))
+            # a due health check connects to the replica
+            token = _read_alias.set(None if pinned else await sync_to_async(pick_replica)())
+            try:
+                return await self.get_response(request)
+            finally:
+                _read_alias.reset(token)
+
+        response = await self.get_response(request)
+        if user_id is not None and response.status_code < 400:
+            await caches["default"].aset(_pin_key(user_id), 1, replica_settings()["PIN_SECONDS"])
+        return response
@@ -0,0 +1,53 @@
+# social_hub/fields.py
+"""Serializer fields shared across apps."""
+from rest_framework import serializers
+
+from .relations import linked_ids
+from .serializers import selected_fields
+
+
+class ViewerLinkField(serializers.Field):
+    """
+    Read-only boolean: is the requesting user linked to this object through
+    `relation` (liked it, is interested in it, follows them)?
+
+    List views resolve the whole page at once: the serializer's
+    ``prefetch_page`` returns ``viewer_links(cls, instances, context)``.
+    Anything rendered outside such a page (detail views, create responses)
+    falls back to one query for the single object.
+    """
+
+    def __init__(self, relation, **kwargs):
+        self.relation = relation
+        kwargs["source"] = "*"
+        kwargs["read_only"] = True
+        super().__init__(**kwargs)
+
+    def context_key(self, model):
+        return f"viewer_links:{model._meta.label_lower}.{self.relation}"
+
+    def to_representation(self, obj):
+        ids = self.context.get(self.context_key(type(obj)))
+        if ids is None:
+            request = self.context.get("request")
+            ids = linked_ids(type(obj), self.relation, [obj.pk], getattr(request, "user", None))
+        return obj.pk in ids
+
+
+def viewer_links(serializer_class, instances, context, fields=None):
+    """
+    Context entries for the ViewerLinkFields on `serializer_class` that the
+    request selected (or those in `fields`): one ``IN (...)`` query per
+    relation covering all of `instances`.
+    """
+    if fields is None:
+        fields = selected_fields(serializer_class, context)
+    request = context.get("request")
+    user = getattr(request, "user", None)
+    model = serializer_class.Meta.model
+    pks = [instance.pk for instance in instances]
+    return {
+        field.context_key(model): linked_ids(model, field.relation, pks, user)
+        for name, field in serializer_class._declared_fields.items()
+        if isinstance(field, ViewerLinkField) and name in fields
+    }
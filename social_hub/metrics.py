@@ -0,0 +1,141 @@
+# social_hub/metrics.py
+"""
+Prometheus metrics, served at ``/metrics`` in the Prometheus text format.
+
+``MetricsMiddleware`` observes every request, labelled by the name of the
+URL it resolved to (``post-list-create``, ``chat-list``, ...; ``unresolved``
+for paths that match no route), so the label set stays small:
+
+- ``http_request_duration_seconds{method, view, status}``: wall time;
+- ``http_request_db_seconds{view}`` and ``http_request_db_queries{view}``:
+  time spent in and statements sent to the database. The rest of the
+  request time is Python: authentication, serialization and rendering;
+- ``http_response_size_bytes{view}``;
+- ``http_requests_in_progress``.
+
+The response cache (social_hub.cache) counts its lookups in
+``cache_events_total{event}``; the hit ratio over five minutes is
+
+    1 - sum(rate(cache_events_total{event="miss"}[5m]))
+      / sum(rate(cache_events_total{event!="wait"}[5m]))
+
+Gunicorn workers are separate processes. ``gunicorn.conf.py`` points
+``PROMETHEUS_MULTIPROC_DIR`` at a fresh directory before they start. Every
+worker then writes its samples there, and a scrape, whichever worker
+serves it, adds up all of them. The scrape must send
+``Authorization: Bearer <METRICS["TOKEN"]>``. Without a token configured
+the endpoint is open with DEBUG and refused (403) otherwise, so a
+deployment that forgot to set one doesn't publish its metrics.
+"""
+import os
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import Http404, HttpResponse
+from django.utils.crypto import constant_time_compare
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess,
+)
+
+from .query_budget import install_recorder, recording
+
+
+DEFAULTS = {
+    "ENABLED": True,
+    "TOKEN": "",
+}
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "Time to produce the response.",
+    ["method", "view", "status"],
+)
+REQUEST_DB_DURATION = Histogram(
+    "http_request_db_seconds", "Database time per request.",
+    ["view"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+REQUEST_DB_QUERIES = Histogram(
+    "http_request_db_queries", "SQL statements per request.",
+    ["view"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100),
+)
+RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes", "Response body size.",
+    ["view"],
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576),
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress", "Requests being served.",
+    multiprocess_mode="livesum",
+)
+CACHE_EVENTS = Counter(
+    "cache_events", "Response cache lookups by outcome (local_hit, hit, stale, miss) and lock waits.",
+    ["event"],
+)
+
+
+def metrics_settings():
+    return {**DEFAULTS, **getattr(settings, "METRICS", {})}
+
+
+def view_label(request):
+    match = getattr(request, "resolver_match", None)
+    return match.view_name if match is not None else "unresolved"
+
+
+def observe(request, response, recorder, elapsed):
+    view = view_label(request)
+    REQUEST_DURATION.labels(request.method, view, response.status_code).observe(elapsed)
+    REQUEST_DB_DURATION.labels(view).observe(recorder.duration)
+    REQUEST_DB_QUERIES.labels(view).observe(recorder.count)
+    if not response.streaming:
+        RESPONSE_SIZE.labels(view).observe(len(response.content))
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not metrics_settings()["ENABLED"]:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        install_recorder()
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started = time.perf_counter()
+        with REQUESTS_IN_PROGRESS.track_inprogress(), recording() as recorder:
+            response = self.get_response(request)
+        observe(request, response, recorder, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        with REQUESTS_IN_PROGRESS.track_inprogress(), recording() as recorder:
+            response = await self.get_response(request)
+        observe(request, response, recorder, time.perf_counter() - started)
+        return response
+
+
+def metrics_view(request):
+    config = metrics_settings()
+    if not config["ENABLED"]:
+        raise Http404
+    if not config["TOKEN"]:
+        if not settings.DEBUG:
+            return HttpResponse("METRICS['TOKEN'] is not set.", status=403, content_type="text/plain")
+    elif not constant_time_compare(request.headers.get("Authorization", ""), f"Bearer {config['TOKEN']}"):
+        return HttpResponse(status=401)
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        # the samples of every worker, this one included
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,105 @@
+# social_hub/mixins.py
+"""Shared mixins for DRF generic views."""
+from django.db import transaction
+from django.http import Http404
+from rest_framework import status
+from rest_framework.response import Response
+
+from .counters import adjust_counter
+from .relations import add_link, remove_link
+from .serializers import narrow_queryset
+
+
+class PagePrefetchMixin:
+    """
+    Let the serializer batch-load data for a whole page before it renders.
+
+    If the serializer class defines ``prefetch_page(instances, context)``,
+    it runs once per list response. The dict it returns is merged into the
+    serializer context, so per-row fields can look values up there instead of
+    each issuing their own query.
+
+    The page query itself is shaped to the serializer's selected fields
+    (``?fields=``, see social_hub.serializers) before it is paginated.
+    """
+
+    def narrow_page_queryset(self, queryset):
+        if self.paginator is None or not hasattr(queryset, "query"):
+            return queryset
+        # a cursor is built from the ordering columns, keep them loaded
+        ordering = ()
+        if hasattr(self.paginator, "get_ordering"):
+            ordering = self.paginator.get_ordering(self.request, queryset, self)
+        return narrow_queryset(
+            queryset,
+            self.get_serializer_class(),
+            self.get_serializer_context(),
+            keep=[name.lstrip("-") for name in ordering],
+        )
+
+    def paginate_queryset(self, queryset):
+        return super().paginate_queryset(self.narrow_page_queryset(queryset))
+
+    def get_serializer(self, *args, **kwargs):
+        if kwargs.get("many") and args:
+            prefetch = getattr(self.get_serializer_class(), "prefetch_page", None)
+            if prefetch is not None:
+                instances = list(args[0])
+                context = kwargs.pop("context", None) or self.get_serializer_context()
+                context.update(prefetch(instances, context))
+                kwargs["context"] = context
+                args = (instances, *args[1:])
+        return super().get_serializer(*args, **kwargs)
+
+
+class LinkToggleMixin:
+    """
+    Idempotent endpoints for a "user <-> object" link such as a like:
+
+    - PUT adds the link (201 if new, 200 if it already existed),
+    - DELETE removes it (204 either way),
+    - POST toggles it, as the original endpoints did.
+
+    Subclasses set ``model``, ``relation`` (see ``social_hub.relations``),
+    ``counter_field``, ``lookup_url_kwarg`` and the two messages.
+    """
+    model = None
+    relation = None
+    counter_field = None
+    lookup_url_kwarg = "pk"
+    added_message = "Added."
+    removed_message = "Removed."
+
+    def get_target_pk(self):
+        pk = self.kwargs[self.lookup_url_kwarg]
+        if not self.model.objects.filter(pk=pk).exists():
+            raise Http404(f"No {self.model._meta.object_name} matches the given query.")
+        return pk
+
+    def set_link(self, pk, linked):
+        """Add or remove the requesting user's link; True if a row changed."""
+        change = add_link if linked else remove_link
+        with transaction.atomic():
+            changed = change(self.model, self.relation, pk, self.request.user)
+            if changed:
+                adjust_counter(self.model, pk, self.counter_field, 1 if linked else -1)
+        return changed
+
+    def put(self, request, *args, **kwargs):
+        created = self.set_link(self.get_target_pk(), True)
+        return Response(
+            {"message": self.added_message},
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK,
+        )
+
+    def delete(self, request, *args, **kwargs):
+        self.set_link(self.get_target_pk(), False)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    def post(self, request, *args, **kwargs):
+        pk = self.get_target_pk()
+        # delete first: when nothing was removed the user wasn't linked yet
+        if self.set_link(pk, False):
+            return Response({"message": self.removed_message}, status=status.HTTP_200_OK)
+        self.set_link(pk, True)
+        return Response({"message": self.added_message}, status=status.HTTP_201_CREATED)
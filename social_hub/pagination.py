@@ -0,0 +1,154 @@
+# social_hub/pagination.py
+"""
+Keyset ("seek") pagination for list endpoints.
+
+The cursor stores the ordering values of the last row on the page, e.g.
+``(created_at, id)``. The next page is fetched with
+
+    WHERE created_at <= x AND (created_at < x OR (created_at = x AND id < y))
+
+instead of an OFFSET: the row comparison ``(created_at, id) < (x, y)``
+spelled out so the fields may sort in different directions, plus a bound on
+the leading field that the planner turns into an index range scan. Every
+page costs the same, however deep the client scrolls.
+
+Views pick their ordering with a ``cursor_ordering`` attribute, or with a
+``get_cursor_ordering()`` method when it depends on the request. The last
+field must be unique (normally ``id``) so the order is total.
+"""
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import date, datetime
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(CursorPagination):
+    ordering = ("-created_at", "-id")
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    invalid_cursor_message = "Invalid cursor"
+
+    def get_ordering(self, request, queryset, view):
+        if hasattr(view, "get_cursor_ordering"):
+            return tuple(view.get_cursor_ordering())
+        return tuple(getattr(view, "cursor_ordering", self.ordering))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        queryset, position, reverse = self._seek(queryset, request, view)
+        return self._set_page(list(queryset[: self.page_size + 1]), position, reverse)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """paginate_queryset() for async views, fetching the page with the async ORM."""
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        queryset, position, reverse = self._seek(queryset, request, view)
+        return self._set_page([row async for row in queryset[: self.page_size + 1]], position, reverse)
+
+    def _seek(self, queryset, request, view):
+        """The queryset ordered and filtered to start after the cursor, plus the decoded cursor."""
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.fields = [(field.lstrip("-"), field.startswith("-")) for field in self.ordering]
+
+        position, reverse = self.decode_cursor(request, queryset)
+        fields = [(name, desc != reverse) for name, desc in self.fields]
+        queryset = queryset.order_by(*[("-" if desc else "") + name for name, desc in fields])
+        if position is not None:
+            queryset = queryset.filter(self._seek_filter(fields, position))
+        return queryset, position, reverse
+
+    def _set_page(self, results, position, reverse):
+        has_more = len(results) > self.page_size
+        self.page = results[: self.page_size]
+        if reverse:
+            self.page.reverse()
+            self.has_next = position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+        return self.page
+
+    def _seek_filter(self, fields, position):
+        """
+        Rows strictly after `position` in the given ordering:
+        a >= x AND ((a > x) OR (a = x AND b > y) OR ...)
+        """
+        condition = Q()
+        for index, (name, desc) in enumerate(fields):
+            term = Q(**{f"{name}__{'lt' if desc else 'gt'}": position[index]})
+            for prior in range(index):
+                term &= Q(**{fields[prior][0]: position[prior]})
+            condition |= term
+        # implied by the OR, but only a plain bound lets the index be range-scanned
+        (first, desc), *_ = fields
+        return Q(**{f"{first}__{'lte' if desc else 'gte'}": position[0]}) & condition
+
+    # ---------- Cursor encoding ----------
+
+    def _position(self, instance):
+        values = []
+        for name, _ in self.fields:
+            value = getattr(instance, name)
+            if isinstance(value, (datetime, date)):
+                value = value.isoformat()
+            values.append(value)
+        return values
+
+    def _converters(self, queryset):
+        converters = []
+        for name, _ in self.fields:
+            if name in queryset.query.annotations:
+                field = queryset.query.annotations[name].output_field
+            else:
+                try:
+                    field = queryset.model._meta.get_field("id" if name == "pk" else name)
+                except FieldDoesNotExist:
+                    raise NotFound(self.invalid_cursor_message)
+            converters.append(field.to_python)
+        return converters
+
+    def decode_cursor(self, request, queryset=None):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            payload = json.loads(urlsafe_b64decode(encoded.encode("ascii")))
+            values = payload["p"]
+            if len(values) != len(self.fields):
+                raise ValueError
+            position = [convert(value) for convert, value in zip(self._converters(queryset), values)]
+            if None in position:
+                raise ValueError
+        except (TypeError, ValueError, KeyError, ValidationError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+        return position, bool(payload.get("r"))
+
+    def encode_cursor(self, position, reverse=False):
+        payload = {"p": position}
+        if reverse:
+            payload["r"] = 1
+        encoded = urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode("ascii"))
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded.decode("ascii"))
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self._position(self.page[-1]))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self._position(self.page[0]), reverse=True)
@@ -0,0 +1,307 @@
+# social_hub/profiling.py
+"""
+On-demand profiling of single requests in production.
+
+A request is profiled when
+
+- it carries ``X-Profile: <token>``, a signed token that staff get from
+  ``POST /api/ops/profiles/token/`` (valid ``TOKEN_MAX_AGE`` seconds), or
+- it resolves to a URL name that is being sampled in the background:
+  ``SAMPLE_RATES`` in settings, or set at runtime for a while with
+  ``PUT /api/ops/profiles/sampling/`` (``{"view": "chat-list", "rate": 0.05,
+  "seconds": 600}``), which every worker picks up within
+  ``RATES_REFRESH`` seconds.
+
+Two profilers are available (``X-Profiler`` header, else ``PROFILER``):
+
+- ``cprofile``: deterministic, every call timed. Download the ``.prof`` file
+  and open it with ``python -m pstats`` or snakeviz;
+- ``sample``: a helper thread records the request thread's stack every
+  ``SAMPLE_INTERVAL`` seconds. Low overhead. The download is in collapsed-stack
+  format, ready for flamegraph.pl or speedscope.
+
+The profile is kept in the shared cache for ``TIMEOUT`` seconds. The
+response carries its id in ``X-Profile-Id``. Staff list the recent profiles at
+``/api/ops/profiles/`` and download one at ``/api/ops/profiles/<id>/``.
+
+Each process profiles one request at a time; others that ask meanwhile
+run unprofiled. Both profilers watch the thread that serves the request.
+Under ASGI the async views await their queries and run DRF in other
+threads, so profile a WSGI worker to see everything.
+"""
+import cProfile
+import marshal
+import random
+import secrets
+import sys
+import threading
+import time
+from collections import Counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core import signing
+from django.core.cache import caches
+from django.urls import Resolver404, resolve
+
+
+DEFAULTS = {
+    "ENABLED": True,
+    "PROFILER": "cprofile",
+    "SAMPLE_INTERVAL": 0.005,
+    "SAMPLE_RATES": {},  # URL name -> fraction of its requests profiled
+    "RATES_REFRESH": 5,
+    "TOKEN_MAX_AGE": 600,
+    "TIMEOUT": 3600,
+    "KEEP": 100,  # profiles listed at /api/ops/profiles/
+}
+
+PROFILERS = ("cprofile", "sample")
+
+TOKEN_SALT = "social_hub.profiling"
+INDEX_KEY = "profile:index"
+RATES_KEY = "profile:sampling"
+
+_running = threading.Lock()
+_rates = {"rates": {}, "loaded_at": float("-inf")}
+
+
+def profiling_settings():
+    return {**DEFAULTS, **getattr(settings, "PROFILING", {})}
+
+
+# ---------- Tokens ----------
+
+def make_token(user):
+    return signing.dumps({"user": user.pk}, salt=TOKEN_SALT)
+
+
+def token_is_valid(token):
+    try:
+        signing.loads(token, salt=TOKEN_SALT, max_age=profiling_settings()["TOKEN_MAX_AGE"])
+    except signing.BadSignature:  # SignatureExpired included
+        return False
+    return True
+
+
+# ---------- Background sampling ----------
+
+def sampling_rates():
+    """URL name -> fraction: the settings plus the unexpired runtime overrides."""
+    config = profiling_settings()
+    if time.monotonic() - _rates["loaded_at"] >= config["RATES_REFRESH"]:
+        now = time.time()
+        stored = caches["default"].get(RATES_KEY) or {}
+        _rates["rates"] = {name: rate for name, (rate, until) in stored.items() if until > now}
+        _rates["loaded_at"] = time.monotonic()
+    return {**config["SAMPLE_RATES"], **_rates["rates"]}
+
+
+def set_sampling_rate(url_name, rate, seconds):
+    """Profile `rate` of the requests to `url_name` for the next `seconds`, in every worker."""
+    now = time.time()
+    stored = {
+        name: entry for name, entry in (caches["default"].get(RATES_KEY) or {}).items() if entry[1] > now
+    }
+    if rate > 0:
+        stored[url_name] = (rate, now + seconds)
+    else:
+        stored.pop(url_name, None)
+    caches["default"].set(RATES_KEY, stored, max([seconds, *(until - now for _, until in stored.values())]))
+    _rates["loaded_at"] = float("-inf")
+
+
+# ---------- Profilers ----------
+
+class CProfiler:
+    kind = "cprofile"
+    content_type = "application/octet-stream"
+    extension = "prof"
+
+    def __init__(self, config):
+        self.profile = cProfile.Profile()
+
+    def start(self):
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+
+    def dump(self):
+        # the format of pstats.Stats.dump_stats()
+        self.profile.create_stats()
+        return marshal.dumps(self.profile.stats)
+
+
+def _frame_name(frame):
+    code = frame.f_code
+    return f"{frame.f_globals.get('__name__', '?')}:{getattr(code, 'co_qualname', code.co_name)}"
+
+
+class StackSampler:
+    kind = "sample"
+    content_type = "text/plain"
+    extension = "collapsed"
+
+    def __init__(self, config):
+        self.interval = config["SAMPLE_INTERVAL"]
+        self.stacks = Counter()
+        self._done = threading.Event()
+
+    def start(self):
+        self.thread_id = threading.get_ident()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._done.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                names.append(_frame_name(frame))
+                frame = frame.f_back
+            if names:
+                self.stacks[";".join(reversed(names))] += 1
+
+    def stop(self):
+        self._done.set()
+        self._thread.join()
+
+    def dump(self):
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common()).encode()
+
+
+def make_profiler(kind, config):
+    return {"cprofile": CProfiler, "sample": StackSampler}[kind](config)
+
+
+# ---------- Storage ----------
+
+def _profile_key(profile_id):
+    return f"profile:{profile_id}"
+
+
+def save_profile(request, response, profiler, elapsed, reason):
+    config = profiling_settings()
+    profile_id = secrets.token_hex(8)
+    match = getattr(request, "resolver_match", None)
+    meta = {
+        "id": profile_id,
+        "profiler": profiler.kind,
+        "reason": reason,
+        "method": request.method,
+        "path": request.path,
+        "view": match.view_name if match is not None else None,
+        "status": response.status_code,
+        "duration_ms": round(elapsed * 1000, 1),
+        "created_at": time.time(),
+    }
+    shared = caches["default"]
+    shared.set(_profile_key(profile_id), {**meta, "data": profiler.dump()}, config["TIMEOUT"])
+    index = [meta, *(shared.get(INDEX_KEY) or [])][: config["KEEP"]]
+    shared.set(INDEX_KEY, index, config["TIMEOUT"])
+    return profile_id
+
+
+def recent_profiles():
+    cutoff = time.time() - profiling_settings()["TIMEOUT"]
+    return [meta for meta in caches["default"].get(INDEX_KEY) or [] if meta["created_at"] > cutoff]
+
+
+def get_profile(profile_id):
+    return caches["default"].get(_profile_key(profile_id))
+
+
+# ---------- Middleware ----------
+
+class ProfilingMiddleware:
+    """Profile the requests asked for by token or picked by background sampling."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def profile_reason(self, request):
+        config = profiling_settings()
+        if not config["ENABLED"]:
+            return None
+        token = request.headers.get("X-Profile")
+        if token:
+            return "token" if token_is_valid(token) else None
+        rates = sampling_rates()
+        if not rates:
+            return None
+        try:
+            url_name = resolve(request.path_info, getattr(request, "urlconf", None)).view_name
+        except Resolver404:
+            return None
+        if random.random() < rates.get(url_name, 0):
+            return "sampled"
+        return None
+
+    def start(self, request, reason):
+        """The started profiler, or None when this request isn't profiled."""
+        if reason is None or not _running.acquire(blocking=False):
+            return None
+        kind = request.headers.get("X-Profiler")
+        if reason != "token" or kind not in PROFILERS:
+            kind = profiling_settings()["PROFILER"]
+        profiler = make_profiler(kind, profiling_settings())
+        profiler.start()
+        return profiler
+
+    def finish(self, request, response, profiler, reason, elapsed):
+        profiler.stop()
+        try:
+            response["X-Profile-Id"] = save_profile(request, response, profiler, elapsed, reason)
+        finally:
+            _running.release()
+        return response
+
+    async def afinish(self, request, response, profiler, reason, elapsed):
+        """finish() for async requests, with the cache writes off the event loop."""
+        profiler.stop()
+        try:
+            response["X-Profile-Id"] = await sync_to_async(save_profile)(
+                request, response, profiler, elapsed, reason
+            )
+        finally:
+            _running.release()
+        return response
+
+    def abandon(self, profiler):
+        profiler.stop()
+        _running.release()
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        reason = self.profile_reason(request)
+        profiler = self.start(request, reason)
+        if profiler is None:
+            return self.get_response(request)
+        begun = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            self.abandon(profiler)
+            raise
+        return self.finish(request, response, profiler, reason, time.perf_counter() - begun)
+
+    async def __acall__(self, request):
+        # sampling_rates() reads the shared cache; the profiler itself has to
+        # start on the event loop's thread, which is the one it watches
+        reason = await sync_to_async(self.profile_reason)(request)
+        profiler = self.start(request, reason)
+        if profiler is None:
+            return await self.get_response(request)
+        begun = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        except BaseException:
+            self.abandon(profiler)
+            raise
+        return await self.afinish(request, response, profiler, reason, time.perf_counter() - begun)
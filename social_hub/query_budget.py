@@ -0,0 +1,227 @@
+# social_hub/query_budget.py
+"""
+Per-request query budgets and N+1 detection.
+
+``QueryBudgetMiddleware`` records every SQL statement a request runs, on any
+database alias and on any thread the request uses (the async views and
+``parallel_query`` included). When the response is ready it checks:
+
+- the view's budget: at most ``max_queries`` statements and ``max_db_ms``
+  milliseconds of database time. Declare it with ``@query_budget(...)`` on
+  the view, or in ``QUERY_BUDGET["VIEWS"]`` by dotted path (which wins),
+  else ``DEFAULT_MAX_QUERIES`` / ``DEFAULT_MAX_DB_MS`` apply;
+- repeated SELECTs: the same statement shape (IN-list lengths and numbers
+  ignored) run ``N_PLUS_ONE_THRESHOLD`` times or more, which is what a
+  per-row query in a serializer looks like.
+
+Problems are logged as warnings on the ``social_hub.query_budget`` logger,
+or raised as ``QueryBudgetExceeded`` with ``RAISE`` (the test settings), so
+a regression fails the request that caused it. With ``SERVER_TIMING`` (on
+with DEBUG unless set) every response carries
+``Server-Timing: db;dur=..;desc="N queries", app;dur=..``, which browsers
+show in the network panel.
+"""
+import logging
+import re
+import threading
+import time
+from collections import Counter, namedtuple
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "ENABLED": True,
+    "DEFAULT_MAX_QUERIES": None,
+    "DEFAULT_MAX_DB_MS": None,
+    "N_PLUS_ONE_THRESHOLD": 5,
+    "RAISE": False,
+    "SERVER_TIMING": None,  # None: follow DEBUG
+    "VIEWS": {},  # "posts.views.PostListCreateView": {"max_queries": 5}
+}
+
+Budget = namedtuple("Budget", ["max_queries", "max_db_ms"])
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def budget_settings():
+    return {**DEFAULTS, **getattr(settings, "QUERY_BUDGET", {})}
+
+
+def query_budget(max_queries=None, max_db_ms=None):
+    """Declare the per-request query budget of a view class or function."""
+    def decorate(view):
+        view.query_budget = Budget(max_queries, max_db_ms)
+        return view
+    return decorate
+
+
+# ---------- Recording ----------
+
+_IN_LIST = re.compile(r"\((?:%s, )+%s\)")
+_NUMBER = re.compile(r"\b\d+\b")
+
+
+def query_shape(sql):
+    """`sql` with IN-list lengths and inline numbers (LIMIT, savepoint ids) folded."""
+    return _NUMBER.sub("N", _IN_LIST.sub("(%s, ...)", sql))
+
+
+class QueryRecorder:
+    """Counts and times the statements of one request; shared by all its threads."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.count += 1
+                self.duration += elapsed
+                self.statements[sql] += 1
+
+    def repeated(self, threshold):
+        """``[(shape, count)]`` of SELECT shapes run at least `threshold` times."""
+        shapes = Counter()
+        for sql, count in self.statements.items():
+            if sql.lstrip()[:6].upper() == "SELECT":
+                shapes[query_shape(sql)] += count
+        return [(shape, count) for shape, count in shapes.most_common() if count >= threshold]
+
+
+_recorder = ContextVar("query_recorder", default=None)
+
+
+def _record(execute, sql, params, many, context):
+    recorder = _recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    return recorder(execute, sql, params, many, context)
+
+
+def _install(connection, **kwargs):
+    # connection_created fires again on every reconnect of the same wrapper
+    if _record not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record)
+
+
+def install_recorder():
+    """Hook query recording into every database connection, open or future."""
+    connection_created.connect(_install, dispatch_uid="query_budget")
+    for connection in connections.all(initialized_only=True):
+        _install(connection)
+
+
+@contextmanager
+def recording():
+    """
+    Record the queries run in the block, including on the threads it
+    starts, and yield the QueryRecorder. A nested block shares the
+    recorder of the outer one.
+    """
+    recorder = _recorder.get()
+    if recorder is not None:
+        yield recorder
+        return
+    recorder = QueryRecorder()
+    token = _recorder.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _recorder.reset(token)
+
+
+@contextmanager
+def not_recorded():
+    """Leave the block's queries out of the request's count: housekeeping that isn't the view's."""
+    token = _recorder.set(None)
+    try:
+        yield
+    finally:
+        _recorder.reset(token)
+
+
+# ---------- Middleware ----------
+
+class QueryBudgetMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not budget_settings()["ENABLED"]:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        install_recorder()
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started = time.perf_counter()
+        with recording() as recorder:
+            response = self.get_response(request)
+        return self.check(request, response, recorder, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        with recording() as recorder:
+            response = await self.get_response(request)
+        return self.check(request, response, recorder, time.perf_counter() - started)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._query_budget_view = view_func
+
+    def get_budget(self, view_func, config):
+        view = getattr(view_func, "view_class", view_func)
+        path = f"{view.__module__}.{view.__qualname__}" if view is not None else None
+        if path in config["VIEWS"]:
+            return Budget(**{**Budget(None, None)._asdict(), **config["VIEWS"][path]}), path
+        budget = getattr(view, "query_budget", None)
+        return budget or Budget(config["DEFAULT_MAX_QUERIES"], config["DEFAULT_MAX_DB_MS"]), path
+
+    def check(self, request, response, recorder, elapsed):
+        config = budget_settings()
+        budget, view_name = self.get_budget(getattr(request, "_query_budget_view", None), config)
+        db_ms = recorder.duration * 1000
+
+        problems = []
+        # skip server errors: their queries aren't the view's, the DEBUG 500
+        # page evaluates the querysets it finds in the traceback's locals
+        if response.status_code < 500:
+            if budget.max_queries is not None and recorder.count > budget.max_queries:
+                problems.append(f"{recorder.count} queries, budget {budget.max_queries}")
+            if budget.max_db_ms is not None and db_ms > budget.max_db_ms:
+                problems.append(f"{db_ms:.1f} ms in the database, budget {budget.max_db_ms} ms")
+            for shape, count in recorder.repeated(config["N_PLUS_ONE_THRESHOLD"]):
+                problems.append(f"possible N+1, {count}x: {shape[:300]}")
+        if problems:
+            message = f"{request.method} {request.path} ({view_name}): " + "; ".join(problems)
+            if config["RAISE"]:
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+
+        server_timing = config["SERVER_TIMING"]
+        if server_timing if server_timing is not None else settings.DEBUG:
+            response["Server-Timing"] = (
+                f'db;dur={db_ms:.1f};desc="{recorder.count} queries", app;dur={elapsed * 1000:.1f}'
+            )
+        return response
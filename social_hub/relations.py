@@ -0,0 +1,124 @@
+# social_hub/relations.py
+"""
+Race-free "user <-> object" links: post likes, comment likes, event and job
+interest.
+
+``add_link`` is one ``INSERT ... ON CONFLICT DO NOTHING`` and ``remove_link``
+is one ``DELETE``; ``add_links`` and ``remove_links`` do the same for many
+users at once. They hit the link table's unique (user, object) index and
+never load the existing members. Each reports how many rows actually
+changed, so callers move the denormalized counter exactly once even when
+two requests race.
+
+Neither statement goes through the ORM's save/delete signals, so every
+change sends ``links_changed`` instead. Nothing listens on the link tables'
+own post_delete either: with a receiver there, deleting a post would make
+the cascade load every one of its likes just to send signals.
+"""
+from django.contrib.auth import get_user_model
+from django.db import connections, router
+from django.dispatch import Signal
+
+
+# sent with sender=<model>, pk=<object pk>, user_ids=[...] after links change
+links_changed = Signal()
+
+
+def link_table(model, relation):
+    """
+    (link model, object column field, user column field) for `relation`,
+    either a reverse foreign key (Post.likes, CustomUser.followers_set) or a
+    many-to-many field (Comment.liked_by).
+    """
+    field = model._meta.get_field(relation)
+    if field.many_to_many:
+        through = field.remote_field.through
+        return through, field.m2m_field_name(), field.m2m_reverse_field_name()
+    through = field.related_model
+    object_field = field.field.name
+    user_field = next(
+        f.name for f in through._meta.concrete_fields
+        if f.is_relation and f.related_model is get_user_model() and f.name != object_field
+    )
+    return through, object_field, user_field
+
+
+def add_links(model, relation, pk, user_ids):
+    """
+    Link each of `user_ids` to object `pk` in one INSERT. Returns how many
+    of the links are new.
+    """
+    user_ids = list(user_ids)
+    if not user_ids:
+        return 0
+    through, object_field, user_field = link_table(model, relation)
+    connection = connections[router.db_for_write(through)]
+    fields = [field for field in through._meta.concrete_fields if not field.primary_key]
+
+    values = []
+    for user_id in user_ids:
+        row = through(**{f"{object_field}_id": pk, f"{user_field}_id": user_id})
+        values.extend(field.get_db_prep_save(field.pre_save(row, add=True), connection) for field in fields)
+    placeholders = "({})".format(", ".join(["%s"] * len(fields)))
+    sql = "INSERT INTO {} ({}) VALUES {} ON CONFLICT DO NOTHING".format(
+        connection.ops.quote_name(through._meta.db_table),
+        ", ".join(connection.ops.quote_name(field.column) for field in fields),
+        ", ".join([placeholders] * len(user_ids)),
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, values)
+        added = cursor.rowcount
+    if added:
+        links_changed.send(sender=model, pk=pk, user_ids=user_ids)
+    return added
+
+
+def remove_links(model, relation, pk, user_ids):
+    """
+    Unlink each of `user_ids` from object `pk` in one DELETE. Returns how
+    many links there were.
+    """
+    user_ids = list(user_ids)
+    if not user_ids:
+        return 0
+    through, object_field, user_field = link_table(model, relation)
+    connection = connections[router.db_for_write(through)]
+    quote = connection.ops.quote_name
+    object_fk, user_fk = (through._meta.get_field(name) for name in (object_field, user_field))
+    # not QuerySet.delete(): the collector would SELECT the rows first to cascade and send signals
+    sql = "DELETE FROM {} WHERE {} = %s AND {} IN ({})".format(
+        quote(through._meta.db_table),
+        quote(object_fk.column),
+        quote(user_fk.column),
+        ", ".join(["%s"] * len(user_ids)),
+    )
+    values = [object_fk.get_db_prep_value(pk, connection)]
+    values.extend(user_fk.get_db_prep_value(user_id, connection) for user_id in user_ids)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, values)
+        deleted = cursor.rowcount
+    if deleted:
+        links_changed.send(sender=model, pk=pk, user_ids=user_ids)
+    return deleted
+
+
+def add_link(model, relation, pk, user):
+    """Link `user` to object `pk`. Returns False if the link already existed."""
+    return add_links(model, relation, pk, [user.pk]) > 0
+
+
+def remove_link(model, relation, pk, user):
+    """Unlink `user` from object `pk`. Returns False if there was no link."""
+    return remove_links(model, relation, pk, [user.pk]) > 0
+
+
+def linked_ids(model, relation, pks, user):
+    """The subset of object `pks` that `user` is linked to, in one IN (...) query."""
+    if not pks or user is None or not user.is_authenticated:
+        return set()
+    through, object_field, user_field = link_table(model, relation)
+    return set(
+        through.objects.filter(
+            **{f"{user_field}_id": user.pk, f"{object_field}_id__in": pks}
+        ).values_list(f"{object_field}_id", flat=True)
+    )
@@ -0,0 +1,95 @@
+# social_hub/search.py
+"""
+Typo-tolerant search with pg_trgm.
+
+Short columns (title, company, location) are matched with the ``%``
+similarity operator. Long text (description) is matched with ``%>`` word
+similarity, which finds the query inside a longer string. Both operators can
+use the ``gin_trgm_ops`` indexes declared on the models.
+"""
+from django.contrib.postgres.search import TrigramSimilarity, TrigramWordSimilarity
+from django.core.exceptions import EmptyResultSet
+from django.db import connections
+from django.db.models import BooleanField, ExpressionWrapper, FloatField, Q
+from django.db.models.functions import Cast, Greatest
+
+
+FACET_SIZE = 10
+
+
+def trigram_search(queryset, text, fields, word_fields=()):
+    """
+    Rows where any of `fields` / `word_fields` fuzzily matches `text`,
+    annotated with `similarity`: the best score across those columns.
+    """
+    condition = Q()
+    scores = []
+    for field in fields:
+        condition |= Q(**{f"{field}__trigram_similar": text})
+        scores.append(TrigramSimilarity(field, text))
+    for field in word_fields:
+        condition |= Q(**{f"{field}__trigram_word_similar": text})
+        scores.append(TrigramWordSimilarity(text, field))
+    score = Greatest(*scores) if len(scores) > 1 else scores[0]
+    # similarity() returns real; double precision round-trips through cursors
+    return queryset.filter(condition).annotate(similarity=Cast(score, FloatField()))
+
+
+def facet_counts(queryset, facets, size=FACET_SIZE):
+    """
+    Per-facet counts over `queryset`: ``{facet: [{"value": v, "count": n}, ...]}``
+    for ``facets = {facet: column}``, largest first, at most `size` values
+    per facet.
+
+    One query with a grouping set per column, so every facet is counted on
+    its own and the database returns at most `size` rows for each, instead
+    of a row per combination of values.
+    """
+    columns = list(dict.fromkeys(facets.values()))
+    result = {facet: [] for facet in facets}
+    try:
+        inner_sql, params = queryset.order_by().values(*columns).query.sql_with_params()
+    except EmptyResultSet:
+        return result
+
+    connection = connections[queryset.db]
+    quoted = [connection.ops.quote_name(column) for column in columns]
+    grouping = f"GROUPING({', '.join(quoted)})"
+    sql = f"""
+        SELECT {', '.join(quoted)}, "set", "total" FROM (
+            SELECT {', '.join(quoted)}, {grouping} AS "set", COUNT(*) AS "total",
+                   ROW_NUMBER() OVER (
+                       PARTITION BY {grouping}
+                       ORDER BY COUNT(*) DESC, CONCAT({', '.join(quoted)})
+                   ) AS "rank"
+            FROM ({inner_sql}) AS "facet_rows"
+            GROUP BY GROUPING SETS ({', '.join(f"({column})" for column in quoted)})
+        ) AS "ranked"
+        WHERE "rank" <= %s
+        ORDER BY "set", "rank"
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [*params, size])
+        rows = cursor.fetchall()
+
+    # GROUPING() sets a bit for every column left out of the row's set
+    set_columns = {
+        (2 ** len(columns) - 1) ^ (1 << (len(columns) - 1 - index)): index for index in range(len(columns))
+    }
+    values = {column: [] for column in columns}
+    for *row, set_bits, total in rows:
+        index = set_columns[set_bits]
+        values[columns[index]].append({"value": row[index], "count": total})
+    return {facet: values[column] for facet, column in facets.items()}
+
+
+def search_facets(queryset, facets, upcoming):
+    """
+    `facet_counts` plus a "when" facet, ``{"upcoming": n, "past": n}``,
+    counted on the `upcoming` condition.
+    """
+    queryset = queryset.annotate(upcoming=ExpressionWrapper(upcoming, output_field=BooleanField()))
+    counts = facet_counts(queryset, {**facets, "when": "upcoming"})
+    when = {item["value"]: item["count"] for item in counts["when"]}
+    counts["when"] = {"upcoming": when.get(True, 0), "past": when.get(False, 0)}
+    return counts
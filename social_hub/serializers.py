@@ -0,0 +1,122 @@
+# social_hub/serializers.py
+"""
+Sparse fieldsets and opt-in expansion.
+
+``?fields=id,content`` limits a response to those top-level fields.
+``?expand=liked_by_users,author`` opts in to the serializer's
+``Meta.expandable_fields``. An expandable field mapped to None is heavy and
+left out unless asked for. One mapped to a factory is swapped for the
+factory's field, e.g. a full profile instead of the compact user summary.
+Naming a hidden field in ``fields`` expands it as well.
+
+Only the top-level serializer of a GET request follows the parameters.
+Nested serializers and writes always use the defaults.
+
+``narrow_queryset`` applies the same selection to the database query:
+``only()`` the columns behind the selected fields, and ``select_related``
+the foreign keys among them. Serializers check ``selected_fields`` in
+``prefetch_page`` to skip batch loads for fields that won't be rendered.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+
+
+def _get_request(context):
+    """The request whose parameters apply, i.e. only for reads."""
+    request = context.get("request")
+    if request is None or request.method not in ("GET", "HEAD"):
+        return None
+    return request
+
+
+def _param(request, name):
+    if request is None:
+        return None
+    # a DRF Request, or a plain Django one (serializers used outside a view)
+    value = getattr(request, "query_params", request.GET).get(name)
+    if not value:
+        return None
+    return {part.strip() for part in value.split(",") if part.strip()}
+
+
+def selected_fields(serializer_class, context):
+    """Names of the top-level fields a request gets from `serializer_class`, in Meta order."""
+    request = _get_request(context)
+    requested = _param(request, "fields")
+    expand = _param(request, "expand") or set()
+    hidden = {
+        name for name, factory in getattr(serializer_class.Meta, "expandable_fields", {}).items()
+        if factory is None and name not in expand
+    }
+    if requested:
+        return [name for name in serializer_class.Meta.fields if name in requested]
+    return [name for name in serializer_class.Meta.fields if name not in hidden]
+
+
+def expanded_fields(serializer_class, context):
+    return (_param(_get_request(context), "expand") or set()) & set(
+        getattr(serializer_class.Meta, "expandable_fields", {})
+    )
+
+
+class SparseFieldsMixin:
+    """
+    ModelSerializer mixin for ``?fields=`` and ``?expand=``; see the module
+    docstring. Declare ``Meta.expandable_fields`` to make fields opt-in.
+    """
+
+    def _follows_request(self):
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        return parent is None
+
+    def get_fields(self):
+        fields = super().get_fields()
+        context = self.context if self._follows_request() else {}
+        names = selected_fields(type(self), context)
+        expandable = getattr(self.Meta, "expandable_fields", {})
+        for name in expanded_fields(type(self), context):
+            if expandable[name] is not None:
+                fields[name] = expandable[name]()
+        return {name: field for name, field in fields.items() if name in names or field.write_only}
+
+
+def narrow_queryset(queryset, serializer_class, context, keep=()):
+    """
+    Limit `queryset` to what the selected fields of `serializer_class` read.
+    `keep` names extra columns that must stay loaded (e.g. the ordering).
+    Without ``?fields=`` only the ``select_related`` part applies.
+    SerializerMethodFields are assumed to need no more than the primary key.
+    A source the model doesn't have (a property) disables ``only()``.
+    """
+    model = queryset.model
+    concrete = {field.name for field in model._meta.concrete_fields}
+    serializer = serializer_class(context=context)
+    columns, related = {model._meta.pk.name, *keep}, []
+    if isinstance(queryset.query.select_related, dict):
+        # deferring a foreign key the view already joins is an error
+        columns.update(queryset.query.select_related)
+    for name in selected_fields(serializer_class, context):
+        field = serializer.fields.get(name)
+        if field is None or field.write_only or field.source == "*":
+            continue
+        if isinstance(field, serializers.SerializerMethodField):
+            continue
+        if field.source in queryset.query.annotations:
+            continue
+        try:
+            model_field = model._meta.get_field(field.source.split(".")[0])
+        except FieldDoesNotExist:
+            columns = None
+            continue
+        if model_field.many_to_one:
+            related.append(model_field.name)
+        if columns is not None and model_field.concrete:
+            columns.add(model_field.name)
+
+    if related:
+        queryset = queryset.select_related(*related)
+    if columns is not None and _param(_get_request(context), "fields"):
+        queryset = queryset.only(*(name for name in columns if name in concrete))
+    return queryset
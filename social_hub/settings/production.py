@@ -7,5 +7,7 @@ DEBUG = False
 ALLOWED_HOSTS = ['your-app-name.onrender.com']
 
 DATABASES = {
-    'default': dj_database_url.config(default=os.environ.get('DATABASE_URL'))
+    'default': dj_database_url.config(default=os.environ.get('DATABASE_URL')),
+    **REPLICA_DATABASES,
 }
+configure_connections(DATABASES)
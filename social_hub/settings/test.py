@@ -0,0 +1,25 @@
+import copy
+
+from .base import *
+
+# ✅ In-memory backends so tests don't need Redis
+TIMELINE = {**TIMELINE, "BACKEND": "posts.timeline.InMemoryTimelineStore"}
+LIKE_BUFFER = {**LIKE_BUFFER, "BACKEND": "posts.like_buffer.InMemoryLikeBuffer"}
+CHANNEL_LAYERS = {"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
+CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "shared"},
+    "local": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "local"},
+}
+
+# ✅ Connections close after each use, as under ASGI (social_hub/asgi.py), so the
+# worker threads of parallel_query don't keep the test database open
+DATABASES["default"]["CONN_MAX_AGE"] = 0
+
+# ✅ A mirror of the test database stands in for a read replica,
+# so tests go through the primary/replica router
+DATABASES = {**DATABASES, "replica": {**copy.deepcopy(DATABASES["default"]), "TEST": {"MIRROR": "default"}}}
+configure_connections({"replica": DATABASES["replica"]})
+READ_REPLICAS = {**READ_REPLICAS, "ALIASES": ["replica"]}
+
+# ✅ Over-budget and N+1 requests fail instead of logging
+QUERY_BUDGET = {**QUERY_BUDGET, "RAISE": True}
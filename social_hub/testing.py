@@ -0,0 +1,22 @@
+# social_hub/testing.py
+"""Helpers shared by the apps' tests."""
+from rest_framework import test
+
+from users.models import CustomUser
+
+
+def make_user(username, **fields):
+    return CustomUser.objects.create_user(
+        username=username, email=f"{username}@example.com", password="pw123456", **fields
+    )
+
+
+class APITestCase(test.APITestCase):
+    """Base class for tests that go through the API."""
+    # requests read from the replica, a mirror of "default" in the test settings
+    databases = {"default", "replica"}
+
+
+class APITransactionTestCase(test.APITransactionTestCase):
+    """APITestCase for tests that need their rows committed."""
+    databases = {"default", "replica"}
@@ -0,0 +1,348 @@
+import datetime
+import decimal
+import json
+import time
+import uuid
+from unittest import mock
+
+import msgpack
+
+from django.core.cache import caches
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework_simplejwt.tokens import AccessToken
+
+from chat.models import ChatMessage, Conversation
+from events.models import Event
+from posts.models import Post
+from users.models import CustomUser
+from . import cache, db_router, profiling
+from .metrics import metrics_view
+from .renderers import FastJSONRenderer
+from .testing import APITestCase, APITransactionTestCase, make_user
+
+
+class KeysetPaginationTests(APITestCase):
+    def setUp(self):
+        author = make_user("author")
+        self.posts = [Post.objects.create(author=author, content=str(i)) for i in range(5)]
+        # the middle three tie on created_at, so the id decides
+        Post.objects.filter(pk__in=[post.pk for post in self.posts[1:4]]).update(created_at=timezone.now())
+        Post.objects.filter(pk=self.posts[0].pk).update(created_at=timezone.now() - datetime.timedelta(days=1))
+        Post.objects.filter(pk=self.posts[4].pk).update(created_at=timezone.now() + datetime.timedelta(days=1))
+        self.client.force_authenticate(author)
+
+    def get(self, url, params=None, status=200):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status)
+        return response
+
+    def ids(self, response):
+        return [post["id"] for post in response.data["results"]]
+
+    def test_next_and_previous_pages(self):
+        newest_first = [self.posts[i].pk for i in (4, 3, 2, 1, 0)]
+        response = self.get(reverse("post-list-create"), {"page_size": 2})
+        pages = [self.ids(response)]
+        while response.data["next"]:
+            response = self.get(response.data["next"])
+            pages.append(self.ids(response))
+        self.assertEqual(pages, [newest_first[:2], newest_first[2:4], newest_first[4:]])
+
+        response = self.get(self.get(response.data["previous"]).data["previous"])
+        self.assertEqual(self.ids(response), newest_first[:2])
+        self.assertIsNone(response.data["previous"])
+
+    def test_seek_bounds_the_leading_field(self):
+        next_page = self.get(reverse("post-list-create"), {"page_size": 2}).data["next"]
+        with CaptureQueriesContext(connection) as queries:
+            self.get(next_page)
+        self.assertTrue(any('"created_at" <=' in query["sql"] for query in queries))
+
+    def test_tampered_cursor_is_not_found(self):
+        url = reverse("post-list-create")
+        for cursor in ["garbage", "eyJwIjpbbnVsbCxudWxsXX0=", "eyJwIjpbIngiLDFdfQ==", "eyJwIjpbMV19"]:
+            self.get(url, {"cursor": cursor}, status=404)
+
+
+class RendererTests(SimpleTestCase):
+    def test_orjson_matches_the_stock_renderer(self):
+        data = {
+            "at": datetime.datetime(2026, 1, 2, 3, 4, 5, 678901, tzinfo=datetime.timezone.utc),
+            "day": datetime.date(2026, 1, 2),
+            "price": decimal.Decimal("12.50"),
+            "id": uuid.UUID(int=1),
+            "text": "line\u2028separator \u00e9",
+            "nested": [{"n": 1, "f": 0.1, "none": None}],
+        }
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+
+class ContentNegotiationTests(APITestCase):
+    def setUp(self):
+        self.user = make_user("author")
+        Post.objects.create(author=self.user, content="hello")
+        self.client.force_authenticate(self.user)
+        self.url = reverse("post-list-create")
+
+    def test_msgpack_round_trip(self):
+        response = self.client.post(
+            self.url, msgpack.packb({"content": "packed"}), content_type="application/msgpack",
+            headers={"accept": "application/msgpack"},
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response["Content-Type"], "application/msgpack")
+        self.assertEqual(msgpack.unpackb(response.content)["content"], "packed")
+
+    def test_accept_picks_the_renderer(self):
+        as_json = self.client.get(self.url)
+        self.assertEqual(as_json["Content-Type"], "application/json")
+        as_msgpack = self.client.get(self.url, headers={"accept": "application/msgpack"})
+        self.assertEqual(as_msgpack["Content-Type"], "application/msgpack")
+        self.assertEqual(msgpack.unpackb(as_msgpack.content), json.loads(as_json.content))
+
+    def test_malformed_msgpack_is_a_bad_request(self):
+        response = self.client.post(self.url, b"\xc1", content_type="application/msgpack")
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(RESPONSE_CACHE={"LOCK_WAIT": 0.1})
+class CacheTests(SimpleTestCase):
+    def setUp(self):
+        caches["default"].clear()
+        caches["local"].clear()
+
+    def key(self):
+        return cache.make_key("test", ["post", 1], ["post:1"])
+
+    def hold_lock(self, key):
+        self.assertTrue(caches["default"].add(f"{key}:lock", 1))
+
+    def test_expired_entry_is_served_stale_while_refilled(self):
+        key = self.key()
+        cache.fetch(key, lambda: "old", timeout=0)
+        self.hold_lock(key)
+        self.assertEqual(cache.fetch(key, lambda: "new"), ("old", "STALE"))
+
+    def test_invalidated_entry_is_never_served(self):
+        cache.fetch(self.key(), lambda: "deleted post")
+        cache.invalidate("post:1")
+        key = self.key()
+        self.hold_lock(key)
+        # nothing to serve under the new versions: wait for the fill, then compute
+        self.assertEqual(cache.fetch(key, lambda: "new"), ("new", "MISS"))
+
+
+class MetricsViewTests(SimpleTestCase):
+    def get(self, **headers):
+        return metrics_view(RequestFactory().get("/metrics", headers=headers))
+
+    @override_settings(METRICS={"TOKEN": "secret"})
+    def test_token_is_required(self):
+        self.assertEqual(self.get().status_code, 401)
+        self.assertEqual(self.get(authorization="Bearer wrong").status_code, 401)
+        self.assertEqual(self.get(authorization="Bearer secret").status_code, 200)
+
+    @override_settings(METRICS={"TOKEN": ""})
+    def test_refused_without_a_token_unless_debug(self):
+        self.assertEqual(self.get().status_code, 403)
+        with self.settings(DEBUG=True):
+            self.assertEqual(self.get().status_code, 200)
+
+
+@override_settings(READ_REPLICAS={"ALIASES": ["replica"]})
+class ReplicaRoutingTests(SimpleTestCase):
+    def setUp(self):
+        caches["default"].clear()
+        db_router._health.clear()
+        patcher = mock.patch.object(db_router, "check_replica", return_value=True)
+        self.check_replica = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(db_router._health.clear)
+
+    def request(self, method, user_id=None, status=200):
+        """The alias the request's reads went to."""
+        reads = []
+
+        def view(request):
+            reads.append(db_router.PrimaryReplicaRouter().db_for_read(Post))
+            return HttpResponse(status=status)
+
+        headers = {}
+        if user_id is not None:
+            headers["authorization"] = f"Bearer {AccessToken.for_user(CustomUser(pk=user_id))}"
+        db_router.ReplicaRoutingMiddleware(view)(RequestFactory().generic(method, "/", headers=headers))
+        return reads[0]
+
+    def test_safe_requests_read_from_the_replica(self):
+        self.assertEqual(self.request("GET"), "replica")
+        self.assertEqual(self.request("HEAD", user_id=1), "replica")
+        self.assertEqual(self.request("POST"), "default")
+
+    def test_writer_is_pinned_to_the_primary(self):
+        self.request("POST", user_id=1, status=400)
+        self.assertEqual(self.request("GET", user_id=1), "replica")
+
+        self.request("POST", user_id=1, status=201)
+        self.assertEqual(self.request("GET", user_id=1), "default")
+        self.assertEqual(self.request("GET", user_id=2), "replica")
+        self.assertEqual(self.request("GET"), "replica")
+
+    def test_falls_back_to_the_primary_without_a_healthy_replica(self):
+        self.check_replica.return_value = False
+        self.assertEqual(self.request("GET"), "default")
+        self.assertEqual(db_router.pick_replica(), "default")
+
+    def test_health_is_checked_once_per_interval(self):
+        for _ in range(3):
+            db_router.pick_replica()
+        self.assertEqual(self.check_replica.call_count, 1)
+
+    @override_settings(READ_REPLICAS={"ALIASES": ["a", "b", "c"], "WEIGHTS": {"a": 3, "c": 0}})
+    def test_pick_is_weighted_among_healthy_replicas(self):
+        picks = [db_router.pick_replica() for _ in range(400)]
+        self.assertNotIn("c", picks)
+        self.assertGreater(picks.count("a"), picks.count("b"))
+
+        self.check_replica.side_effect = lambda alias: alias == "b"
+        db_router._health.clear()
+        self.assertEqual({db_router.pick_replica() for _ in range(20)}, {"b"})
+
+
+class ProfilingTests(SimpleTestCase):
+    def setUp(self):
+        caches["default"].clear()
+        profiling._rates["loaded_at"] = float("-inf")
+        self.addCleanup(profiling._rates.update, loaded_at=float("-inf"))
+        self.token = profiling.make_token(CustomUser(pk=1))
+
+    def request(self, headers=None):
+        def view(request):
+            return HttpResponse("ok")
+
+        request = RequestFactory().get("/", headers=headers or {})
+        return profiling.ProfilingMiddleware(view)(request)
+
+    def test_token_must_be_valid(self):
+        response = self.request({"x-profile": self.token})
+        self.assertIsNotNone(profiling.get_profile(response["X-Profile-Id"]))
+        self.assertNotIn("X-Profile-Id", self.request({"x-profile": self.token + "x"}))
+        with self.settings(PROFILING={"TOKEN_MAX_AGE": -1}):
+            self.assertNotIn("X-Profile-Id", self.request({"x-profile": self.token}))
+
+    def test_one_profile_at_a_time(self):
+        with profiling._running:
+            self.assertNotIn("X-Profile-Id", self.request({"x-profile": self.token}))
+        self.assertIn("X-Profile-Id", self.request({"x-profile": self.token}))
+
+    def test_runtime_sampling_rate_expires(self):
+        profiling.set_sampling_rate("chat-list", 0.5, seconds=60)
+        self.assertEqual(profiling.sampling_rates(), {"chat-list": 0.5})
+        # next refresh, a minute later
+        profiling._rates["loaded_at"] = float("-inf")
+        with mock.patch.object(profiling.time, "time", return_value=time.time() + 61):
+            self.assertEqual(profiling.sampling_rates(), {})
+
+        profiling.set_sampling_rate("chat-list", 0.5, seconds=60)
+        profiling.set_sampling_rate("chat-list", 0, seconds=60)
+        self.assertEqual(profiling.sampling_rates(), {})
+
+    async def test_async_requests_are_profiled(self):
+        async def view(request):
+            return HttpResponse("ok")
+
+        request = RequestFactory().get("/", headers={"x-profile": self.token})
+        with mock.patch.object(profiling, "sync_to_async", wraps=profiling.sync_to_async) as to_thread:
+            response = await profiling.ProfilingMiddleware(view)(request)
+        # the sampling rates are read and the profile saved off the event loop
+        self.assertEqual(to_thread.call_count, 2)
+        self.assertIs(to_thread.call_args.args[0], profiling.save_profile)
+        self.assertIsNotNone(profiling.get_profile(response["X-Profile-Id"]))
+
+
+def bearer(user):
+    return {"authorization": f"Bearer {AccessToken.for_user(user)}"}
+
+
+@override_settings(ROOT_URLCONF="social_hub.urls_asgi")
+class AsyncViewTests(APITestCase):
+    def setUp(self):
+        caches["default"].clear()
+        caches["local"].clear()
+        self.user = make_user("author")
+        self.post = Post.objects.create(author=self.user, content="hello")
+        self.url = reverse("post-detail", args=[self.post.pk])
+
+    async def test_304_is_answered_before_the_cache(self):
+        response = await self.async_client.get(self.url, headers=bearer(self.user))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(json.loads(response.content)["content"], "hello")
+
+        response = await self.async_client.get(
+            self.url, headers={**bearer(self.user), "if-none-match": response["ETag"]}
+        )
+        self.assertEqual(response.status_code, 304)
+        self.assertNotIn("X-Cache", response)
+
+        response = await self.async_client.get(self.url, headers=bearer(self.user))
+        self.assertIn(response["X-Cache"], ("HIT-LOCAL", "HIT"))
+
+    async def test_errors_go_through_handle_exception(self):
+        response = await self.async_client.get(reverse("post-detail", args=[0]), headers=bearer(self.user))
+        self.assertEqual(response.status_code, 404)
+        self.assertIn("detail", json.loads(response.content))
+
+        response = await self.async_client.get(self.url)
+        self.assertEqual(response.status_code, 401)
+
+    async def test_writes_go_through_the_sync_dispatch(self):
+        response = await self.async_client.patch(
+            self.url, {"content": "edited"}, content_type="application/json", headers=bearer(self.user)
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)["content"], "edited")
+
+
+@override_settings(ROOT_URLCONF="social_hub.urls_asgi")
+class ParallelQueryTests(APITransactionTestCase):
+    """parallel_query runs on a connection of its own, which only sees committed rows."""
+
+    def setUp(self):
+        self.alice = make_user("alice")
+        self.bob = make_user("bob")
+
+    async def test_search_facets(self):
+        now = timezone.now()
+        for location, days in [("Lagos", 3), ("Accra", -3)]:
+            start = now + datetime.timedelta(days=days)
+            await Event.objects.acreate(
+                title="Jazz festival", description="Live music", location=location,
+                start_time=start, end_time=start + datetime.timedelta(hours=3), created_by=self.alice,
+            )
+        response = await self.async_client.get(reverse("event-search"), {"q": "jazz", "location": "Lagos"})
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.content)
+        self.assertEqual(len(data["results"]), 1)
+        # counted over every match for q, not just the filtered page
+        self.assertEqual(data["facets"], {
+            "location": [{"value": "Accra", "count": 1}, {"value": "Lagos", "count": 1}],
+            "when": {"upcoming": 1, "past": 1},
+        })
+
+    async def test_chat_checks_the_other_user_exists(self):
+        conversation = await Conversation.objects.acreate(user_a=self.alice, user_b=self.bob)
+        await ChatMessage.objects.acreate(
+            conversation=conversation, sender=self.alice, receiver=self.bob, message="hi"
+        )
+        response = await self.async_client.get(reverse("chat-list", args=[self.bob.pk]), headers=bearer(self.alice))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row["message"] for row in json.loads(response.content)["results"]], ["hi"])
+
+        response = await self.async_client.get(reverse("chat-list", args=[0]), headers=bearer(self.alice))
+        self.assertEqual(response.status_code, 404)
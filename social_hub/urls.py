@@ -2,7 +2,10 @@ from django.contrib import admin
 from django.urls import path, include, re_path
 from django.conf import settings
 from django.conf.urls.static import static
-from .views import home
+from .metrics import metrics_view
+from .views import (
+    home, OpsStatsView, ProfileDownloadView, ProfileListView, ProfileSamplingView, ProfileTokenView,
+)
 
 from rest_framework import permissions
 from rest_framework_simplejwt.authentication import JWTAuthentication
@@ -32,6 +35,12 @@ urlpatterns = [
     path("api/jobs/", include("jobs.urls")),
     path("api/events/", include("events.urls")),
     path('api/chat/', include('chat.urls')),
+    path("api/ops/stats/", OpsStatsView.as_view(), name="ops-stats"),
+    path("api/ops/profiles/", ProfileListView.as_view(), name="ops-profiles"),
+    path("api/ops/profiles/token/", ProfileTokenView.as_view(), name="ops-profile-token"),
+    path("api/ops/profiles/sampling/", ProfileSamplingView.as_view(), name="ops-profile-sampling"),
+    path("api/ops/profiles/<str:profile_id>/", ProfileDownloadView.as_view(), name="ops-profile-download"),
+    path("metrics", metrics_view, name="metrics"),  # Prometheus scrape target
 
     #  Swagger and ReDoc API docs
     path('api/docs/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
@@ -0,0 +1,29 @@
+"""
+URLconf for the ASGI deployment (``ASGI_URLCONF``, see social_hub/asgi.py).
+
+The I/O-bound read endpoints resolve to their async views first; every
+other route, and every write, is the same as in ROOT_URLCONF.
+"""
+from django.urls import path
+
+from chat.async_views import AsyncChatListView
+from events.async_views import AsyncEventSearchView
+from jobs.async_views import AsyncJobSearchView
+from posts.async_views import (
+    AsyncCommentListCreateView,
+    AsyncPostListCreateView,
+    AsyncPostRetrieveUpdateDestroyView,
+    AsyncPostSearchView,
+)
+from .urls import urlpatterns as sync_urlpatterns
+
+urlpatterns = [
+    path("api/posts/", AsyncPostListCreateView.as_view(), name="post-list-create"),
+    path("api/posts/<int:pk>/", AsyncPostRetrieveUpdateDestroyView.as_view(), name="post-detail"),
+    path("api/posts/search/", AsyncPostSearchView.as_view(), name="post-search"),
+    path("api/posts/<int:post_id>/comments/", AsyncCommentListCreateView.as_view(), name="comment-list-create"),
+    path("api/events/search/", AsyncEventSearchView.as_view(), name="event-search"),
+    path("api/jobs/search/", AsyncJobSearchView.as_view(), name="job-search"),
+    path("api/chat/<int:user_id>/", AsyncChatListView.as_view(), name="chat-list"),
+    *sync_urlpatterns,
+]
@@ -1,4 +1,90 @@
-from django.http import JsonResponse
+from django.http import Http404, HttpResponse, JsonResponse
+from rest_framework import permissions, serializers
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from . import profiling
+from .cache import cache_stats
+from .db_pool import pool_stats
 
 def home(request):
     return JsonResponse({"message": "Welcome to Social Hub API!"})
+
+
+class OpsStatsView(APIView):
+    """
+    Per-process counters for sizing caches and connection pools (staff only).
+    Example: GET /api/ops/stats/
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response({"cache": cache_stats(), "db_pool": pool_stats()})
+
+
+class ProfileTokenView(APIView):
+    """
+    A signed token that has requests profiled when sent as `X-Profile: <token>`
+    (staff only). Optional `X-Profiler: cprofile | sample`.
+    Example: POST /api/ops/profiles/token/
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def post(self, request):
+        return Response({
+            "token": profiling.make_token(request.user),
+            "expires_in": profiling.profiling_settings()["TOKEN_MAX_AGE"],
+        })
+
+
+class ProfileListView(APIView):
+    """
+    Recent request profiles, newest first (staff only).
+    Example: GET /api/ops/profiles/
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(profiling.recent_profiles())
+
+
+class ProfileDownloadView(APIView):
+    """
+    Download one profile: pstats data for cprofile, collapsed stacks for sample (staff only).
+    Example: GET /api/ops/profiles/<id>/
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, profile_id):
+        profile = profiling.get_profile(profile_id)
+        if profile is None:
+            raise Http404
+        profiler = profiling.make_profiler(profile["profiler"], profiling.profiling_settings())
+        response = HttpResponse(profile["data"], content_type=profiler.content_type)
+        response["Content-Disposition"] = f'attachment; filename="{profile_id}.{profiler.extension}"'
+        return response
+
+
+class SamplingRateSerializer(serializers.Serializer):
+    view = serializers.CharField()
+    rate = serializers.FloatField(min_value=0, max_value=1)
+    seconds = serializers.IntegerField(min_value=1, max_value=86400, default=600)
+
+
+class ProfileSamplingView(APIView):
+    """
+    Background profiling: the fraction of requests profiled per URL name (staff only).
+    Example: PUT /api/ops/profiles/sampling/ {"view": "chat-list", "rate": 0.05, "seconds": 600}
+    A rate of 0 stops sampling that view.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(profiling.sampling_rates())
+
+    def put(self, request):
+        serializer = SamplingRateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        profiling.set_sampling_rate(data["view"], data["rate"], data["seconds"])
+        return Response(profiling.sampling_rates())
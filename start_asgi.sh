@@ -0,0 +1,8 @@
+#!/usr/bin/env bash
+set -o errexit
+
+# ASGI deployment: async read views and WebSockets (see social_hub/asgi.py)
+exec gunicorn social_hub.asgi:application \
+    --worker-class uvicorn.workers.UvicornWorker \
+    --workers "${WEB_CONCURRENCY:-2}" \
+    --bind "0.0.0.0:${PORT:-8000}"
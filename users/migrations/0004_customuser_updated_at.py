@@ -0,0 +1,27 @@
+# Generated by Django 5.1.7 on 2026-10-18 14:20
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_updated_at(apps, schema_editor):
+    CustomUser = apps.get_model("users", "CustomUser")
+    CustomUser.objects.update(updated_at=F("date_joined"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_userfollow'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill_updated_at, migrations.RunPython.noop),
+    ]
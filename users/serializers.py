@@ -5,12 +5,58 @@ from django.utils.encoding import force_bytes
 from django.contrib.auth.tokens import default_token_generator
 from rest_framework import serializers
 
+from social_hub.fields import ViewerLinkField, viewer_links
+from social_hub.serializers import SparseFieldsMixin
+
 User = get_user_model()
 
 
-class UserSerializer(serializers.ModelSerializer):
+def absolute_url_prefix(context):
+    """
+    "scheme://host" of the current request, or "" outside a request.
+    Computed once and kept on the (per-request) serializer context.
+    """
+    prefix = context.get("_absolute_url_prefix")
+    if prefix is None:
+        request = context.get("request")
+        prefix = request.build_absolute_uri("/")[:-1] if request else ""
+        context["_absolute_url_prefix"] = prefix
+    return prefix
+
+
+def user_summary(user, prefix=""):
+    """Compact {"id", "username", "avatar"} dict for nested user fields."""
+    avatar = None
+    if user.profile_pic:
+        avatar = user.profile_pic.url
+        if avatar.startswith("/"):
+            avatar = prefix + avatar
+    return {"id": user.pk, "username": user.username, "avatar": avatar}
+
+
+def user_summaries(users, context):
+    prefix = absolute_url_prefix(context)
+    return [user_summary(user, prefix) for user in users]
+
+
+class UserSummaryField(serializers.Field):
+    """
+    Read-only nested user rendered by `user_summary`, without the per-object
+    field machinery of a nested UserSerializer.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs["read_only"] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, user):
+        return user_summary(user, absolute_url_prefix(self.context))
+
+
+class UserSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     avatar = serializers.SerializerMethodField(read_only=True)
     password = serializers.CharField(write_only=True, required=False, min_length=6)
+    following = ViewerLinkField("followers_set")
 
     class Meta:
         model = User
@@ -23,9 +69,14 @@ class UserSerializer(serializers.ModelSerializer):
             "bio",
             "profile_pic",
             "avatar",
+            "following",
             "password",
         ]
-        read_only_fields = ["id", "avatar"]
+        read_only_fields = ["id", "avatar", "following"]
+
+    @classmethod
+    def prefetch_page(cls, users, context):
+        return viewer_links(cls, users, context)
 
     def get_avatar(self, obj):
         request = self.context.get("request")
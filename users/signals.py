@@ -0,0 +1,21 @@
+# users/signals.py
+"""Invalidate cached responses (social_hub.cache) when profiles or follows change."""
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from social_hub.cache import invalidate
+from .models import CustomUser, UserFollow
+
+
+@receiver([post_save, post_delete], sender=CustomUser)
+def user_changed(sender, instance, **kwargs):
+    transaction.on_commit(partial(invalidate, f"user:{instance.pk}"))
+
+
+@receiver([post_save, post_delete], sender=UserFollow)
+def follow_changed(sender, instance, **kwargs):
+    # the `following` flag the follower sees on the followed user's profile
+    transaction.on_commit(partial(invalidate, f"user:{instance.following_id}"))
@@ -1,3 +1,31 @@
-from django.test import TestCase
+from django.urls import reverse
 
-# Create your tests here.
+from social_hub.testing import APITestCase, make_user
+from .models import UserFollow
+
+
+class UserDetailConditionalGetTests(APITestCase):
+    def setUp(self):
+        self.user = make_user("celebrity")
+        self.viewer = make_user("fan")
+        self.client.force_authenticate(self.viewer)
+        self.url = reverse("user-detail", args=[self.user.pk])
+
+    def test_etag_follows_the_following_flag(self):
+        response = self.client.get(self.url)
+        etag = response["ETag"]
+        # per-viewer state has no modification time
+        self.assertNotIn("Last-Modified", response)
+        self.assertEqual(self.client.get(self.url, headers={"if-none-match": etag}).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            UserFollow.objects.create(follower=self.viewer, following=self.user)
+        response = self.client.get(self.url, headers={"if-none-match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data["following"])
+
+    def test_own_profile_answers_if_modified_since(self):
+        self.client.force_authenticate(self.user)
+        url = reverse("profile")
+        last_modified = self.client.get(url)["Last-Modified"]
+        self.assertEqual(self.client.get(url, headers={"if-modified-since": last_modified}).status_code, 304)
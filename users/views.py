@@ -6,16 +6,23 @@ from rest_framework.response import Response
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework.exceptions import PermissionDenied
 
+from posts import timeline
 from .models import CustomUser, UserFollow
 from .serializers import UserSerializer, PasswordResetSerializer, LoginSerializer
+from social_hub.cache import CacheResponseMixin
+from social_hub.conditional import ConditionalGetMixin
+from social_hub.mixins import PagePrefetchMixin
+from social_hub.query_budget import query_budget
 
 User = get_user_model()
 
 # ✅ Retrieve all users
-class UserListView(generics.ListAPIView):
+@query_budget(max_queries=5)
+class UserListView(PagePrefetchMixin, generics.ListAPIView):
     queryset = CustomUser.objects.all()
     serializer_class = UserSerializer
     permission_classes = [permissions.AllowAny]
+    cursor_ordering = ('id',)
 
 
 # ✅ Signup
@@ -60,13 +67,17 @@ class UserLoginView(generics.GenericAPIView):
 
 
 # ✅ View Profile (logged in user)
-class UserProfileView(generics.RetrieveAPIView):
+class UserProfileView(ConditionalGetMixin, generics.RetrieveAPIView):
     serializer_class = UserSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_object(self):
         return self.request.user
 
+    def get_version_stamp(self):
+        user = self.request.user
+        return user.updated_at, (user.updated_at,)
+
 
 # ✅ Update Profile (bio + profile picture + other fields)
 class UserProfileUpdateView(generics.RetrieveUpdateAPIView):
@@ -79,11 +90,21 @@ class UserProfileUpdateView(generics.RetrieveUpdateAPIView):
 
 
 # ✅ Retrieve user by ID
-class UserDetailView(generics.RetrieveAPIView):
+class UserDetailView(ConditionalGetMixin, CacheResponseMixin, generics.RetrieveAPIView):
     queryset = CustomUser.objects.all()
     serializer_class = UserSerializer
     permission_classes = [permissions.IsAuthenticated]
 
+    def get_extra_version_parts(self):
+        # the `following` flag changes without touching the user row
+        following = UserFollow.objects.filter(
+            follower_id=self.request.user.pk, following_id=self.kwargs["pk"]
+        ).exists()
+        return (following,)
+
+    def get_cache_tags(self):
+        return [f"user:{self.kwargs['pk']}"]
+
 
 # ✅ Follow / Unfollow
 class FollowUserView(APIView):
@@ -100,28 +121,34 @@ class FollowUserView(APIView):
         )
         if not created:
             follow.delete()
+            timeline.unfollow(request.user.id, target.id)
             return Response({"message": "Unfollowed"}, status=200)
+        timeline.follow(request.user.id, target.id)
         return Response({"message": "Followed"}, status=201)
 
 
 # ✅ Followers list
-class FollowersListView(generics.ListAPIView):
+@query_budget(max_queries=6)
+class FollowersListView(PagePrefetchMixin, generics.ListAPIView):
     serializer_class = UserSerializer
     permission_classes = [permissions.IsAuthenticated]
+    cursor_ordering = ('id',)
 
     def get_queryset(self):
         user = get_object_or_404(CustomUser, id=self.kwargs['id'])
-        return [f.follower for f in user.followers_set.all()]
+        return CustomUser.objects.filter(following_set__following=user)
 
 
 # ✅ Following list
-class FollowingListView(generics.ListAPIView):
+@query_budget(max_queries=6)
+class FollowingListView(PagePrefetchMixin, generics.ListAPIView):
     serializer_class = UserSerializer
     permission_classes = [permissions.IsAuthenticated]
+    cursor_ordering = ('id',)
 
     def get_queryset(self):
         user = get_object_or_404(CustomUser, id=self.kwargs['id'])
-        return [f.following for f in user.following_set.all()]
+        return CustomUser.objects.filter(followers_set__follower=user)
 
 
 # ✅ Password Reset (No Token)
@@ -137,7 +164,9 @@ class PasswordResetView(APIView):
 
 
 # ✅ Get All Users (duplicate of UserListView, but more explicit endpoint)
-class AllUsersListView(generics.ListAPIView):
+@query_budget(max_queries=5)
+class AllUsersListView(PagePrefetchMixin, generics.ListAPIView):
     queryset = CustomUser.objects.all()
     serializer_class = UserSerializer
     permission_classes = [permissions.AllowAny]
+    cursor_ordering = ('id',)